@@ -0,0 +1,95 @@
+"""
+Generate synthetic (but valid) Serpent contracts of a given shape, for
+scaling and stress tests of serplint:
+
+    python benchmarks/generate.py --methods 50 --depth 4 > big.se
+"""
+
+from __future__ import print_function
+
+import click
+
+INDENT = '    '
+
+
+def contract(methods=1, fields=1, depth=1, macros=0, variables=1):
+    """
+    Return the source of a contract with `methods` methods, `fields` data
+    fields and `macros` macros. Each method assigns `variables` local
+    variables (at least one, since arguments can't be assigned to), nests
+    `depth` levels of if/while blocks and calls every macro, and every field
+    is read and written somewhere.
+    """
+    lines = []
+
+    for field in range(fields):
+        lines.append('data field{}[]'.format(field))
+
+    if fields:
+        lines.append('')
+
+    for macro in range(macros):
+        lines.extend([
+            'macro scale{}($x):'.format(macro),
+            '{}$x * {} + 1'.format(INDENT, macro + 2),
+            '',
+        ])
+
+    for method in range(methods):
+        lines.extend(method_lines(method, fields, depth, macros, variables))
+        lines.append('')
+
+    return '\n'.join(lines)
+
+
+def method_lines(method, fields, depth, macros, variables):
+    lines = ['def method{}(key, amount):'.format(method)]
+    names = ['amount']
+
+    for variable in range(max(variables, 1)):
+        name = 'var{}'.format(variable)
+        lines.append('{}{} = {} + key'.format(INDENT, name, names[-1]))
+        names.append(name)
+
+    for macro in range(macros):
+        lines.append('{}{} = scale{}({})'.format(INDENT, names[-1], macro,
+                                                 names[-1]))
+
+    indent = INDENT
+
+    for level in range(depth):
+        if level % 2:
+            lines.append('{}while {} < {}:'.format(indent, names[-1],
+                                                    level * 10))
+            lines.append('{}{}{} += 1'.format(indent, INDENT, names[-1]))
+        else:
+            lines.append('{}if {} > {}:'.format(indent, names[-1], level))
+
+        indent += INDENT
+
+    if fields:
+        field = 'self.field{}[key]'.format(method % fields)
+
+        lines.append('{}{} = {} + {}'.format(indent, field, field,
+                                             names[-1]))
+    else:
+        lines.append('{}{} = {} + 1'.format(indent, names[-1], names[-1]))
+
+    lines.append('{}return({})'.format(INDENT, names[-1]))
+
+    return lines
+
+
+@click.command()
+@click.option('--methods', type=int, default=1)
+@click.option('--fields', type=int, default=1)
+@click.option('--depth', type=int, default=1)
+@click.option('--macros', type=int, default=0)
+@click.option('--variables', type=int, default=1)
+def generate(**shape):
+    click.echo(contract(**shape))
+
+
+# pylint: disable=no-value-for-parameter
+if __name__ == '__main__':
+    generate()
@@ -0,0 +1,92 @@
+"""
+Time the traverse and resolve phases on a generated contract with the
+per-run identifier table (`serplint.Names`) against classifying every token
+from scratch, as serplint used to:
+
+    python benchmarks/identifiers.py --methods 200 --variables 20
+"""
+
+from __future__ import division, print_function
+
+import re
+
+import click
+import serplint
+
+from generate import contract
+
+PHASES = ['traverse', 'resolve']
+
+
+class Linter(serplint.Linter):
+    def compile(self):
+        # only the phases after parsing are measured
+        pass
+
+
+class UncachedLinter(Linter):
+    """Regular expressions and list scans for every token visited."""
+
+    @staticmethod
+    def is_reference(value):
+        return re.match('^[a-z]', value, re.IGNORECASE)
+
+    @staticmethod
+    def is_callable(value):
+        return (re.match('^[^0-9]', value) and
+                value not in serplint.GLOBALS and
+                value not in serplint.KEYWORDS and
+                value not in serplint.BUILTINS)
+
+    @staticmethod
+    def is_opcode(value):
+        return value in serplint.OPCODE_NAMES
+
+
+def measure(linter_class, code, repeat):
+    best = None
+
+    for _ in range(repeat):
+        metrics = serplint.Metrics()
+        linter = linter_class(serplint.source_file(code, 'synthetic.se'),
+                              echo=False, metrics=metrics,
+                              parser=serplint.DEFAULT_PARSER)
+
+        try:
+            linter.lint()
+        except SystemExit:
+            pass
+
+        elapsed = sum(
+            histogram[-2]
+            for (name, labels), histogram in metrics.histograms.items()
+            if name == 'serplint_phase_seconds' and
+            dict(labels)['phase'] in PHASES)
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    return best
+
+
+@click.command()
+@click.option('--methods', type=int, default=100)
+@click.option('--fields', type=int, default=10)
+@click.option('--depth', type=int, default=4)
+@click.option('--macros', type=int, default=5)
+@click.option('--variables', type=int, default=10)
+@click.option('--repeat', type=int, default=5,
+              help='Lint this many times and keep the best.')
+def identifiers(repeat, **shape):
+    code = contract(**shape)
+
+    uncached = measure(UncachedLinter, code, repeat)
+    cached = measure(Linter, code, repeat)
+
+    click.echo('{:>10} {:>9.3f}s'.format('uncached', uncached))
+    click.echo('{:>10} {:>9.3f}s'.format('names', cached))
+    click.echo('{:>10} {:>9.2f}x'.format('speedup', uncached / cached))
+
+
+# pylint: disable=no-value-for-parameter
+if __name__ == '__main__':
+    identifiers()
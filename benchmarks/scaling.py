@@ -0,0 +1,121 @@
+"""
+Lint generated contracts of growing size along each dimension of
+`generate.contract` and chart lint time and peak memory against it, so
+superlinear paths in the linter show up as soon as they're introduced:
+
+    python benchmarks/scaling.py --sizes 1,4,16,64 --csv scaling.csv
+
+Each point is linted in its own process (with serplint installed or on the
+path) so memory measurements don't accumulate.
+"""
+
+from __future__ import division, print_function
+
+import math
+import resource
+import time
+
+import click
+import serplint
+
+from generate import contract
+
+DIMENSIONS = ['methods', 'fields', 'depth', 'macros', 'variables']
+BAR_WIDTH = 40
+
+
+def measure(shape, repeat):
+    code = contract(**shape)
+    best = None
+
+    for _ in range(repeat):
+        started = time.time()
+        serplint.lint_source(code, 'synthetic.se')
+        elapsed = time.time() - started
+
+        best = elapsed if best is None else min(best, elapsed)
+
+    # ru_maxrss is in kilobytes on Linux (but bytes on OS X)
+    return best, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def exponent(points):
+    """
+    The growth exponent between the last two points: ~1 is linear, ~2 is
+    quadratic.
+    """
+    (size1, seconds1), (size2, seconds2) = points[-2:]
+
+    if size1 == size2 or not seconds1 or not seconds2:
+        return None
+
+    return math.log(seconds2 / seconds1) / math.log(size2 / size1)
+
+
+def chart(dimension, rows):
+    longest = max(seconds for _, seconds, _ in rows) or 1
+
+    click.echo(dimension)
+
+    for size, seconds, megabytes in rows:
+        click.echo('{:>8} {:>9.3f}s {:>8.1f}MB {}'.format(
+            size, seconds, megabytes,
+            '#' * int(round(BAR_WIDTH * seconds / longest))))
+
+    growth = exponent([(size, seconds) for size, seconds, _ in rows])
+
+    if growth is not None:
+        click.echo('{:>8} ~O(n^{:.1f}){}'.format(
+            '', growth, ' superlinear!' if growth > 1.5 else ''))
+
+    click.echo()
+
+
+def parse_sizes(ctx, param, value):  # pylint: disable=unused-argument
+    try:
+        return sorted(int(size) for size in value.split(','))
+    except ValueError:
+        raise click.BadParameter('should be a list of integers like 1,2,4')
+
+
+@click.command()
+@click.option('--dimension', '-d', 'dimensions', type=click.Choice(DIMENSIONS),
+              multiple=True, help='Dimensions to vary (default: all).')
+@click.option('--sizes', callback=parse_sizes, default='1,2,4,8,16,32',
+              help='Comma-separated sizes to try along each dimension.')
+@click.option('--repeat', type=int, default=3,
+              help='Lint each contract this many times and keep the best.')
+@click.option('--timeout', type=float, default=60,
+              help='Give up on a size after this many seconds.')
+@click.option('--csv', 'csv_file', type=click.File('w'),
+              help='Also write dimension,size,seconds,megabytes rows here.')
+def scaling(dimensions, sizes, repeat, timeout, csv_file):
+    if csv_file:
+        csv_file.write('dimension,size,seconds,megabytes\n')
+
+    for dimension in dimensions or DIMENSIONS:
+        rows = []
+
+        for size in sizes:
+            shape = {dimension: size}
+            status, value = serplint.run_isolated(measure, (shape, repeat),
+                                                  {}, timeout=timeout)
+
+            if status != 'done':
+                click.echo('{} {}: {}, stopping'.format(dimension, size,
+                                                        status))
+                break
+
+            rows.append((size,) + tuple(value))
+
+            if csv_file:
+                csv_file.write('{},{},{:.6f},{:.1f}\n'.format(
+                    dimension, size, *value))
+
+        if rows:
+            chart(dimension, rows)
+
+
+# pylint: disable=no-value-for-parameter
+if __name__ == '__main__':
+    scaling()
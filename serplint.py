@@ -2,15 +2,64 @@
 
 from __future__ import print_function
 
+import binascii
+import bisect
+import fnmatch
+import hashlib
+import io
+import json
+import multiprocessing
 import os
 import re
+import subprocess
 import sys
+import threading
+import time
+import traceback
 
-from collections import defaultdict, Iterable
+from collections import defaultdict, namedtuple, OrderedDict
 from contextlib import contextmanager
 
 import click
-import serpent
+import serplint_parser as syntax
+
+try:
+    import serpent
+except ImportError:
+    serpent = None
+
+try:
+    from collections.abc import Iterable
+except ImportError:
+    from collections import Iterable
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+try:
+    from configparser import RawConfigParser
+except ImportError:
+    from ConfigParser import RawConfigParser
+
+try:
+    import tomllib as toml
+except ImportError:
+    try:
+        import toml
+    except ImportError:
+        toml = None
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = (str, bytes)
 
 # def init():   executed upon contract creation, accepts no parameters
 # def shared(): executed before running init and user functions
@@ -19,16 +68,35 @@ import serpent
 # ensure things like self.controller are initialized?
 
 ASSIGNED_TO_ARGUMENT = 'E201'
+CODE_SIZE_BUDGET_EXCEEDED = 'W303'
+CODE_SIZE_GROWTH = 'W304'
 COMPILE_ERROR = 'E100'
+CONSTANT_EXPRESSION = 'W308'
+DEAD_METHOD = 'W204'
+GAS_THRESHOLD_EXCEEDED = 'W300'
+MEMORY_IN_LOOP = 'W309'
+INDEX_OUT_OF_BOUNDS = 'E203'
 INVALID_KEYWORD_ARGUMENT = 'E202'
+LINT_FAILED = 'E103'
+LINT_TIMEOUT = 'E102'
+MEMORY_LIMIT_EXCEEDED = 'E104'
+NEVER_LOGGED_EVENT = 'W207'
 PARSE_ERROR = 'E101'
+REPEATED_EXPRESSION = 'W311'
+REPEATED_STORAGE_READ = 'W302'
+STORAGE_ACCESS_IN_LOOP = 'W301'
+UNBOUNDED_LOOP = 'W306'
+UNBOUNDED_MEMORY = 'W310'
+UNBOUNDED_RECURSION = 'W307'
 UNDEFINED_VARIABLE = 'E200'
+UNREAD_DATA = 'W206'
 UNREFERENCED_ASSIGNMENT = 'W203'
 UNUSED_ARGUMENT = 'W202'
+UNUSED_MACRO = 'W205'
 
 
 def iterable(o):
-    return isinstance(o, Iterable) and not isinstance(o, basestring)
+    return isinstance(o, Iterable) and not isinstance(o, string_types)
 
 
 def flatten(l):
@@ -40,6 +108,30 @@ def flatten(l):
             yield el
 
 
+def normalize(node):
+    """
+    Convert serpent's AST into serplint_parser's nodes, so the checks see the
+    same objects whichever parser was used. Under Python 3 serpent's AST also
+    holds bytes and lazy `map` arguments, which become strings and lists.
+    """
+    val = node.val
+    filename = node.metadata.file
+
+    if isinstance(val, bytes) and not isinstance(val, str):
+        val = val.decode('utf-8')
+
+    if isinstance(filename, bytes) and not isinstance(filename, str):
+        filename = filename.decode('utf-8')
+
+    metadata = [filename, node.metadata.ln, node.metadata.ch]
+
+    if isinstance(node, serpent.Astnode):
+        return syntax.Astnode(val, [normalize(arg) for arg in node.args],
+                              metadata)
+
+    return syntax.Token(val, metadata)
+
+
 def fileno(file_or_fd):
     fd = getattr(file_or_fd, 'fileno', lambda: file_or_fd)()
 
@@ -78,10 +170,21 @@ def merged_stderr_stdout():  # $ exec 2>&1
     return stdout_redirected(to=sys.stdout, stdout=sys.stderr)
 
 
+RE_DIAGNOSTIC = re.compile(
+    r'^(?P<filename>.+):(?P<line>\d+):(?P<character>\d+) '
+    r'(?P<code>[EW]\d+) (?P<message>.*)$')
+RE_INCLUDE = re.compile(
+    r'\b(?:inset|import|create)\s*\(\s*[\'"](?P<path>[^\'"]+)[\'"]\s*\)')
 RE_EXCEPTION = re.compile(
     r'line (?P<line>\d+), char (?P<character>\d+)\): (?P<message>.*)$',
     re.IGNORECASE)
 
+RE_NUMBER = re.compile(r'\d+')
+RE_REFERENCE = re.compile(r'[a-z]', re.IGNORECASE)
+RE_SUPPRESSION = re.compile(r'#\s*serplint:\s*disable=(?P<codes>[\w\s,]+)',
+                            re.IGNORECASE)
+RE_SYMBOL = re.compile(r'"([^"]*)"')
+
 GLOBALS = [
     'block.coinbase',
     'block.difficulty',
@@ -119,6 +222,264 @@ BUILTIN_KEYWORD_ARGUMENTS = [
     'outitems',
 ]
 
+ASSIGNMENT_OPERATORS = ['=', '+=', '-=', '*=', '/=', '%=', '^=']
+
+CONTROL_FLOW = ['if', 'elif', 'else', 'while', 'for']
+
+LOOPS = ['while', 'for']
+
+# statements holding other statements
+BLOCKS = CONTROL_FLOW + ['seq', 'def', 'macro']
+
+# opcodes (with or without serpent's ~ prefix) that read the caller's input
+CALLDATA_OPCODES = ['calldatacopy', 'calldataload', 'calldatasize']
+
+# every def is in the contract's ABI, so only methods named as internal
+# helpers can be dead
+INTERNAL_PREFIX = '_'
+
+# for each dead code check: the kind of declaration, the summary entry that
+# records its uses, and the message
+DEAD_CODE = OrderedDict([
+    (DEAD_METHOD, ('def', 'calls', 'Method "{}" is never called')),
+    (UNUSED_MACRO, ('macro', 'macros', 'Macro "{}" is never used')),
+    (UNREAD_DATA, ('data', 'reads', 'Data "self.{}" is never read')),
+    (NEVER_LOGGED_EVENT, ('event', 'logs', 'Event "{}" is never logged')),
+])
+
+# how deeply expansions may themselves expand macros before giving up
+MAX_MACRO_DEPTH = 50
+
+# Static (base) gas costs per opcode, post EIP-150; dynamic components like
+# memory expansion, SHA3 word costs and value transfers are not included and
+# SSTORE is priced at its worst case (zero to non-zero)
+OPCODES = {
+    0x00: ('STOP', 0),
+    0x01: ('ADD', 3),
+    0x02: ('MUL', 5),
+    0x03: ('SUB', 3),
+    0x04: ('DIV', 5),
+    0x05: ('SDIV', 5),
+    0x06: ('MOD', 5),
+    0x07: ('SMOD', 5),
+    0x08: ('ADDMOD', 8),
+    0x09: ('MULMOD', 8),
+    0x0a: ('EXP', 10),
+    0x0b: ('SIGNEXTEND', 5),
+    0x10: ('LT', 3),
+    0x11: ('GT', 3),
+    0x12: ('SLT', 3),
+    0x13: ('SGT', 3),
+    0x14: ('EQ', 3),
+    0x15: ('ISZERO', 3),
+    0x16: ('AND', 3),
+    0x17: ('OR', 3),
+    0x18: ('XOR', 3),
+    0x19: ('NOT', 3),
+    0x1a: ('BYTE', 3),
+    0x20: ('SHA3', 30),
+    0x30: ('ADDRESS', 2),
+    0x31: ('BALANCE', 400),
+    0x32: ('ORIGIN', 2),
+    0x33: ('CALLER', 2),
+    0x34: ('CALLVALUE', 2),
+    0x35: ('CALLDATALOAD', 3),
+    0x36: ('CALLDATASIZE', 2),
+    0x37: ('CALLDATACOPY', 3),
+    0x38: ('CODESIZE', 2),
+    0x39: ('CODECOPY', 3),
+    0x3a: ('GASPRICE', 2),
+    0x3b: ('EXTCODESIZE', 700),
+    0x3c: ('EXTCODECOPY', 700),
+    0x40: ('BLOCKHASH', 20),
+    0x41: ('COINBASE', 2),
+    0x42: ('TIMESTAMP', 2),
+    0x43: ('NUMBER', 2),
+    0x44: ('DIFFICULTY', 2),
+    0x45: ('GASLIMIT', 2),
+    0x50: ('POP', 2),
+    0x51: ('MLOAD', 3),
+    0x52: ('MSTORE', 3),
+    0x53: ('MSTORE8', 3),
+    0x54: ('SLOAD', 200),
+    0x55: ('SSTORE', 20000),
+    0x56: ('JUMP', 8),
+    0x57: ('JUMPI', 10),
+    0x58: ('PC', 2),
+    0x59: ('MSIZE', 2),
+    0x5a: ('GAS', 2),
+    0x5b: ('JUMPDEST', 1),
+    0xa0: ('LOG0', 375),
+    0xa1: ('LOG1', 750),
+    0xa2: ('LOG2', 1125),
+    0xa3: ('LOG3', 1500),
+    0xa4: ('LOG4', 1875),
+    0xf0: ('CREATE', 32000),
+    0xf1: ('CALL', 700),
+    0xf2: ('CALLCODE', 700),
+    0xf3: ('RETURN', 0),
+    0xf4: ('DELEGATECALL', 700),
+    0xfe: ('INVALID', 0),
+    0xff: ('SUICIDE', 5000),
+}
+
+for width in range(1, 33):
+    OPCODES[0x5f + width] = ('PUSH{}'.format(width), 3)
+
+for position in range(1, 17):
+    OPCODES[0x7f + position] = ('DUP{}'.format(position), 3)
+    OPCODES[0x8f + position] = ('SWAP{}'.format(position), 3)
+
+OPCODE_GAS = dict(OPCODES.values())
+
+# EXP also costs this much per byte of its exponent (EIP-160)
+EXP_BYTE_GAS = 50
+
+# serpent's arithmetic operators and the opcodes they compile to; `/` and `%`
+# are signed, and `^` is exponentiation like `**`
+ARITHMETIC = {
+    '+': 'ADD',
+    '-': 'SUB',
+    '*': 'MUL',
+    '/': 'SDIV',
+    '%': 'SMOD',
+    '**': 'EXP',
+    '^': 'EXP',
+}
+
+EXPONENTIATION = ['**', '^']
+
+WORD = 2 ** 256
+
+# bytes serpent allocates for a length word and for each item
+MEMORY_ALLOCATIONS = {
+    'array': (32, 32),
+    'string': (32, 1),
+}
+
+# copies into memory taking (destination, source, size)
+MEMORY_COPIES = ['calldatacopy', 'codecopy', 'mcopy']
+
+# per word copied, and the identity precompile's base cost
+COPY_GAS = 3
+IDENTITY_GAS = 15
+
+BLOCK_GAS_LIMIT = 8000000
+
+# operators and functions that only depend on their arguments, and the
+# opcodes they (mostly) compile to
+PURE_OPCODES = dict(ARITHMETIC)
+PURE_OPCODES.update({
+    '<': 'SLT',
+    '>': 'SGT',
+    '<=': 'SGT',
+    '>=': 'SLT',
+    '==': 'EQ',
+    '!=': 'EQ',
+    '!': 'ISZERO',
+    '&': 'AND',
+    '|': 'OR',
+    'xor': 'XOR',
+    'addmod': 'ADDMOD',
+    'byte': 'BYTE',
+    'div': 'DIV',
+    'exp': 'EXP',
+    'mod': 'MOD',
+    'mulmod': 'MULMOD',
+    'sdiv': 'SDIV',
+    'sha3': 'SHA3',
+    'signextend': 'SIGNEXTEND',
+    'smod': 'SMOD',
+})
+
+# what doesn't change during a call
+ENVIRONMENT = {
+    'block.coinbase': 'COINBASE',
+    'block.difficulty': 'DIFFICULTY',
+    'block.gaslimit': 'GASLIMIT',
+    'block.number': 'NUMBER',
+    'block.timestamp': 'TIMESTAMP',
+    'msg.sender': 'CALLER',
+    'msg.value': 'CALLVALUE',
+    'tx.gasprice': 'GASPRICE',
+    'tx.origin': 'ORIGIN',
+}
+
+# how many bits environment values take (block numbers and timestamps fit
+# in 64 for a long while yet)
+ENVIRONMENT_BITS = {
+    'block.coinbase': 160,
+    'block.number': 64,
+    'block.timestamp': 64,
+    'msg.sender': 160,
+    'tx.origin': 160,
+}
+
+# operators whose result is 0 or 1
+BOOLEAN_OPERATORS = ['<', '>', '<=', '>=', '==', '!=', '!']
+
+# SHA3 also costs this much per word hashed
+SHA3_WORD_GAS = 6
+
+# pushing a variable's address and loading or storing it
+LOCAL_GAS = OPCODE_GAS['PUSH1'] + OPCODE_GAS['MLOAD']
+
+TERMINATING_OPCODES = ['JUMP', 'RETURN', 'STOP', 'SUICIDE', 'INVALID']
+
+# opcodes the serpent fork adds on top of the EVM's (see its opcodes.cpp)
+SERPENT_OPCODES = [
+    'CALLBLACKBOX',
+    'CALLSTATIC',
+    'MCOPY',
+    'RNGSEED',
+    'SLOADBYTES',
+    'SLOADBYTESEXT',
+    'SLOADEXT',
+    'SSIZE',
+    'SSIZEEXT',
+    'SSTOREBYTES',
+    'SSTOREBYTESEXT',
+    'SSTOREEXT',
+    'STATEROOT',
+    'TXEXECGAS',
+]
+
+# every opcode serpent accepts by (lowercase) name; PUSHn are only emitted
+OPCODE_NAMES = frozenset(
+    name.lower()
+    for name in [name for name, _ in OPCODES.values()] + SERPENT_OPCODES
+    if not name.startswith('PUSH'))
+
+# identifier classes (bit flags) kept by Names
+REFERENCE = 1  # may name a variable: starts with a letter
+CALLABLE = 2  # not a number, global, keyword or builtin
+OPCODE = 4
+GLOBAL = 8
+KEYWORD = 16
+BUILTIN = 32
+KEYWORD_ARGUMENT = 64
+
+# serpent can't bound loop trip counts, so the worst case assumes this many
+# iterations for every loop body (per level of nesting)
+DEFAULT_LOOP_ITERATIONS = 10
+
+PARSERS = ['serpent', 'builtin']
+DEFAULT_PARSER = 'serpent' if serpent else 'builtin'
+
+# the fast tier only parses and walks the tree (undefined names, argument
+# reassignment, keywords, unused names); the deep tier also compiles and runs
+# the dataflow, gas and code size analyses
+FAST_TIER = 'fast'
+DEEP_TIER = 'deep'
+TIERS = [FAST_TIER, DEEP_TIER]
+
+# what lint_file records per file for the whole run, in dicts passed as these
+# options, which workers send back
+COLLECTED = ['summaries', 'fingerprints', 'code_sizes', 'layouts']
+
+# how often a cancellable child process checks whether to give up
+CANCEL_POLL_SECONDS = 0.05
+
 
 class Token(object):
 
@@ -133,530 +494,4321 @@ class Token(object):
     def __eq__(self, y):
         return self.name == y.name and self.metadata.ln == y.metadata.ln
 
+    # Python 3 drops the default hash when __eq__ is defined
+    __hash__ = object.__hash__
 
-class Linter(object):
 
-    @staticmethod
-    def is_reference(value):
-        return re.match('^[a-z]', value, re.IGNORECASE)
+def node_key(node):
+    """
+    A string that is equal for structurally identical subtrees.
+    """
+    if isinstance(node, syntax.Astnode):
+        return '({} {})'.format(node.val,
+                                ' '.join(node_key(arg) for arg in node.args))
 
-    @staticmethod
-    def is_opcode(value):
-        return (re.match('^[^0-9]', value) and
-                value not in GLOBALS and
-                value not in KEYWORDS and
-                value not in BUILTINS)
+    return node.val
 
-    def get_scope(self, method_name, name):
-        if method_name in self.scope and name in self.scope[method_name]:
-            return self.scope[method_name][name]
 
-    def resolve_name(self, node, method_name):
-        if isinstance(node, str):
-            return node
+# operators written between their operands, for render
+INFIX_OPERATORS = (list(ARITHMETIC) + BOOLEAN_OPERATORS[:-1] +
+                   ASSIGNMENT_OPERATORS + ['and', 'or', 'xor', '&', '|'])
 
-        if isinstance(node, serpent.Astnode):
-            return self.resolve_access(node, method_name)
 
-        if isinstance(node, serpent.Token):
-            return node.val
+def render(node):
+    """
+    Serpent-like source for a node, to name macros by their pattern (an
+    operator macro's name alone would just be `+`).
+    """
+    if not isinstance(node, syntax.Astnode):
+        return node.val
 
-        return '__unknown__'
+    args = [render(arg) for arg in node.args]
 
-    def add_to_scope(self, method_name, token, variable_type):
-        name = self.resolve_name(token, method_name)
+    if node.val == '.':
+        return '.'.join(args)
 
-        if self.get_scope(method_name, name):
-            if self.get_scope(method_name, name)['type'] == 'argument':
-                self.log_message(
-                    token.metadata.ln,
-                    token.metadata.ch,
-                    ASSIGNED_TO_ARGUMENT,
-                    'Assigned a value to an argument "{}"'.format(name))
+    if node.val == 'access':
+        return '{}[{}]'.format(args[0], ']['.join(args[1:]))
 
-        self.scope[method_name][name] = {
-            'type': variable_type,
-            'accessed': False,
-            'token': token,
-        }
+    if node.val == 'array_lit':
+        return '[{}]'.format(', '.join(args))
 
-    def reposition(self, line, character):
-        """
-        Needed because of a bug in how the Serpent AST calculates offset (it
-        ignores starting whitespace)
-        """
-        match = re.match(r'(?P<space>\s+)', self.code_lines[line])
-        offset = 0
+    if node.val == 'fun':
+        return '{}({})'.format(args[0], ', '.join(args[1:]))
 
-        if match:
-            offset = len(match.group('space'))
+    if node.val in INFIX_OPERATORS and len(args) == 2:
+        return '{} {} {}'.format(args[0], node.val, args[1])
 
-        return (line + 1,
-                character + 1 + offset)
+    if node.val == '!' and len(args) == 1:
+        return '!' + args[0]
 
-    def check(self, token, method_name):
-        if not self.is_reference(token.name):
-            return
+    return '{}({})'.format(node.val, ', '.join(args))
 
-        self.checks.append((token, method_name))
 
-    def resolve_checks(self):
-        for token, method_name in self.checks:
-            if not self.in_scope(token.name, method_name):
-                self.log_message(
-                    token.metadata.ln,
-                    token.metadata.ch,
-                    UNDEFINED_VARIABLE,
-                    'Undefined variable "{}"'.format(token.name))
-            else:
-                scope = self.get_scope(method_name, token.name)
+def node_tokens(node):
+    if isinstance(node, syntax.Astnode):
+        for arg in node.args:
+            for token in node_tokens(arg):
+                yield token
+    else:
+        yield node
 
-                if scope:
-                    scope['accessed'] = True
 
-    def simple_traversal(self, nodes, method_name):
-        if not nodes:
-            return
+def contains_call(node):
+    return (isinstance(node, syntax.Astnode) and
+            (node.val in ('fun', 'call', 'send') or
+             any(contains_call(arg) for arg in node.args)))
 
-        for token in self.gather_tokens(nodes, method_name):
-            self.check(token, method_name)
 
-    def conditional_traversal(self, node, method_name):
-        """
-        For if and while statements.
-        """
-        condition = node.args[0]
+def literal_value(node):
+    """
+    The value of a decimal or hex number token, or None.
+    """
+    if not isinstance(node, syntax.Token):
+        return None
 
-        self.simple_traversal(condition, method_name)
+    try:
+        if node.val.isdigit():
+            value = int(node.val)
+        elif node.val.lower().startswith('0x'):
+            value = int(node.val, 16)
+        else:
+            return None
+    except ValueError:
+        return None
 
-        return node.args[1:]
+    return value if value < WORD else None
 
-    def deep_traversal(self, node, method_name):
-        return node.args
 
-    def assignment(self, node, method_name):
-        assignee = node.args[0]
-        assignee_name = self.resolve_name(node.args[0], method_name)
+def to_signed(value):
+    return value - WORD if value >= WORD // 2 else value
 
-        if self.is_reference(assignee_name):
-            if assignee_name in self.data:
-                self.add_to_scope(method_name, assignee, 'data_assignment')
-            else:
-                self.add_to_scope(method_name, assignee, 'assignment')
 
-        for token in self.gather_tokens(node.args[1:], method_name):
-            self.check(token, method_name)
+def arithmetic(operator, left, right):
+    """
+    What an arithmetic operator computes at runtime, on 256 bit words.
+    """
+    if operator == '+':
+        return (left + right) % WORD
 
-    def return_type(self, node, method_name):
-        return_value = node.args[0]
-        # return_type = node.args[1]
+    if operator == '-':
+        return (left - right) % WORD
 
-        self.simple_traversal(return_value, method_name)
+    if operator == '*':
+        return (left * right) % WORD
 
-    def resolve_access(self, node, method_name):
-        if isinstance(node, serpent.Token):
-            return node.val
+    if operator in EXPONENTIATION:
+        return pow(left, right, WORD)
 
-        if (node.val == 'access' and
-                len(node.args) > 1 and
-                self.is_reference(node.args[1].val)):
-            self.check(Token(self.resolve_access(node.args[1], method_name),
-                             node.args[1].metadata),
-                       method_name)
+    if not right:
+        return 0
 
-        if node.val == 'access':
-            return self.resolve_access(node.args[0], method_name)
+    left, right = to_signed(left), to_signed(right)
 
-        if node.val == '.':
-            return '.'.join(self.resolve_name(arg, method_name)
-                            for arg in node.args)
+    if operator == '/':
+        value = abs(left) // abs(right)
 
-        return node.args[0].val
+        if (left < 0) != (right < 0):
+            value = -value
+    else:
+        value = abs(left) % abs(right)
 
-    def resolve_argument(self, node):
-        if isinstance(node, serpent.Token) or not node.args:
-            return node
+        if left < 0:
+            value = -value
 
-        if node.args[0].val == ':':
-            return node.args[0].args[0]
+    return value % WORD
 
-        return node.args[0]
 
-    def define_data(self, node, method_name, prefix=None):
-        fun_node = None
+def overflows(operator, left, right):
+    """
+    Whether an arithmetic operator wraps around instead of computing its
+    exact value.
+    """
+    if operator == '+':
+        return left + right >= WORD
 
-        if node.val == 'fun':
-            fun_node = node
-        elif node.args[0].val == 'fun':
-            fun_node = node.args[0]
+    if operator == '-':
+        return left < right
 
-        if fun_node:
-            name = '{}.{}'.format(
-                prefix or 'self',
-                self.resolve_access(fun_node.args[0], method_name))
+    if operator == '*':
+        return left * right >= WORD
 
-            self.data.append(name)
+    if operator in EXPONENTIATION:
+        return left > 1 and (right >= 256 or left ** right >= WORD)
 
-            for field in fun_node.args[1:]:
-                if field.val == 'fun':
-                    self.define_data(field, method_name, prefix=name)
-                else:
-                    self.data.append('{}.{}'.format(
-                        name, self.resolve_access(field, method_name)))
+    return False
 
-            # self.structs[name] = node.args[0].args[1:]
-        else:
-            self.data.append('{}.{}'.format(
-                prefix or 'self',
-                self.resolve_access(node.args[0], method_name)))
 
-    def define_event(self, node, method_name):
-        self.events.append(node.args[0].val)
+def compile_time_value(node):
+    """
+    The value serpent's optimizer folds an expression to, or None if it is
+    left to run: only numbers are folded, and not into negative numbers or
+    through signed division of them.
+    """
+    if isinstance(node, syntax.Token):
+        return literal_value(node)
 
-    # def define_extern(self, node, method_name):
-    #     self.methods.append(node.args[0].val)
+    if node.val not in ARITHMETIC or len(node.args) != 2:
+        return None
 
-    def define_macro(self, node, method_name):
-        name = node.args[0].val
-        body = node.args[1]
+    left, right = [compile_time_value(arg) for arg in node.args]
 
-        self.macros.append(name)
+    if left is None or right is None:
+        return None
 
-        return [body]
+    if node.val == '-' and left < right:
+        return None
 
-    def define_method(self, node, method_name):
-        name = node.args[0].val
-        arguments = node.args[0].args
+    if node.val in ('/', '%') and (not right or left >= WORD // 2 or
+                                   right >= WORD // 2):
+        return None
 
-        self.methods.append('self.{}'.format(name))
+    return arithmetic(node.val, left, right)
 
-        for token in [self.resolve_argument(arg) for arg in arguments]:
-            self.add_to_scope(name, token, 'argument')
 
-        if node.args[1].val in self.mapping:
-            return [node.args[1]]
+def words(size):
+    return (size + 31) // 32
 
-        self.simple_traversal(node.args[1:], method_name)
 
-    def log(self, node, method_name):
-        """
-        Don't check the first argument (e.g. log(type = Name, ...) since the
-        compiler catches those.
-        """
-        self.simple_traversal(node.args[1:], method_name)
+def memory_gas(count):
+    """
+    The gas expanding memory to `count` words costs.
+    """
+    return 3 * count + count ** 2 // 512
 
-    def always_traverse(self, node, method_name):
-        return node.args
 
-    mapping = {
-        '+': simple_traversal,
-        '+=': simple_traversal,
+def memory_words(gas):
+    """
+    The most words of memory `gas` pays the expansion of.
+    """
+    return int(((9 + gas / 128.0) ** 0.5 - 3) * 256)
 
-        '-': simple_traversal,
-        '-=': simple_traversal,
 
-        '*': simple_traversal,
-        '**': simple_traversal,
-        '*=': simple_traversal,
+def constant_literal(value):
+    return str(value) if value < 2 ** 32 else '0x{:x}'.format(value)
 
-        '/': simple_traversal,
-        '/=': simple_traversal,
 
-        '%': simple_traversal,
-        '%=': simple_traversal,
+# what's known about a method's variables while checking its expressions
+MethodValues = namedtuple('MethodValues', ['constants', 'arrays', 'arguments',
+                                           'variables'])
 
-        '^=': simple_traversal,
+# whether an expression only reads variables, storage and the environment,
+# what it costs and which variables and storage it reads
+Expression = namedtuple('Expression', ['pure', 'gas', 'variables',
+                                       'storage'])
 
-        '!': simple_traversal,
+Diagnostic = namedtuple('Diagnostic', ['filename', 'line', 'character', 'code',
+                                       'message'])
 
-        '>': simple_traversal,
-        '<': simple_traversal,
 
-        '>=': simple_traversal,
-        '<=': simple_traversal,
+def format_diagnostic(diagnostic):
+    if diagnostic.code[0] == 'E':
+        formatted_code = click.style(diagnostic.code, fg='red')
+    else:
+        formatted_code = click.style(diagnostic.code, fg='yellow')
 
-        '==': simple_traversal,
-        '!=': simple_traversal,
+    return '{}:{}:{} {} {}'.format(diagnostic.filename,
+                                   diagnostic.line,
+                                   diagnostic.character,
+                                   formatted_code,
+                                   diagnostic.message)
 
-        'if': conditional_traversal,
-        'elif': conditional_traversal,
-        'else': deep_traversal,
 
-        'or': simple_traversal,
-        'and': simple_traversal,
+def read_baseline(path):
+    """
+    Read a baseline of {filename: {fingerprint: count}}.
+    """
+    if not path or not os.path.exists(path):
+        return {}
 
-        'while': conditional_traversal,
-        'for': conditional_traversal,
+    with open(path) as baseline_file:
+        return json.load(baseline_file)['files']
 
-        'return': simple_traversal,
-        '~return': simple_traversal,
 
-        ':': return_type,
-        '=': assignment,
+def write_baseline(path, baseline):
+    with open(path, 'w') as baseline_file:
+        json.dump({'version': 1, 'files': baseline}, baseline_file,
+                  indent=2, sort_keys=True)
 
-        'data': define_data,
-        'def': define_method,
-        'event': define_event,
-        'macro': define_macro,
-        # 'extern': define_extern,
 
-        'fun': simple_traversal,
-        'log': log,
-        'mcopy': simple_traversal,
+Instruction = namedtuple('Instruction', ['pc', 'name', 'argument', 'gas'])
 
-        'seq': always_traverse,
-    }
 
-    def in_scope(self, name, method_name):
-        if (name in self.scope[method_name] or
-                name in self.data or
-                name in self.events or
-                name in self.macros or
-                name in self.methods):
-            return True
+def disassemble(bytecode):
+    instructions = []
+    code = bytearray(bytecode)
+    pc = 0
 
-        if name in BUILTINS or name in GLOBALS:
-            return True
+    while pc < len(code):
+        name, gas = OPCODES.get(code[pc], ('UNKNOWN', 0))
+        argument = None
 
-        return False
+        if name.startswith('PUSH'):
+            width = int(name[4:])
+            argument = 0
 
-    def resolve_token(self, node, method_name):
-        if isinstance(node, serpent.Token):
-            return node.val
+            for byte in code[pc + 1:pc + 1 + width]:
+                argument = argument * 256 + byte
 
-        return self.resolve_access(node, method_name)
+            instructions.append(Instruction(pc, name, argument, gas))
+            pc += 1 + width
+        else:
+            instructions.append(Instruction(pc, name, argument, gas))
+            pc += 1
 
-    def gather_tokens(self, nodes, method_name):
-        if not nodes:
-            return []
+    return instructions
 
-        if not iterable(nodes):
-            nodes = [nodes]
 
-        collected_nodes = list(
-            flatten(self.traverse_tokens(node, method_name) for node in nodes))
+def split_contract(bytecode):
+    """
+    Split serpent's output into its init segment and its runtime segment,
+    using the `PUSH2 len DUP1 PUSH2 offset PUSH1 0 CODECOPY` prologue.
+    """
+    instructions = disassemble(bytecode)
 
-        if collected_nodes:
-            return set(pair for pair in collected_nodes if pair)
+    for i, instruction in enumerate(instructions):
+        if (instruction.name == 'CODECOPY' and i >= 4 and
+                instructions[i - 3].name == 'DUP1'):
+            length = instructions[i - 4].argument
+            offset = instructions[i - 2].argument
 
-        return []
+            init = [other for other in instructions
+                    if not offset <= other.pc < offset + length]
 
-    def traverse_tokens(self, node, method_name):
-        if node.val == '.':
-            return Token('.'.join(self.resolve_token(a, method_name)
-                                  for a in node.args), node.metadata)
+            return init, disassemble(bytecode[offset:offset + length])
 
-        if node.val == ':':
-            return self.traverse_tokens(node.args[0], method_name)
+    return instructions, []
 
-        if node.val == '=':
-            assignee = node.args[0]
-            value = node.args[1]
 
-            if assignee.val not in BUILTIN_KEYWORD_ARGUMENTS:
-                self.log_message(
-                    assignee.metadata.ln,
-                    assignee.metadata.ch,
-                    INVALID_KEYWORD_ARGUMENT,
-                    'Invalid keyword argument "{}"'.format(assignee.val))
+def method_ranges(runtime):
+    """
+    Find the `PUSH4 id DUP2 EQ ISZERO PUSH dest JUMPI` dispatch blocks that
+    serpent emits for each method, in source order, as (start, end) ranges.
+    """
+    ranges = []
 
-            return self.traverse_tokens(value, method_name)
+    for i, instruction in enumerate(runtime[:-5]):
+        names = [other.name for other in runtime[i:i + 6]]
 
-        if isinstance(node, serpent.Token):
-            return (Token(node.val, node.metadata)
-                    if self.is_reference(node.val)
-                    else None)
+        if (names[:4] == ['PUSH4', 'DUP2', 'EQ', 'ISZERO'] and
+                names[4].startswith('PUSH') and
+                names[5] == 'JUMPI'):
+            ranges.append((instruction.pc, runtime[i + 4].argument))
 
-        return [self.traverse_tokens(arg, method_name) for arg in node.args]
+    return ranges
 
-    def traverse(self, node, level=0, method_name=None):
-        if not isinstance(node, serpent.Astnode):
-            if isinstance(node, serpent.Token):
-                self.check(Token(node.val, node.metadata), method_name)
 
-            return
+def basic_blocks(instructions):
+    blocks = []
+    block = []
 
-        if self.debug:
-            click.echo('{}{} {}'.format(' ' * level, node.val,
-                                        '' if isinstance(node, serpent.Token)
-                                        else [n.val for n in node.args]))
+    for instruction in instructions:
+        if instruction.name == 'JUMPDEST' and block:
+            blocks.append(block)
+            block = []
 
-        if node.val == 'def':
-            method_name = node.args[0].val
+        block.append(instruction)
 
-        if (node.val not in self.mapping and
-                node.val not in self.macros + self.methods):
-            if self.is_opcode(node.val) and self.debug:
-                click.echo('{} unknown opcode {}'.format(node.metadata.ln + 1,
-                                                         node.val))
+        if (instruction.name in TERMINATING_OPCODES or
+                instruction.name == 'JUMPI'):
+            blocks.append(block)
+            block = []
 
-            return
+    if block:
+        blocks.append(block)
 
-        if node.val in self.mapping:
+    return blocks
+
+
+def instructions_size(instructions):
+    return sum(1 + int(instruction.name[4:])
+               if instruction.name.startswith('PUSH') else 1
+               for instruction in instructions)
+
+
+def estimate_gas(instructions, loop_iterations=DEFAULT_LOOP_ITERATIONS):
+    """
+    Estimate the most expensive path through a range of instructions, once
+    with every loop body taken a single time and once with loop bodies
+    taken `loop_iterations` times per level of nesting.
+    """
+    blocks = basic_blocks(instructions)
+
+    if not blocks:
+        return {'loop_free': 0, 'worst_case': 0, 'loops': 0}
+
+    index = dict((block[0].pc, i) for i, block in enumerate(blocks))
+    successors = defaultdict(list)
+    loops = []
+
+    for i, block in enumerate(blocks):
+        last = block[-1]
+
+        if last.name not in TERMINATING_OPCODES and i + 1 < len(blocks):
+            successors[i].append(i + 1)
+
+        if (last.name in ('JUMP', 'JUMPI') and len(block) > 1 and
+                block[-2].name.startswith('PUSH') and
+                block[-2].argument in index):
+            target = index[block[-2].argument]
+
+            if target <= i:
+                # continue past the loop as if it had exited normally
+                loops.append((target, i))
+                successors[i].append(i + 1)
+            else:
+                successors[i].append(target)
+
+    loop_free = [0] * len(blocks)
+    worst_case = [0] * len(blocks)
+
+    # forward edges only ever point at later blocks so this is a DAG
+    for i in reversed(range(len(blocks))):
+        cost = sum(instruction.gas for instruction in blocks[i])
+        depth = len([loop for loop in loops if loop[0] <= i <= loop[1]])
+
+        loop_free[i] = cost + max([loop_free[j] for j in successors[i]] or
+                                  [0])
+        worst_case[i] = (cost * loop_iterations ** depth +
+                         max([worst_case[j] for j in successors[i]] or [0]))
+
+    return {'loop_free': loop_free[0],
+            'worst_case': worst_case[0],
+            'loops': len(loops)}
+
+
+def to_bytes(text):
+    return text if isinstance(text, bytes) else text.encode('utf-8')
+
+
+def read_source(path):
+    # as the linter reads it, keeping \r\n line endings
+    with io.open(path, encoding='utf-8', newline='') as source:
+        return source.read()
+
+
+def artifact_key(code):
+    """
+    A hash of the code (or the file it names, as serpent accepts either) and
+    of every file it pulls in with inset, import or create, recursively,
+    resolved the way serpent resolves them: relative to the working
+    directory from source, and to the including file's directory from a
+    file. A file and its source read from its own directory hash the same.
+    """
+    digest = hashlib.sha256(to_bytes(serpent.VERSION if serpent else ''))
+    seen = set()
+
+    def add(source, root):
+        digest.update(to_bytes(source))
+
+        for match in RE_INCLUDE.finditer(source):
+            # as written, so the key doesn't depend on where it's read from
+            digest.update(to_bytes(match.group('path')))
+
+            path = os.path.join(root, match.group('path'))
+
+            if path in seen:
+                continue
+
+            seen.add(path)
+
+            if os.path.isfile(path):
+                add(read_source(path), os.path.dirname(path))
+            else:
+                digest.update(b'missing')
+
+    if not isinstance(code, str):
+        code = code.decode('utf-8')
+
+    if os.path.isfile(code):
+        add(read_source(code), os.path.dirname(code))
+    else:
+        add(code, '')
+
+    return digest.hexdigest()
+
+
+def artifact_path(cache_dir, key):
+    return os.path.join(cache_dir, key[:2], key + '.json')
+
+
+def read_artifact(cache_dir, key):
+    try:
+        with open(artifact_path(cache_dir, key)) as artifact_file:
+            return json.load(artifact_file)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def write_artifact(cache_dir, key, artifact):
+    path = artifact_path(cache_dir, key)
+    temporary = '{}.{}.tmp'.format(path, os.getpid())
+
+    try:
+        os.makedirs(os.path.dirname(path))
+    except OSError:
+        # it already exists (perhaps made by another process just now)
+        pass
+
+    with open(temporary, 'w') as artifact_file:
+        json.dump(artifact, artifact_file)
+
+    # atomic, so concurrent lints and test runs never read half a file
+    os.rename(temporary, path)
+
+
+def compile_cached(code, cache_dir, metrics=None):
+    """
+    serpent.compile and serpent.mk_full_signature through a content-addressed
+    cache in `cache_dir` shared by serplint and test harnesses, returning
+    (bytecode, signature). Like serpent, `code` may be source or a path.
+    Compile errors are raised, not cached.
+    """
+    key = artifact_key(code)
+    artifact = read_artifact(cache_dir, key)
+
+    if metrics:
+        metrics.increment('serplint_cache_requests',
+                          result='hit' if artifact else 'miss')
+
+    if artifact:
+        return (binascii.unhexlify(artifact['bytecode']),
+                artifact['signature'])
+
+    bytecode = serpent.compile(code)
+
+    try:
+        signature = serpent.mk_full_signature(code)
+    except Exception:  # pylint: disable=broad-except
+        signature = None
+
+    write_artifact(cache_dir, key, {
+        'bytecode': binascii.hexlify(bytecode).decode('ascii'),
+        'signature': signature,
+    })
+
+    return bytecode, signature
+
+
+def extern_methods(node):
+    """
+    The method names an extern declaration lists, from signatures like
+    `[ping:[int256]:int256]` or the older `[ping:i]` and `["ping:i"]`.
+    """
+    signatures = node.args[-1]
+
+    for signature in getattr(signatures, 'args', []):
+        while (isinstance(signature, syntax.Astnode) and
+               signature.val in ('::', ':')):
+            signature = signature.args[0]
+
+        if isinstance(signature, syntax.Token):
+            yield signature.val.strip('"\'').split(':')[0]
+
+
+class MacroExpander(object):
+    """
+    Expands untyped `macro` definitions the way serpent does: a macro's
+    pattern is matched structurally with `$name` tokens as wildcards, its
+    body is substituted and the result is expanded again. Expansions are
+    memoized by macro and by the shape of the arguments bound to it, so an
+    identical instance is only copied to its own call site rather than
+    matched and expanded again.
+
+    Typed macros, whose patterns match values of a `type` (like
+    `modint($x) + modint($y)`), depend on serpent's type inference and are
+    skipped.
+    """
+
+    def __init__(self):
+        self.macros = []
+        self.types = set()
+        self.typed = {}
+        self.memo = {}
+        self.sizes = {}
+
+        self.expansions = defaultdict(int)
+        self.call_sites = []
+
+    def define(self, node):
+        # macro(10) pattern: body gives the macro a priority
+        pattern, body = node.args[-2:]
+
+        self.macros.append((render(pattern), pattern, body))
+
+    def define_type(self, node):
+        self.types.add(node.args[0].val)
+
+    def uses_type(self, node):
+        return isinstance(node, syntax.Astnode) and (
+            node.val in self.types or
+            any(self.uses_type(arg) for arg in node.args))
+
+    def is_typed(self, index):
+        # types can be declared after the macros using them, so this is
+        # only worked out once expanding starts
+        if index not in self.typed:
+            self.typed[index] = self.uses_type(self.macros[index][1])
+
+        return self.typed[index]
+
+    def skipped(self):
+        """
+        The names of the typed macros, which aren't expanded.
+        """
+        return [name for index, (name, _, _) in enumerate(self.macros)
+                if self.is_typed(index)]
+
+    def match(self, pattern, node, bindings):
+        if isinstance(pattern, syntax.Token):
+            if pattern.val.startswith('$'):
+                if pattern.val in bindings:
+                    return node_key(bindings[pattern.val]) == node_key(node)
+
+                bindings[pattern.val] = node
+
+                return True
+
+            return (isinstance(node, syntax.Token) and
+                    node.val == pattern.val)
+
+        return (isinstance(node, syntax.Astnode) and
+                node.val == pattern.val and
+                len(node.args) == len(pattern.args) and
+                all(self.match(sub_pattern, arg, bindings)
+                    for sub_pattern, arg in zip(pattern.args, node.args)))
+
+    def substitute(self, body, bindings, metadata):
+        """
+        Copy a macro body with its `$name` tokens replaced, placing every new
+        node at the call site.
+        """
+        location = [metadata.file, metadata.ln, metadata.ch]
+
+        if isinstance(body, syntax.Token):
+            if body.val in bindings:
+                return bindings[body.val]
+
+            return syntax.Token(body.val, location)
+
+        node = syntax.Astnode(body.val, [], location)
+        node.args = [self.substitute(arg, bindings, metadata)
+                     for arg in body.args]
+
+        return node
+
+    @staticmethod
+    def preorder(node):
+        yield node
+
+        for arg in getattr(node, 'args', []):
+            for descendant in MacroExpander.preorder(arg):
+                yield descendant
+
+    def restamp(self, expansion, metadata, bindings):
+        """
+        Copy a memoized expansion to another call site: nodes from the
+        arguments bound at the first call move to the matching nodes of this
+        call's arguments and everything else to the call site.
+        """
+        tree, first_metadata, first_bindings = expansion
+        locations = {tuple(first_metadata.out()): metadata.out()}
+
+        for variable, value in first_bindings.items():
+            for first, node in zip(self.preorder(value),
+                                   self.preorder(bindings[variable])):
+                locations[tuple(first.metadata.out())] = node.metadata.out()
+
+        def copy(node):
+            location = locations.get(tuple(node.metadata.out()),
+                                     metadata.out())
+
+            if isinstance(node, syntax.Token):
+                return syntax.Token(node.val, location)
+
+            copied = syntax.Astnode(node.val, [], location)
+            copied.args = [copy(arg) for arg in node.args]
+
+            return copied
+
+        return copy(tree)
+
+    def expand(self, node, depth=0):
+        if depth > MAX_MACRO_DEPTH:
+            return node
+
+        for index, (name, pattern, body) in enumerate(self.macros):
+            bindings = {}
+
+            if self.is_typed(index) or not self.match(pattern, node,
+                                                      bindings):
+                continue
+
+            self.expansions[name] += 1
+
+            key = (index, tuple(sorted((variable, node_key(value))
+                                       for variable, value
+                                       in bindings.items())))
+
+            if key in self.memo:
+                # the memoized tree belongs to the first call site, so each
+                # later call gets a copy placed where it is
+                expanded = self.restamp(self.memo[key], node.metadata,
+                                        bindings)
+            else:
+                expanded = self.expand(
+                    self.substitute(body, bindings, node.metadata),
+                    depth + 1)
+                self.memo[key] = (expanded, node.metadata, bindings)
+
+            if depth == 0:
+                self.call_sites.append((node.metadata, name,
+                                        self.size(expanded)))
+
+            return expanded
+
+        if not isinstance(node, syntax.Astnode) or node.val == 'macro':
+            return node
+
+        # don't expand the name and arguments of a method or declaration
+        skip = 1 if node.val in ('def', 'data', 'event') else 0
+        args = node.args[:skip] + [self.expand(arg, depth)
+                                   for arg in node.args[skip:]]
+
+        if all(arg is original for arg, original in zip(args, node.args)):
+            return node
+
+        expanded = syntax.Astnode(
+            node.val, [],
+            [node.metadata.file, node.metadata.ln, node.metadata.ch])
+        expanded.args = args
+
+        return expanded
+
+    def size(self, node):
+        """
+        The number of nodes in an expanded tree, counting each shared subtree
+        once per use but only walking it once.
+        """
+        if id(node) not in self.sizes:
+            self.sizes[id(node)] = 1 + sum(
+                self.size(arg) for arg in getattr(node, 'args', []))
+
+        return self.sizes[id(node)]
+
+
+class Subexpressions(object):
+    """
+    Hash-conses expression trees: structurally identical subtrees get the
+    same number, and what they read and cost is worked out once per number.
+    A node's key is its value and its arguments' numbers, so numbering a
+    tree is linear in its size.
+    """
+
+    def __init__(self, storage_name, data):
+        self.storage_name = storage_name
+        self.data = data
+
+        self.numbers = {}
+        self.expressions = []
+        self.nodes = {}
+
+    def number(self, node):
+        # expanded macros share subtrees
+        if id(node) in self.nodes:
+            return self.nodes[id(node)]
+
+        if isinstance(node, syntax.Astnode):
+            args = [self.number(arg) for arg in node.args]
+            key = (node.val, tuple(args))
+        else:
+            args = []
+            key = node.val
+
+        if key not in self.numbers:
+            self.numbers[key] = len(self.expressions)
+            self.expressions.append(self.describe(
+                node, [self.expressions[arg] for arg in args]))
+
+        self.nodes[id(node)] = self.numbers[key]
+
+        return self.numbers[key]
+
+    def describe(self, node, args):
+        if isinstance(node, syntax.Token):
+            if literal_value(node) is not None:
+                return Expression(True, OPCODE_GAS['PUSH1'], frozenset(),
+                                  frozenset())
+
+            return Expression(True, LOCAL_GAS, frozenset([node.val]),
+                              frozenset())
+
+        if node.val in ('.', 'access'):
+            name = self.storage_name(node)
+
+            if name in self.data:
+                # the names aren't evaluated, and the struct or array the
+                # item is in costs nothing more to read than the item
+                evaluated = [(arg, original) for index, (arg, original)
+                             in enumerate(zip(args, node.args))
+                             if isinstance(original, syntax.Astnode) or
+                             node.val == 'access' and index]
+                args = [arg for arg, _ in evaluated]
+
+                return Expression(
+                    all(arg.pure for arg in args),
+                    OPCODE_GAS['SLOAD'] + sum(
+                        arg.gas for arg, original in evaluated
+                        if original is not node.args[0]),
+                    frozenset().union(*[arg.variables for arg in args]),
+                    frozenset([name]).union(*[arg.storage for arg in args]))
+
+            if name in ENVIRONMENT:
+                return Expression(True, OPCODE_GAS[ENVIRONMENT[name]],
+                                  frozenset(), frozenset())
+
+        if node.val == 'access' and isinstance(node.args[0], syntax.Token):
+            # an item of a memory array
+            gas = (OPCODE_GAS['MUL'] + OPCODE_GAS['ADD'] +
+                   OPCODE_GAS['MLOAD'])
+        elif node.val == ':' and isinstance(node.args[0], syntax.Token):
+            # a memory array passed whole, like sha3(x:arr)
+            args = args[:1]
+            gas = 0
+        elif node.val in PURE_OPCODES:
+            gas = OPCODE_GAS[PURE_OPCODES[node.val]]
+
+            if node.val == 'sha3':
+                gas += SHA3_WORD_GAS
+        else:
+            return Expression(False, 0, frozenset(), frozenset())
+
+        return Expression(all(arg.pure for arg in args),
+                          gas + sum(arg.gas for arg in args),
+                          frozenset().union(*[arg.variables for arg in args]),
+                          frozenset().union(*[arg.storage for arg in args]))
+
+
+METRICS = {
+    'serplint_cache_requests': ('counter',
+                                'Artifact cache lookups, by result'),
+    'serplint_diagnostics': ('counter', 'Diagnostics reported, by code'),
+    'serplint_files_linted': ('counter', 'Files linted'),
+    'serplint_lint_seconds': ('histogram', 'Time spent linting a file'),
+    'serplint_phase_seconds': ('histogram',
+                               'Time spent in each phase of linting'),
+}
+
+METRICS_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                   10.0]
+
+OPENMETRICS_CONTENT_TYPE = ('application/openmetrics-text; version=1.0.0; '
+                            'charset=utf-8')
+
+
+def metric_labels(labels, **extra):
+    labels = sorted(labels + tuple(extra.items()))
+
+    if not labels:
+        return ''
+
+    return '{{{}}}'.format(','.join('{}="{}"'.format(name, value)
+                                    for name, value in labels))
+
+
+class NullTimer(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics(object):
+    """
+    Counters and histograms for the lint pipeline, rendered as OpenMetrics
+    text. Pass one to Linter (or lint_source) to collect them; without one
+    nothing is measured.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        self.counters = defaultdict(int)
+        # {(name, labels): [bucket counts..., sum, count]}
+        self.histograms = {}
+
+    def __getstate__(self):
+        # sent back from isolated workers, which can't pickle the lock
+        return {'counters': dict(self.counters),
+                'histograms': self.histograms}
+
+    def __setstate__(self, state):
+        self.__init__()
+
+        self.counters.update(state['counters'])
+        self.histograms = state['histograms']
+
+    def increment(self, name, value=1, **labels):
+        with self.lock:
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+
+        with self.lock:
+            histogram = self.histograms.setdefault(
+                key, [0] * len(METRICS_BUCKETS) + [0.0, 0])
+
+            for i, bucket in enumerate(METRICS_BUCKETS):
+                if value <= bucket:
+                    histogram[i] += 1
+
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.time()
+
+        try:
+            yield
+        finally:
+            self.observe(name, time.time() - started, **labels)
+
+    def merge(self, other):
+        with self.lock:
+            for key, value in other.counters.items():
+                self.counters[key] += value
+
+            for key, other_histogram in other.histograms.items():
+                histogram = self.histograms.setdefault(
+                    key, [0] * len(other_histogram))
+
+                for i, value in enumerate(other_histogram):
+                    histogram[i] += value
+
+    def render(self):
+        lines = []
+
+        with self.lock:
+            for name, (metric_type, description) in sorted(METRICS.items()):
+                counters = sorted((labels, value) for (metric, labels), value
+                                  in self.counters.items() if metric == name)
+                histograms = sorted(
+                    (labels, histogram) for (metric, labels), histogram
+                    in self.histograms.items() if metric == name)
+
+                if not counters and not histograms:
+                    continue
+
+                lines.append('# TYPE {} {}'.format(name, metric_type))
+                lines.append('# HELP {} {}'.format(name, description))
+
+                for labels, value in counters:
+                    lines.append('{}_total{} {}'.format(
+                        name, metric_labels(labels), repr(value)))
+
+                for labels, histogram in histograms:
+                    for bucket, count in zip(METRICS_BUCKETS, histogram):
+                        lines.append('{}_bucket{} {}'.format(
+                            name, metric_labels(labels, le=repr(bucket)),
+                            count))
+
+                    lines.append('{}_bucket{} {}'.format(
+                        name, metric_labels(labels, le='+Inf'),
+                        histogram[-1]))
+                    lines.append('{}_sum{} {}'.format(
+                        name, metric_labels(labels), repr(histogram[-2])))
+                    lines.append('{}_count{} {}'.format(
+                        name, metric_labels(labels), histogram[-1]))
+
+        lines.append('# EOF')
+
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """
+        Write the metrics to a textfile, replacing it atomically so a
+        collector never reads a partial file.
+        """
+        temporary = '{}.{}.tmp'.format(path, os.getpid())
+
+        with open(temporary, 'w') as metrics_file:
+            metrics_file.write(self.render())
+
+        os.rename(temporary, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """
+        Serve the metrics over HTTP from a daemon thread, returning the server
+        (call its shutdown() to stop).
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):  # pylint: disable=invalid-name
+                body = metrics.render().encode('utf-8')
+
+                self.send_response(200)
+                self.send_header('Content-Type', OPENMETRICS_CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        server = HTTPServer((host, port), Handler)
+
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+
+        return server
+
+
+class Names(dict):
+    """
+    Identifier classes by name, classifying each distinct identifier once
+    instead of every time a token with that name is visited.
+    """
+
+    @staticmethod
+    def classify(name):
+        classes = 0
+
+        if RE_REFERENCE.match(name):
+            classes |= REFERENCE
+
+        if name in GLOBALS:
+            classes |= GLOBAL
+
+        if name in KEYWORDS:
+            classes |= KEYWORD
+
+        if name in BUILTINS:
+            classes |= BUILTIN
+
+        if name in BUILTIN_KEYWORD_ARGUMENTS:
+            classes |= KEYWORD_ARGUMENT
+
+        if name in OPCODE_NAMES:
+            classes |= OPCODE
+
+        if (name and name[0] not in '0123456789' and
+                not classes & (GLOBAL | KEYWORD | BUILTIN)):
+            classes |= CALLABLE
+
+        return classes
+
+    def __missing__(self, name):
+        classes = self[name] = self.classify(name)
+
+        return classes
+
+
+class Linter(object):
+
+    def is_reference(self, value):
+        return self.names[value] & REFERENCE
+
+    def is_callable(self, value):
+        return self.names[value] & CALLABLE
+
+    def is_opcode(self, value):
+        return self.names[value] & OPCODE
+
+    def get_scope(self, method_name, name):
+        if method_name in self.scope and name in self.scope[method_name]:
+            return self.scope[method_name][name]
+
+    def resolve_name(self, node, method_name):
+        if isinstance(node, str):
+            return node
+
+        if isinstance(node, syntax.Astnode):
+            return self.resolve_access(node, method_name)
+
+        if isinstance(node, syntax.Token):
+            return node.val
+
+        return '__unknown__'
+
+    def add_to_scope(self, method_name, token, variable_type):
+        name = self.resolve_name(token, method_name)
+
+        if self.get_scope(method_name, name):
+            if self.get_scope(method_name, name)['type'] == 'argument':
+                self.log_message(
+                    token.metadata.ln,
+                    token.metadata.ch,
+                    ASSIGNED_TO_ARGUMENT,
+                    'Assigned a value to an argument "{}"'.format(name))
+
+        self.scope[method_name][name] = {
+            'type': variable_type,
+            'accessed': False,
+            'token': token,
+        }
+
+    def reposition(self, line, character):
+        """
+        Needed because of a bug in how the Serpent AST calculates offset (it
+        ignores starting whitespace)
+        """
+        offset = self.indentation[line]
+
+        return (line + 1,
+                character + 1 + offset)
+
+    def index_source(self):
+        """
+        A single pass over the source that records each line's indentation
+        and the codes disabled by `# serplint: disable=CODE,...` comments. A
+        comment on a `def` line applies to the whole method, anywhere else it
+        applies to its own line.
+        """
+        self.indentation = []
+        self.line_suppressions = {}
+        self.method_suppressions = []
+
+        method = None
+
+        for number, line in enumerate(self.code_lines, 1):
+            stripped = line.lstrip()
+            indentation = len(line) - len(stripped)
+
+            self.indentation.append(indentation)
+
+            if (method and stripped and not stripped.startswith('#') and
+                    indentation <= method[1]):
+                self.method_suppressions.append(
+                    (method[0], method[3], method[2]))
+                method = None
+
+            if method:
+                method[3] = number
+
+            match = RE_SUPPRESSION.search(line)
+
+            if not match:
+                continue
+
+            codes = frozenset(code.strip().upper()
+                              for code in match.group('codes').split(',')
+                              if code.strip())
+
+            if stripped.startswith('def '):
+                # [first line, indentation, codes, last line]
+                method = [number, indentation, codes, number]
+            else:
+                self.line_suppressions[number] = codes
+
+        if method:
+            self.method_suppressions.append((method[0], method[3], method[2]))
+
+        self.method_suppression_starts = [
+            start for start, end, codes in self.method_suppressions]
+
+    def suppressed(self, diagnostic):
+        line = int(diagnostic.line)
+        codes = self.line_suppressions.get(line, frozenset()) | self.disable
+
+        index = bisect.bisect_right(self.method_suppression_starts, line) - 1
+
+        if index >= 0 and line <= self.method_suppressions[index][1]:
+            codes = codes | self.method_suppressions[index][2]
+
+        return diagnostic.code in codes or 'ALL' in codes
+
+    def check(self, token, method_name):
+        # other files' code is checked when they're linted themselves
+        if token.metadata.file != 'main' or not self.is_reference(token.name):
+            return
+
+        self.checks.append((token, method_name))
+
+    def resolve_checks(self):
+        for token, method_name in self.checks:
+            if not self.in_scope(token.name, method_name):
+                self.log_message(
+                    token.metadata.ln,
+                    token.metadata.ch,
+                    UNDEFINED_VARIABLE,
+                    'Undefined variable "{}"'.format(token.name))
+            else:
+                scope = self.get_scope(method_name, token.name)
+
+                if scope:
+                    scope['accessed'] = True
+
+    def simple_traversal(self, nodes, method_name):
+        if not nodes:
+            return
+
+        for token in self.gather_tokens(nodes, method_name):
+            self.check(token, method_name)
+
+    def conditional_traversal(self, node, method_name):
+        """
+        For if and while statements.
+        """
+        condition = node.args[0]
+
+        self.simple_traversal(condition, method_name)
+
+        return node.args[1:]
+
+    def deep_traversal(self, node, method_name):
+        return node.args
+
+    def assignment(self, node, method_name):
+        assignee = node.args[0]
+        assignee_name = self.resolve_name(node.args[0], method_name)
+
+        if self.is_reference(assignee_name):
+            if assignee_name in self.data:
+                self.add_to_scope(method_name, assignee, 'data_assignment')
+            else:
+                self.add_to_scope(method_name, assignee, 'assignment')
+
+        for token in self.gather_tokens(node.args[1:], method_name):
+            self.check(token, method_name)
+
+    def return_type(self, node, method_name):
+        return_value = node.args[0]
+        # return_type = node.args[1]
+
+        self.simple_traversal(return_value, method_name)
+
+    def resolve_access(self, node, method_name):
+        if isinstance(node, syntax.Token):
+            return node.val
+
+        if (node.val == 'access' and
+                len(node.args) > 1 and
+                self.is_reference(node.args[1].val)):
+            self.check(Token(self.resolve_access(node.args[1], method_name),
+                             node.args[1].metadata),
+                       method_name)
+
+        if node.val == 'access':
+            return self.resolve_access(node.args[0], method_name)
+
+        if node.val == '.':
+            return '.'.join(self.resolve_name(arg, method_name)
+                            for arg in node.args)
+
+        return node.args[0].val
+
+    def resolve_argument(self, node):
+        if isinstance(node, syntax.Token) or not node.args:
+            return node
+
+        if node.args[0].val == ':':
+            return node.args[0].args[0]
+
+        return node.args[0]
+
+    def define_data(self, node, method_name, prefix=None):
+        fun_node = None
+
+        if node.val == 'fun':
+            fun_node = node
+        elif node.args[0].val == 'fun':
+            fun_node = node.args[0]
+
+        if fun_node:
+            name = '{}.{}'.format(
+                prefix or 'self',
+                self.resolve_access(fun_node.args[0], method_name))
+
+            self.data.append(name)
+
+            for field in fun_node.args[1:]:
+                if field.val == 'fun':
+                    self.define_data(field, method_name, prefix=name)
+                else:
+                    self.data.append('{}.{}'.format(
+                        name, self.resolve_access(field, method_name)))
+
+            # self.structs[name] = node.args[0].args[1:]
+        else:
+            self.data.append('{}.{}'.format(
+                prefix or 'self',
+                self.resolve_access(node.args[0], method_name)))
+
+    def define_event(self, node, method_name):
+        self.events.append(node.args[0].val)
+
+    # def define_extern(self, node, method_name):
+    #     self.methods.append(node.args[0].val)
+
+    def define_macro(self, node, method_name):
+        name = node.args[0].val
+        body = node.args[1]
+
+        self.macros.append(name)
+        self.macro_metadata.append((render(node.args[0]), node.metadata))
+        self.expander.define(node)
+
+        return [body]
+
+    def define_type(self, node, method_name):
+        self.expander.define_type(node)
+
+    def define_method(self, node, method_name):
+        name = node.args[0].val
+        arguments = node.args[0].args
+
+        self.methods.append('self.{}'.format(name))
+        self.method_metadata[name] = node.args[0].metadata
+
+        for token in [self.resolve_argument(arg) for arg in arguments]:
+            self.add_to_scope(name, token, 'argument')
+
+        if node.args[1].val in self.mapping:
+            return [node.args[1]]
+
+        self.simple_traversal(node.args[1:], method_name)
+
+    def log(self, node, method_name):
+        """
+        Don't check the first argument (e.g. log(type = Name, ...) since the
+        compiler catches those.
+        """
+        self.simple_traversal(node.args[1:], method_name)
+
+    def always_traverse(self, node, method_name):
+        return node.args
+
+    def declare_included(self, node, method_name):
+        """
+        Declare what an inset file defines without checking its code, whose
+        diagnostics belong to that file.
+        """
+        if node.val in ('data', 'event', 'macro', 'type'):
+            self.mapping[node.val](self, node, method_name)
+        elif node.val == 'def':
+            self.methods.append('self.{}'.format(node.args[0].val))
+
+    def own_code(self, node):
+        """
+        `node` without the statements inset from other files, apart from
+        their data and event declarations.
+        """
+        if not isinstance(node, syntax.Astnode) or node.val != 'seq':
+            return node
+
+        # a seq takes its first statement's position, which can be inset
+        return syntax.Astnode('seq', [
+            self.own_code(arg) for arg in node.args
+            if arg.metadata.file == 'main' or
+            arg.val in ('seq', 'data', 'event')
+        ], node.metadata.out())
+
+    mapping = {
+        '+': simple_traversal,
+        '+=': simple_traversal,
+
+        '-': simple_traversal,
+        '-=': simple_traversal,
+
+        '*': simple_traversal,
+        '**': simple_traversal,
+        '^': simple_traversal,
+        '*=': simple_traversal,
+
+        '/': simple_traversal,
+        '/=': simple_traversal,
+
+        '%': simple_traversal,
+        '%=': simple_traversal,
+
+        '^=': simple_traversal,
+
+        '!': simple_traversal,
+
+        '>': simple_traversal,
+        '<': simple_traversal,
+
+        '>=': simple_traversal,
+        '<=': simple_traversal,
+
+        '==': simple_traversal,
+        '!=': simple_traversal,
+
+        'if': conditional_traversal,
+        'elif': conditional_traversal,
+        'else': deep_traversal,
+
+        'or': simple_traversal,
+        'and': simple_traversal,
+
+        'while': conditional_traversal,
+        'for': conditional_traversal,
+
+        'return': simple_traversal,
+        '~return': simple_traversal,
+
+        ':': return_type,
+        '=': assignment,
+
+        'data': define_data,
+        'def': define_method,
+        'event': define_event,
+        'macro': define_macro,
+        'type': define_type,
+        # 'extern': define_extern,
+
+        'fun': simple_traversal,
+        'log': log,
+        'mcopy': simple_traversal,
+
+        'seq': always_traverse,
+    }
+
+    def split_methods(self):
+        """
+        Map each method to its instructions in the compiled contract.
+        """
+        init, runtime = split_contract(self.bytecode)
+        ranges = method_ranges(runtime)
+        methods = OrderedDict()
+
+        # init, shared and any aren't dispatched by method ID
+        names = [name for name in self.method_metadata
+                 if name not in ('init', 'shared', 'any')]
+
+        if len(ranges) != len(names):
+            if self.debug:
+                click.echo('found {} dispatch blocks for {} methods'.format(
+                    len(ranges), len(names)))
+
+            return methods
+
+        if 'init' in self.method_metadata:
+            methods['init'] = init
+
+        for name, (start, end) in zip(names, ranges):
+            methods[name] = [instruction for instruction in runtime
+                             if start <= instruction.pc < end]
+
+        return methods
+
+    def estimate_method_gas(self, methods):
+        for name, instructions in methods.items():
+            self.gas[name] = estimate_gas(instructions, self.loop_iterations)
+
+        if not self.gas_threshold:
+            return
+
+        for name, gas in self.gas.items():
+            if gas['worst_case'] > self.gas_threshold:
+                self.log_message(
+                    self.method_metadata[name].ln,
+                    self.method_metadata[name].ch,
+                    GAS_THRESHOLD_EXCEEDED,
+                    'Method "{}" may use up to {} gas ({} without loops)'
+                    .format(name, gas['worst_case'], gas['loop_free']))
+
+    def macro_body_lines(self, code_lines, line):
+        """
+        The source lines of the indented body of the macro defined on `line`.
+        """
+        if line >= len(code_lines):
+            return []
+
+        header = code_lines[line]
+
+        if not header.split('#')[0].rstrip().endswith(':'):
+            return []
+
+        indent = len(header) - len(header.lstrip())
+        lines = []
+
+        for number in range(line + 1, len(code_lines)):
+            stripped = code_lines[number].strip()
+
+            if not stripped or stripped.startswith('#'):
+                continue
+
+            if (len(code_lines[number]) -
+                    len(code_lines[number].lstrip())) <= indent:
+                break
+
+            lines.append(number)
+
+        return lines
+
+    def inline_inset(self, filename, included_lines):
+        """
+        This file's lines with its `inset` of `filename` replaced by
+        `included_lines`, and the line they start on, or (None, None) if it
+        doesn't inset the file itself.
+        """
+        code_lines = list(self.code_lines)
+
+        for number, line in enumerate(code_lines):
+            match = RE_INCLUDE.search(line)
+
+            if (match and match.group(0).startswith('inset') and
+                    os.path.normpath(match.group('path')) ==
+                    os.path.normpath(filename)):
+                indent = line[:len(line) - len(line.lstrip())]
+                code_lines[number:number + 1] = [
+                    indent + included for included in included_lines]
+
+                return code_lines, number
+
+        return None, None
+
+    def measure_macro_size(self, metadata):
+        """
+        Recompile with the macro's body replaced by `0`; the difference in size
+        is what its expansions (including any macros it expands) cost. A
+        macro from a file this one insets is measured with that file inlined,
+        so it counts towards this file.
+        """
+        if metadata.file == 'main':
+            code_lines = list(self.code_lines)
+            lines = self.macro_body_lines(code_lines, metadata.ln)
+            offset = 0
+        else:
+            try:
+                included_lines = read_source(metadata.file).splitlines()
+            except (IOError, OSError, UnicodeDecodeError):
+                return
+
+            lines = self.macro_body_lines(included_lines, metadata.ln)
+            code_lines, offset = self.inline_inset(metadata.file,
+                                                   included_lines)
+
+            if code_lines is None:
+                return
+
+        if not lines:
+            return
+
+        lines = [line + offset for line in lines]
+        first = code_lines[lines[0]]
+
+        code_lines[lines[0]] = first[:len(first) - len(first.lstrip())] + '0'
+
+        for line in lines[1:]:
+            code_lines[line] = ''
+
+        try:
+            with stdout_redirected(), merged_stderr_stdout():
+                bytecode = serpent.compile('\n'.join(code_lines))
+        except Exception:
+            return
+
+        return self.code_size['total'] - len(bytearray(bytecode))
+
+    def measure_code_size(self, methods):
+        init, runtime = split_contract(self.bytecode)
+
+        self.code_size['total'] = len(bytearray(self.bytecode))
+        self.code_size['runtime'] = instructions_size(runtime)
+
+        for name, instructions in methods.items():
+            self.code_size['methods'][name] = instructions_size(instructions)
+
+        if self.measure_macros:
+            for name, metadata in self.macro_metadata:
+                size = self.measure_macro_size(metadata)
+
+                if size is not None:
+                    self.code_size['macros'][name] = (
+                        self.code_size['macros'].get(name, 0) + size)
+
+        if (self.size_budget and
+                self.code_size['runtime'] > self.size_budget):
+            self.log_message(
+                1, 0,
+                CODE_SIZE_BUDGET_EXCEEDED,
+                'Contract code is {} bytes, over the budget of {} bytes'
+                .format(self.code_size['runtime'], self.size_budget),
+                reposition=False)
+
+        if (self.size_baseline and self.size_growth is not None and
+                self.size_baseline.get('runtime')):
+            previous = self.size_baseline['runtime']
+            growth = 100.0 * (self.code_size['runtime'] - previous) / previous
+
+            if growth > self.size_growth:
+                self.log_message(
+                    1, 0,
+                    CODE_SIZE_GROWTH,
+                    'Contract code grew {:.1f}% from {} to {} bytes'.format(
+                        growth, previous, self.code_size['runtime']),
+                    reposition=False)
+
+    def storage_name(self, node):
+        """
+        The `self.*` data name that a node refers to, ignoring array indices.
+        """
+        if isinstance(node, syntax.Token):
+            return node.val
+
+        if node.val == '.':
+            names = [self.storage_name(arg) for arg in node.args]
+
+            if None not in names:
+                return '.'.join(names)
+        elif node.val == 'access':
+            return self.storage_name(node.args[0])
+
+    def storage_accesses(self, node):
+        """
+        Yield (key, name, node, is_write) for each storage access in `node`,
+        in evaluation order.
+        """
+        if not isinstance(node, syntax.Astnode):
+            return
+
+        if node.val in ASSIGNMENT_OPERATORS:
+            target = node.args[0]
+
+            for access in self.storage_accesses(node.args[1]):
+                yield access
+
+            if (isinstance(target, syntax.Astnode) and
+                    self.storage_name(target) in self.data):
+                for access in self.storage_accesses(target):
+                    # the indices of the target, not the target itself
+                    if access[2] is not target:
+                        yield access
+
+                key = node_key(target)
+                name = self.storage_name(target)
+
+                if node.val != '=':
+                    yield key, name, target, False
+
+                yield key, name, target, True
+
+            return
+
+        name = self.storage_name(node)
+
+        if node.val in ('.', 'access') and name in self.data:
+            yield node_key(node), name, node, False
+
+            for arg in node.args[1:] if node.val == 'access' else []:
+                for access in self.storage_accesses(arg):
+                    yield access
+
+            if node.val == '.':
+                for access in self.storage_accesses(node.args[0]):
+                    if self.storage_name(access[2]) != access[1]:
+                        yield access
+
+            return
+
+        for arg in node.args:
+            for access in self.storage_accesses(arg):
+                yield access
+
+    def check_loop_storage(self, node):
+        """
+        Storage accesses in a loop whose slot doesn't change between iterations
+        can be read into a local before the loop and written back after it,
+        unless the loop also writes other slots of the same data (which might
+        alias it). Loops that call other methods or contracts are skipped
+        since those calls may read or write the same storage.
+        """
+        if contains_call(node):
+            return
+
+        assigned = set(
+            statement.args[0].val
+            for statement in [node] + list(self.descendants(node))
+            if (statement.val in ASSIGNMENT_OPERATORS and
+                isinstance(statement.args[0], syntax.Token)))
+
+        accesses = list(self.storage_accesses(node))
+        written = defaultdict(set)
+
+        for key, name, access, is_write in accesses:
+            if is_write:
+                written[name].add(key)
+
+        for key, name, access, is_write in accesses:
+            if any(token.val in assigned for token in node_tokens(access)):
+                continue
+
+            if written[name] - set([key]):
+                continue
+
+            if is_write:
+                message = ('Storage write to "{}" inside a loop could be '
+                           'kept in a local and stored after the loop')
+            else:
+                message = ('Storage read of "{}" inside a loop could be '
+                           'hoisted into a local')
+
+            self.log_message(access.metadata.ln,
+                             access.metadata.ch,
+                             STORAGE_ACCESS_IN_LOOP,
+                             message.format(name))
+
+    def check_block_storage(self, statements):
+        """
+        Report storage slots read more than once in a run of statements with
+        no control flow, calls or writes to the same data in between.
+        """
+        reads = {}
+
+        for statement in statements:
+            if not isinstance(statement, syntax.Astnode):
+                continue
+
+            if statement.val in ('def', 'macro', 'else'):
+                expressions = []
+            elif statement.val in CONTROL_FLOW:
+                expressions = statement.args[:1]
+            else:
+                expressions = [statement]
+
+            for expression in expressions:
+                for key, name, access, is_write in self.storage_accesses(
+                        expression):
+                    if is_write:
+                        for other in list(reads):
+                            if reads[other] == name:
+                                del reads[other]
+                    elif key in reads:
+                        self.log_message(
+                            access.metadata.ln,
+                            access.metadata.ch,
+                            REPEATED_STORAGE_READ,
+                            'Storage slot "{}" is read more than once; '
+                            'read it into a local'.format(name))
+                    else:
+                        reads[key] = name
+
+            if (statement.val in CONTROL_FLOW + ['def', 'macro'] or
+                    contains_call(statement)):
+                reads = {}
+
+    def check_subexpressions(self, contract_ast):
+        self.subexpressions = Subexpressions(self.storage_name, set(self.data))
+
+        for node in ([contract_ast] +
+                     list(self.contract_descendants(contract_ast))):
+            if not isinstance(node, syntax.Astnode):
+                continue
+
+            if node.val == 'seq':
+                self.check_block_expressions(node.args)
+            elif node.val in CONTROL_FLOW + ['def']:
+                # single statement bodies aren't wrapped in a seq
+                self.check_block_expressions(
+                    [arg for arg in node.args[1:]
+                     if isinstance(arg, syntax.Astnode) and
+                     arg.val != 'seq'])
+
+    def written(self, statement):
+        """
+        The variables and storage a statement assigns to.
+        """
+        variables, storage = set(), set()
+
+        for node in ([statement] +
+                     list(self.contract_descendants(statement))):
+            if (not isinstance(node, syntax.Astnode) or
+                    node.val not in ASSIGNMENT_OPERATORS + ['with']):
+                continue
+
+            target = node.args[0]
+            name = self.storage_name(target)
+
+            if name in self.data:
+                storage.add(name)
+                continue
+
+            # an item of a memory array changes the array
+            while target.val == 'access':
+                target = target.args[0]
+
+            variables.add(target.val)
+
+        return variables, storage
+
+    def check_block_expressions(self, statements):
+        """
+        Report expressions that only read variables, storage and the
+        environment, and that are evaluated again in a run of statements
+        with no control flow, calls or writes to what they read in between,
+        when keeping them in a local would be cheaper.
+        """
+        seen = {}
+
+        def check(node):
+            # nested blocks are checked on their own, and import and create
+            # pull in other contracts
+            if (not isinstance(node, syntax.Astnode) or
+                    node.val in BLOCKS + ['import', 'create']):
+                return
+
+            number = self.subexpressions.number(node)
+            expression = self.subexpressions.expressions[number]
+
+            # storing it and loading it twice costs less than computing it
+            # twice
+            if (expression.pure and expression.gas > 3 * LOCAL_GAS and
+                    self.storage_name(node) not in self.data):
+                if number in seen:
+                    line, _ = self.reposition(seen[number].metadata.ln,
+                                              seen[number].metadata.ch)
+
+                    self.log_message(
+                        node.metadata.ln,
+                        node.metadata.ch,
+                        REPEATED_EXPRESSION,
+                        'Expression was already computed on line {}; keep '
+                        'it in a local (~{} gas)'.format(line,
+                                                          expression.gas))
+
+                    return
+
+                seen[number] = node
+
+            if node.val in ASSIGNMENT_OPERATORS:
+                check(node.args[1])
+
+                # only the indices of what's assigned to are evaluated
+                target = node.args[0]
+
+                while (isinstance(target, syntax.Astnode) and
+                       target.val == 'access'):
+                    for index in target.args[1:]:
+                        check(index)
+
+                    target = target.args[0]
+            else:
+                for arg in node.args:
+                    check(arg)
+
+        for statement in statements:
+            if not isinstance(statement, syntax.Astnode):
+                continue
+
+            if statement.val in ('def', 'macro', 'else'):
+                expressions = []
+            elif statement.val in CONTROL_FLOW:
+                expressions = statement.args[:1]
+            else:
+                expressions = [statement]
+
+            for expression in expressions:
+                check(expression)
+
+            if (statement.val in BLOCKS or contains_call(statement) or
+                    any(node.val in BLOCKS for node
+                        in self.contract_descendants(statement))):
+                seen = {}
+                continue
+
+            variables, storage = self.written(statement)
+
+            for number in list(seen):
+                expression = self.subexpressions.expressions[number]
+
+                if (expression.variables & variables or
+                        expression.storage & storage):
+                    del seen[number]
+
+    def descendants(self, node):
+        if not isinstance(node, syntax.Astnode):
+            return
+
+        for arg in node.args:
+            yield arg
+
+            for descendant in self.descendants(arg):
+                yield descendant
+
+    def contract_descendants(self, node):
+        """
+        descendants, leaving out the contracts import and create pull in.
+        """
+        if not isinstance(node, syntax.Astnode):
+            return
+
+        for arg in node.args:
+            if arg.val in ('import', 'create'):
+                continue
+
+            yield arg
+
+            for descendant in self.contract_descendants(arg):
+                yield descendant
+
+    def check_storage(self, contract_ast):
+        for node in [contract_ast] + list(self.descendants(contract_ast)):
+            if not isinstance(node, syntax.Astnode):
+                continue
+
+            if node.val in LOOPS:
+                self.check_loop_storage(node)
+
+            if node.val == 'seq':
+                statements = node.args
+            elif node.val in CONTROL_FLOW + ['def']:
+                # single statement bodies aren't wrapped in a seq
+                statements = [arg for arg in node.args[1:]
+                              if isinstance(arg, syntax.Astnode) and
+                              arg.val != 'seq']
+            else:
+                continue
+
+            self.check_block_storage(statements)
+
+    @staticmethod
+    def declared_name(node):
+        """
+        The name a def, macro, data or event declares (for data, the field
+        itself rather than its struct members), as its token.
+        """
+        name = node.args[0]
+
+        while (isinstance(name, syntax.Astnode) and
+               name.val in ('fun', 'access', ':')):
+            name = name.args[0]
+
+        if isinstance(name, syntax.Astnode):
+            # a call-like declaration: def f(x), macro f($x), event E(x)
+            return syntax.Token(name.val, name.metadata.out())
+
+        return name
+
+    def summary_digest(self):
+        """
+        A hash of what a file's summary depends on: its code and the files it
+        includes, serplint itself and the codes disabled for it.
+        """
+        return hashlib.sha1('\0'.join(
+            [artifact_key(self.code), linter_digest()] +
+            sorted(self.disable)).encode('utf-8')).hexdigest()
+
+    def update_summary(self, contract_ast):
+        """
+        Summarize the file for the dead code checks, unless the summary kept
+        from an earlier run is still current.
+        """
+        filename = os.path.normpath(self.filename)
+        digest = self.summary_digest()
+
+        if self.summaries.get(filename, {}).get('digest') != digest:
+            self.summaries[filename] = dict(self.summarize(contract_ast),
+                                            digest=digest)
+
+    def summarize(self, contract_ast):
+        """
+        What this file declares and what it uses, for the project-wide dead
+        code checks in `dead_code`; JSON-serializable so it can be kept
+        between runs. Files pulled in with inset share the contract, so
+        their declarations count as used by what the includer uses.
+        """
+        includes = set()
+        declared = []
+        calls = defaultdict(set)
+        uses = {'macros': set(), 'reads': set(), 'logs': set()}
+        externs = set()
+        macros = set(self.macros)
+
+        def read_target(node, method):
+            # only the indices of what's assigned to are read
+            if node.val == 'access':
+                read_target(node.args[0], method)
+                walk(node.args[1:], method)
+            elif node.val == '.' and not self.is_self(node):
+                read_target(node.args[0], method)
+            elif not isinstance(node, syntax.Token) and node.val != '.':
+                walk([node], method)
+
+        def walk(nodes, method):
+            for node in nodes:
+                if node.val in macros:
+                    uses['macros'].add(node.val)
+
+                if isinstance(node, syntax.Token):
+                    continue
+
+                if node.metadata.file != 'main':
+                    includes.add(os.path.normpath(node.metadata.file))
+
+                if node.val in ('import', 'create', 'data', 'event'):
+                    # import and create contracts are deployed on their own
+                    continue
+
+                if node.val == 'extern':
+                    externs.update(extern_methods(node))
+                elif node.val == 'def':
+                    walk(node.args[1:], node.args[0].val)
+                elif node.val == 'macro':
+                    walk(node.args[1:], method)
+                elif node.val == '=':
+                    read_target(node.args[0], method)
+                    walk(node.args[1:], method)
+                elif node.val == 'fun' and node.args[0].val == '.':
+                    callee = node.args[0]
+
+                    if self.is_self(callee):
+                        calls[method or ''].add(callee.args[1].val)
+                    else:
+                        externs.add(callee.args[-1].val)
+                        walk(callee.args[:-1], method)
+
+                    walk(node.args[1:], method)
+                elif node.val == '.' and self.is_self(node):
+                    uses['reads'].add(node.args[1].val)
+                else:
+                    if node.val == 'log':
+                        uses['logs'].update(
+                            arg.args[1].val for arg in node.args
+                            if arg.val == '=' and arg.args[0].val == 'type')
+
+                    walk(node.args, method)
+
+        walk([contract_ast], None)
+
+        # a file of one declaration (a macro library, say) has it as its root
+        for node in [contract_ast] + list(self.descendants(contract_ast)):
+            if (not isinstance(node, syntax.Astnode) or
+                    node.metadata.file != 'main'):
+                continue
+
+            for code, (kind, _, message) in DEAD_CODE.items():
+                if node.val != kind:
+                    continue
+
+                name = self.declared_name(node)
+
+                if kind == 'def':
+                    if not is_internal(name.val):
+                        continue
+                elif not self.is_reference(name.val):
+                    continue
+
+                line, character = self.reposition(name.metadata.ln,
+                                                  name.metadata.ch)
+
+                diagnostic = Diagnostic(self.filename, line, character,
+                                        code, message.format(name.val))
+
+                # fingerprinted here, where the methods are known, so the
+                # project's diagnostics can be matched against a baseline
+                if not self.suppressed(diagnostic):
+                    declared.append([code, line, character, name.val,
+                                     self.fingerprint(diagnostic)])
+
+        summary = dict((entry, sorted(names))
+                       for entry, names in uses.items())
+        summary.update({
+            'includes': sorted(includes),
+            'declared': declared,
+            'calls': dict((method, sorted(names))
+                          for method, names in calls.items()),
+            'externs': sorted(externs),
+        })
+
+        return summary
+
+    @staticmethod
+    def is_self(node):
+        return (node.val == '.' and len(node.args) == 2 and
+                node.args[0].val == 'self' and
+                isinstance(node.args[1], syntax.Token))
+
+    def growth_sources(self, node, arguments, variables):
+        """
+        What a value can grow with: the storage, arguments and call data it
+        is computed from, directly or through the local `variables`.
+        """
+        if isinstance(node, syntax.Token):
+            return (variables.get(node.val, set()) |
+                    (set([node.val]) if node.val in arguments else set()))
+
+        sources = set()
+        name = self.storage_name(node)
+
+        if node.val in ('.', 'access') and name in self.data:
+            sources.add(name)
+
+            # what's read depends on the indices too
+            for arg in node.args[1:] if node.val == 'access' else []:
+                sources |= self.growth_sources(arg, arguments, variables)
+
+            return sources
+
+        if node.val.lstrip('~') in CALLDATA_OPCODES:
+            sources.add('calldata')
+
+        for arg in node.args:
+            sources |= self.growth_sources(arg, arguments, variables)
+
+        return sources
+
+    def variable_sources(self, nodes, arguments):
+        """
+        growth_sources for each local variable assigned in `nodes`, however
+        many assignments it takes to reach it.
+        """
+        assignments = [
+            node for node in flatten([node] +
+                                     list(self.contract_descendants(node))
+                                     for node in nodes)
+            if (isinstance(node, syntax.Astnode) and
+                node.val in ASSIGNMENT_OPERATORS + ['with'] and
+                isinstance(node.args[0], syntax.Token))]
+
+        variables = defaultdict(set)
+        changed = True
+
+        while changed:
+            changed = False
+
+            for node in assignments:
+                sources = self.growth_sources(node.args[1], arguments,
+                                              variables)
+
+                if not sources <= variables[node.args[0].val]:
+                    variables[node.args[0].val] |= sources
+                    changed = True
+
+        return variables
+
+    def check_iteration(self, contract_ast):
+        """
+        Loops whose trip count, and recursion whose depth, grow with storage,
+        arguments or call data: callers can grow those until the method no
+        longer fits in a block's gas limit.
+        """
+        calls = OrderedDict()
+
+        for node in ([contract_ast] +
+                     list(self.contract_descendants(contract_ast))):
+            if not isinstance(node, syntax.Astnode) or node.val != 'def':
+                continue
+
+            name = node.args[0].val
+            arguments = set(self.resolve_argument(arg).val
+                            for arg in node.args[0].args)
+            body = node.args[1:]
+            variables = self.variable_sources(body, arguments)
+            growth = set()
+
+            calls[name] = []
+
+            for descendant in flatten(
+                    list(self.contract_descendants(statement))
+                    for statement in body):
+                if not isinstance(descendant, syntax.Astnode):
+                    continue
+
+                if descendant.val in LOOPS:
+                    sources = self.growth_sources(descendant.args[0],
+                                                  arguments, variables)
+
+                    if sources:
+                        growth |= sources
+
+                        self.log_message(
+                            descendant.metadata.ln,
+                            descendant.metadata.ch,
+                            UNBOUNDED_LOOP,
+                            'Loop iterations grow with {}'.format(
+                                ', '.join(sorted(sources))))
+                elif (descendant.val == 'fun' and
+                        self.is_self(descendant.args[0])):
+                    calls[name].append((
+                        descendant.args[0].args[1].val,
+                        self.growth_sources(descendant, arguments,
+                                            variables)))
+
+            self.growth[name] = growth
+
+        for name, method_calls in calls.items():
+            if name not in self.callees(name, calls):
+                continue
+
+            # the arguments of the calls that lead back here
+            sources = set()
+
+            for callee, call_sources in method_calls:
+                if callee == name or name in self.callees(callee, calls):
+                    sources |= call_sources
+
+            self.growth[name] |= sources
+            self.log_message(
+                self.method_metadata[name].ln,
+                self.method_metadata[name].ch,
+                UNBOUNDED_RECURSION,
+                'Method "{}" recurses{}'.format(
+                    name, '; depth grows with {}'.format(
+                        ', '.join(sorted(sources))) if sources else ''))
+
+    @staticmethod
+    def callees(name, calls):
+        """
+        Every method `name` calls, directly or not.
+        """
+        reachable = set()
+        pending = [name]
+
+        while pending:
+            for callee, _ in calls.get(pending.pop(), []):
+                if callee not in reachable:
+                    reachable.add(callee)
+                    pending.append(callee)
+
+        return reachable
+
+    def constant_value(self, node, constants, wrap=True):
+        """
+        The value an arithmetic expression always has at runtime, given the
+        values of the `constants` variables, or None. Without `wrap` it is
+        also None where the expression wraps around 256 bits.
+        """
+        if isinstance(node, syntax.Token):
+            value = literal_value(node)
+
+            return constants.get(node.val) if value is None else value
+
+        if node.val not in ARITHMETIC or len(node.args) != 2:
+            return None
+
+        left, right = [self.constant_value(arg, constants, wrap)
+                       for arg in node.args]
+
+        if left is None or right is None:
+            return None
+
+        if not wrap and overflows(node.val, left, right):
+            return None
+
+        return arithmetic(node.val, left, right)
+
+    def runtime_gas(self, node, constants):
+        """
+        The gas computing a constant expression takes, with what serpent
+        folds pushed as a single number and variables loaded from memory.
+        """
+        if compile_time_value(node) is not None:
+            return OPCODE_GAS['PUSH1']
+
+        if isinstance(node, syntax.Token):
+            return OPCODE_GAS['PUSH1'] + OPCODE_GAS['MLOAD']
+
+        gas = OPCODE_GAS[ARITHMETIC[node.val]] + sum(
+            self.runtime_gas(arg, constants) for arg in node.args)
+
+        if node.val in EXPONENTIATION:
+            exponent = self.constant_value(node.args[1], constants)
+            gas += EXP_BYTE_GAS * ((exponent.bit_length() + 7) // 8)
+
+        return gas
+
+    def declare_arrays(self, node, prefix, sizes):
+        """
+        Record the size of each dimension of the arrays a data declaration
+        declares (None where it is unbounded) and return its name.
+        """
+        if node.val == 'fun':
+            name = self.declare_arrays(node.args[0], prefix, sizes)
+
+            for field in node.args[1:]:
+                self.declare_arrays(field, name, sizes)
+
+            return name
+
+        dimensions = []
+
+        while node.val == 'access':
+            size = node.args[1] if len(node.args) == 2 else None
+
+            if size is not None and self.expander.macros:
+                size = self.expander.expand(size)
+
+            # a size that wraps around is as good as unbounded
+            dimensions.append(None if size is None else
+                              self.constant_value(size, {}, wrap=False))
+            node = node.args[0]
+
+        name = '{}.{}'.format(prefix, node.val)
+
+        if dimensions:
+            sizes[name] = dimensions[::-1]
+
+        return name
+
+    def check_bounds(self, node, constants, arrays):
+        """
+        Report constant indices past the end of a fixed size storage or
+        memory array, and return what's left to check: the array itself and
+        its indices.
+        """
+        indices = []
+
+        while node.val == 'access':
+            indices.append(node.args[1:])
+            node = node.args[0]
+
+        name = self.storage_name(node)
+
+        for index, size in zip(indices[::-1], arrays.get(name, [])):
+            if size is None or len(index) != 1:
+                continue
+
+            value = self.constant_value(index[0], constants)
+
+            if value is not None and value >= size:
+                self.log_message(
+                    index[0].metadata.ln,
+                    index[0].metadata.ch,
+                    INDEX_OUT_OF_BOUNDS,
+                    'Index {} is out of bounds for "{}" of size {}'.format(
+                        constant_literal(value), name, size))
+
+        return [node] + list(flatten(indices))
+
+    def check_memory(self, node, values, loops):
+        """
+        Memory is never freed and its expansion cost is quadratic, so report
+        allocations and copies in loops, with the gas they take over
+        `--loop-iterations` iterations when their size is constant, and
+        those whose size callers control.
+        """
+        name = node.val.lstrip('~')
+        allocation = name in MEMORY_ALLOCATIONS
+
+        if len(node.args) != (1 if allocation else 3):
+            return
+
+        size = node.args[0] if allocation else node.args[2]
+        sources = self.growth_sources(size, values.arguments,
+                                      values.variables)
+
+        if sources:
+            threshold = self.gas_threshold or BLOCK_GAS_LIMIT
+
+            self.log_message(
+                node.metadata.ln,
+                node.metadata.ch,
+                UNBOUNDED_MEMORY,
+                'Size of {}() grows with {}; past {} KB of memory its '
+                'expansion alone costs more than {} gas'.format(
+                    name, ', '.join(sorted(sources)),
+                    memory_words(threshold) * 32 // 1024, threshold))
+
+        if not loops:
+            return
+
+        constant = self.constant_value(size, values.constants)
+        iterations = self.loop_iterations ** loops
+
+        if constant is None:
+            message = ('{}() in a loop {} memory of a size only known at '
+                       'runtime on every iteration').format(
+                           name, 'allocates' if allocation else 'copies')
+        elif allocation:
+            header, item = MEMORY_ALLOCATIONS[name]
+            size = header + item * constant
+
+            message = ('{}() in a loop allocates {} bytes on every iteration; '
+                       'over {} iterations expanding memory costs ~{} gas'
+                       .format(name, size, iterations,
+                               memory_gas(iterations * words(size))))
+        else:
+            gas = COPY_GAS * words(constant)
+
+            if name == 'mcopy':
+                # serpent copies memory by calling the identity precompile
+                gas += OPCODE_GAS['CALL'] + IDENTITY_GAS
+
+            message = ('{}() in a loop copies {} bytes on every iteration; '
+                       'over {} iterations that costs ~{} gas'.format(
+                           name, constant, iterations, gas * iterations))
+
+        self.log_message(node.metadata.ln, node.metadata.ch, MEMORY_IN_LOOP,
+                         message)
+
+    def check_expression(self, node, values, loops=0):
+        if not isinstance(node, syntax.Astnode):
+            return
+
+        if node.val in ('def', 'macro', 'import', 'create'):
+            return
+
+        if node.val in ARITHMETIC:
+            value = self.constant_value(node, values.constants)
+            negative = (node.val == '-' and
+                        compile_time_value(node.args[0]) == 0 and
+                        compile_time_value(node.args[1]) is not None)
+
+            if (value is not None and not negative and
+                    compile_time_value(node) is None):
+                saved = ((self.runtime_gas(node, values.constants) -
+                          OPCODE_GAS['PUSH1']) *
+                         self.loop_iterations ** loops)
+
+                self.log_message(
+                    node.metadata.ln,
+                    node.metadata.ch,
+                    CONSTANT_EXPRESSION,
+                    'Expression is always {} but is computed at runtime; '
+                    'writing the constant saves ~{} gas{}'.format(
+                        constant_literal(value), saved,
+                        ' over {} loop iterations'.format(
+                            self.loop_iterations ** loops) if loops else ''))
+
+                return
+
+        args = node.args
+
+        if node.val == 'access':
+            args = self.check_bounds(node, values.constants, values.arrays)
+        elif node.val in LOOPS:
+            loops += 1
+        elif (node.val.lstrip('~') in MEMORY_ALLOCATIONS or
+              node.val.lstrip('~') in MEMORY_COPIES):
+            self.check_memory(node, values, loops)
+
+        for arg in args:
+            self.check_expression(arg, values, loops)
+
+    def check_expressions(self, contract_ast):
+        """
+        Propagate the values of variables assigned a constant exactly once,
+        then report arithmetic in methods that always has the same value but
+        that serpent leaves to run (it only folds numbers), constant indices
+        past the end of fixed size arrays and costly memory use.
+        """
+        nodes = [contract_ast] + list(self.contract_descendants(contract_ast))
+        sizes = {}
+
+        for node in nodes:
+            if isinstance(node, syntax.Astnode) and node.val == 'data':
+                self.declare_arrays(node.args[0], 'self', sizes)
+
+        # code outside methods runs before every call
+        statements = (contract_ast.args if contract_ast.val == 'seq'
+                      else [contract_ast])
+        prelude = [statement for statement in statements
+                   if statement.val not in ('def', 'macro')]
+
+        for method in nodes:
+            if not isinstance(method, syntax.Astnode) or method.val != 'def':
+                continue
+
+            body = method.args[1:]
+
+            if len(body) == 1 and body[0].val == 'seq':
+                body = body[0].args
+
+            arguments = set(self.resolve_argument(argument).val
+                            for argument in method.args[0].args)
+            assigned = defaultdict(int)
+
+            for node in flatten([node] + list(self.contract_descendants(node))
+                                for node in prelude + body):
+                if not isinstance(node, syntax.Astnode):
+                    continue
+
+                if (node.val in ASSIGNMENT_OPERATORS + ['with'] and
+                        isinstance(node.args[0], syntax.Token)):
+                    assigned[node.args[0].val] += 1
+                elif node.val == 'ref':
+                    # its memory can be written through the reference
+                    assigned[node.args[0].val] += 2
+
+            for argument in arguments:
+                assigned[argument] += 2
+
+            values = MethodValues({}, dict(sizes), arguments,
+                                  self.variable_sources(body, arguments))
+            constants, arrays = values.constants, values.arrays
+
+            for index, statement in enumerate(prelude + body):
+                if index >= len(prelude):
+                    self.check_expression(statement, values)
+
+                if (statement.val != '=' or
+                        not isinstance(statement.args[0], syntax.Token) or
+                        assigned[statement.args[0].val] != 1):
+                    continue
+
+                name, value = statement.args
+                constant = self.constant_value(value, constants)
+
+                if constant is not None:
+                    constants[name.val] = constant
+                elif (value.val == 'array' and len(value.args) == 1 and
+                        self.constant_value(value.args[0], constants)
+                        is not None):
+                    arrays[name.val] = [
+                        self.constant_value(value.args[0], constants)]
+
+    def data_slots(self, node, prefix, start, fields):
+        """
+        Lay out a data declaration the way serpent does from slot `start`
+        (None once it's under an unbounded array, whose items are hashed),
+        adding it and its struct members to `fields`, and return the number
+        of slots it takes.
+        """
+        members = []
+
+        if node.val == 'fun':
+            members = node.args[1:]
+            node = node.args[0]
+        elif isinstance(node, syntax.Astnode) and node.val != 'access':
+            # the older `data name(a, b)` struct
+            members = node.args
+
+        sizes = []
+
+        while node.val == 'access':
+            size = node.args[1] if len(node.args) == 2 else None
+
+            if size is not None and self.expander.macros:
+                size = self.expander.expand(size)
+
+            sizes.append(None if size is None else
+                         self.constant_value(size, {}))
+            node = node.args[0]
+
+        if None in sizes:
+            start = None
+
+        field = OrderedDict([
+            ('name', '{}.{}'.format(prefix, node.val)),
+            ('slot', start),
+            ('slots', 0),
+            ('bits', None),
+            ('scalar', not members and not sizes),
+            ('written_by', []),
+        ])
+        fields.append(field)
+
+        entry = 0 if members else 1
+
+        for member in members:
+            entry += self.data_slots(
+                member, field['name'],
+                None if start is None else start + entry, fields)
+
+        if start is not None:
+            field['slots'] = entry
+
+            for size in sizes:
+                field['slots'] *= size
+
+        return field['slots']
+
+    def value_bits(self, node):
+        """
+        How many bits a value written to storage can need, if fewer than
+        256.
+        """
+        value = self.constant_value(node, {})
+
+        if value is not None:
+            return max(1, value.bit_length())
+
+        if not isinstance(node, syntax.Astnode):
+            return 256
+
+        if node.val in BOOLEAN_OPERATORS:
+            return 1
+
+        if node.val == '.':
+            return ENVIRONMENT_BITS.get(self.storage_name(node), 256)
+
+        if node.val == 'create':
+            return 160
+
+        if len(node.args) != 2:
+            return 256
+
+        bound = self.constant_value(node.args[1], {})
+
+        if not bound:
+            return 256
+
+        if node.val == 'mod':
+            return max(1, (bound - 1).bit_length())
+
+        if node.val == '&':
+            return max(1, bound.bit_length())
+
+        # `block.number / 1000` drops the low bits
+        if node.val == '/':
+            return max(1, self.value_bits(node.args[0]) -
+                       bound.bit_length() + 1)
+
+        return 256
+
+    def storage_layout(self, contract_ast):
+        """
+        The slots each data declaration takes, how wide the values written
+        to each scalar field are and which methods write it, and the small
+        fields always written together that could be packed into one slot.
+        """
+        nodes = [contract_ast] + list(self.contract_descendants(contract_ast))
+        fields = []
+        start = 0
+
+        for node in nodes:
+            if isinstance(node, syntax.Astnode) and node.val == 'data':
+                start += self.data_slots(node.args[0], 'self', start, fields)
+
+        by_name = dict((field['name'], field) for field in fields)
+        method = ''
+
+        for node in nodes:
+            if not isinstance(node, syntax.Astnode):
+                continue
+
+            if node.val == 'def':
+                method = node.args[0].val
+
+            if node.val not in ASSIGNMENT_OPERATORS:
+                continue
+
+            field = by_name.get(self.storage_name(node.args[0]))
+
+            if not field:
+                continue
+
+            # `self.x += 1` can count up to anything
+            bits = (self.value_bits(node.args[1]) if node.val == '='
+                    else 256)
+            field['bits'] = max(field['bits'] or 0, bits)
+
+            if method not in field['written_by']:
+                field['written_by'].append(method)
+
+        # fields of the same struct (or the contract) written by the same
+        # methods, packed first-fit in declaration order
+        groups = OrderedDict()
+
+        for field in fields:
+            if field['scalar'] and field['written_by'] and field['bits'] < 256:
+                key = (field['name'].rsplit('.', 1)[0],
+                       tuple(sorted(field['written_by'])))
+                groups.setdefault(key, []).append(field)
+
+        packing = []
+
+        for group in groups.values():
+            slots = []
+
+            for field in group:
+                for slot in slots:
+                    if sum(other['bits'] for other in slot) + \
+                            field['bits'] <= 256:
+                        slot.append(field)
+                        break
+                else:
+                    slots.append([field])
+
+            for slot in slots:
+                if len(slot) > 1:
+                    packing.append(OrderedDict([
+                        ('fields', [field['name'] for field in slot]),
+                        ('bits', sum(field['bits'] for field in slot)),
+                        ('saves', (len(slot) - 1) * OPCODE_GAS['SSTORE']),
+                    ]))
+
+        for field in fields:
+            del field['scalar']
+
+        return OrderedDict([('slots', start), ('fields', fields),
+                            ('packing', packing)])
+
+    def in_scope(self, name, method_name):
+        if (name in self.scope[method_name] or
+                name in self.data or
+                name in self.events or
+                name in self.macros or
+                name in self.methods):
+            return True
+
+        if self.names[name] & (BUILTIN | GLOBAL):
+            return True
+
+        return False
+
+    def resolve_token(self, node, method_name):
+        if isinstance(node, syntax.Token):
+            return node.val
+
+        return self.resolve_access(node, method_name)
+
+    def gather_tokens(self, nodes, method_name):
+        if not nodes:
+            return []
+
+        if not iterable(nodes):
+            nodes = [nodes]
+
+        collected_nodes = list(
+            flatten(self.traverse_tokens(node, method_name) for node in nodes))
+
+        if collected_nodes:
+            return set(pair for pair in collected_nodes if pair)
+
+        return []
+
+    def traverse_tokens(self, node, method_name):
+        # like the contract a create pulls in
+        if node.metadata.file != 'main':
+            return None
+
+        if node.val == '.':
+            return Token('.'.join(self.resolve_token(a, method_name)
+                                  for a in node.args), node.metadata)
+
+        if node.val == ':':
+            return self.traverse_tokens(node.args[0], method_name)
+
+        if node.val == '=':
+            assignee = node.args[0]
+            value = node.args[1]
+
+            if not self.names[assignee.val] & KEYWORD_ARGUMENT:
+                self.log_message(
+                    assignee.metadata.ln,
+                    assignee.metadata.ch,
+                    INVALID_KEYWORD_ARGUMENT,
+                    'Invalid keyword argument "{}"'.format(assignee.val))
+
+            return self.traverse_tokens(value, method_name)
+
+        if isinstance(node, syntax.Token):
+            return (Token(node.val, node.metadata)
+                    if self.is_reference(node.val)
+                    else None)
+
+        return [self.traverse_tokens(arg, method_name) for arg in node.args]
+
+    def traverse(self, node, level=0, method_name=None):
+        if not isinstance(node, syntax.Astnode):
+            if isinstance(node, syntax.Token):
+                self.check(Token(node.val, node.metadata), method_name)
+
+            return
+
+        if self.debug:
+            click.echo('{}{} {}'.format(' ' * level, node.val,
+                                        '' if isinstance(node, syntax.Token)
+                                        else [n.val for n in node.args]))
+
+        # a seq takes its first statement's position, which can be inset
+        if node.val != 'seq' and node.metadata.file != 'main':
+            self.declare_included(node, method_name)
+
+            return
+
+        if node.val == 'def':
+            method_name = node.args[0].val
+
+        if (node.val not in self.mapping and
+                node.val not in self.macros + self.methods):
+            if self.debug and self.is_callable(node.val):
+                click.echo('{} unknown {} {}'.format(
+                    node.metadata.ln + 1,
+                    'opcode' if self.is_opcode(node.val) else 'function',
+                    node.val))
+
+            return
+
+        if node.val in self.mapping:
             nodes_to_traverse = self.mapping[node.val](self, node, method_name)
         elif node.val in self.methods + self.macros:
             nodes_to_traverse = self.simple_traversal(node, method_name)
 
-        if nodes_to_traverse:
-            for node_to_traverse in nodes_to_traverse:
-                self.traverse(node_to_traverse,
-                              level=level + 1,
-                              method_name=method_name)
+        if nodes_to_traverse:
+            for node_to_traverse in nodes_to_traverse:
+                self.traverse(node_to_traverse,
+                              level=level + 1,
+                              method_name=method_name)
+
+    def log_message(self, line, character, error, message, reposition=True):
+        """
+        Record a linter message, ignoring duplicates; messages are printed by
+        `report` once linting is done.
+        """
+        if reposition:
+            line, character = self.reposition(line, character)
+
+        diagnostic = Diagnostic(self.filename, line, character, error, message)
+
+        if diagnostic in self.logged_messages:
+            return
+
+        self.logged_messages.add(diagnostic)
+        self.diagnostics.append(diagnostic)
+
+    def enclosing_method(self, line):
+        if len(self.method_lines) != len(self.method_metadata):
+            self.method_lines = sorted(
+                (metadata.ln + 1, name)
+                for name, metadata in self.method_metadata.items())
+
+        index = bisect.bisect_right(self.method_lines,
+                                    (int(line), chr(255))) - 1
+
+        return self.method_lines[index][1] if index >= 0 else ''
+
+    def fingerprint(self, diagnostic):
+        """
+        A hash of the parts of a diagnostic that survive unrelated edits: its
+        code, its message without numbers, the symbol it names and the method
+        it is in, but not its position.
+        """
+        symbol = RE_SYMBOL.search(diagnostic.message)
+
+        parts = [diagnostic.code,
+                 RE_NUMBER.sub('#', diagnostic.message),
+                 symbol.group(1) if symbol else '',
+                 self.enclosing_method(diagnostic.line)]
+
+        return hashlib.sha1(
+            '\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def fingerprints(self):
+        counts = defaultdict(int)
+
+        for diagnostic in self.diagnostics:
+            if not self.suppressed(diagnostic):
+                counts[self.fingerprint(diagnostic)] += 1
+
+        return dict(counts)
+
+    def report(self):
+        """
+        Print each diagnostic not suppressed by a comment or covered by the
+        baseline; a fingerprint in the baseline covers as many diagnostics as
+        it was counted there.
+        """
+        remaining = dict(self.baseline)
+
+        for diagnostic in self.diagnostics:
+            if self.suppressed(diagnostic):
+                continue
+
+            fingerprint = self.fingerprint(diagnostic)
+
+            if remaining.get(fingerprint):
+                remaining[fingerprint] -= 1
+                self.baselined += 1
+
+                continue
+
+            self.exit_code = 1
+            self.reported.append(diagnostic)
+
+            if self.echo:
+                click.echo(format_diagnostic(diagnostic))
+
+        if self.verbose and self.baselined:
+            click.echo('{} diagnostics in the baseline were hidden'.format(
+                self.baselined))
+
+        if self.metrics:
+            self.metrics.increment('serplint_files_linted')
+            self.metrics.observe('serplint_lint_seconds',
+                                 time.time() - self.started)
+
+            for diagnostic in self.reported:
+                self.metrics.increment('serplint_diagnostics',
+                                       code=diagnostic.code)
+
+    def phase(self, name):
+        if not self.metrics:
+            return NULL_TIMER
+
+        return self.metrics.timer('serplint_phase_seconds', phase=name)
+
+    def __init__(self, input_file, verbose=False, debug=False,
+                 gas_threshold=None,
+                 loop_iterations=DEFAULT_LOOP_ITERATIONS,
+                 size_budget=None, size_baseline=None, size_growth=None,
+                 measure_macros=False, baseline=None, echo=True,
+                 metrics=None, parser=DEFAULT_PARSER, artifact_cache=None,
+                 summaries=None, disable=frozenset(), compile_contract=True,
+                 tier=DEEP_TIER):
+        self.code = input_file.read()
+
+        if not isinstance(self.code, str):
+            self.code = self.code.decode('utf-8')
+
+        self.code_lines = self.code.splitlines()
+
+        self.index_source()
+
+        self.filename = input_file.name
+
+        self.verbose = verbose
+        self.debug = debug
+        self.echo = echo
+        self.metrics = metrics
+        self.parser = parser
+        self.artifact_cache = artifact_cache
+        self.summaries = summaries
+        self.disable = disable
+        self.compile_contract = compile_contract
+        self.tier = tier
+        self.started = None
+
+        self.gas_threshold = gas_threshold
+        self.loop_iterations = loop_iterations
+
+        self.size_budget = size_budget
+        self.size_baseline = size_baseline
+        self.size_growth = size_growth
+        self.measure_macros = measure_macros
+
+        self.baseline = baseline or {}
+        self.baselined = None
+
+        self.exit_code = None
+        self.bytecode = None
+        self.gas = None
+        self.growth = None
+        self.code_size = None
+        self.layout = None
+
+        self.checks = None
+        self.diagnostics = None
+        self.reported = None
+        self.logged_messages = None
+        self.scope = None
+        self.names = None
+
+        self.data = None
+        self.events = None
+        self.macros = None
+        self.methods = None
+        self.macro_metadata = None
+        self.method_metadata = None
+        self.method_lines = None
+        self.expander = None
+        self.subexpressions = None
+        # self.structs = None
+
+    def run_check(self, check, *args):
+        """
+        Run one of the analyses, reporting a crash in it as E103 so it can't
+        take the other analyses' diagnostics with it.
+        """
+        try:
+            return check(*args)
+        except Exception as e:  # pylint: disable=broad-except
+            if self.debug:
+                traceback.print_exc()
+
+            self.log_message(1, 0, LINT_FAILED,
+                             'The {} check failed: {!r}'.format(
+                                 check.__name__, e),
+                             reposition=False)
+
+    def check_unused(self):
+        for method, variables in self.scope.items():
+            if not method:
+                continue
+
+            for variable, metadata in variables.items():
+                if not metadata['accessed']:
+                    if metadata['type'] == 'argument':
+                        self.log_message(
+                            metadata['token'].metadata.ln,
+                            metadata['token'].metadata.ch,
+                            UNUSED_ARGUMENT,
+                            'Unused argument "{}"'.format(variable))
+                    elif (metadata['type'] == 'assignment' and
+                            not self.names[variable] & GLOBAL):
+                        self.log_message(
+                            metadata['token'].metadata.ln,
+                            metadata['token'].metadata.ch,
+                            UNREFERENCED_ASSIGNMENT,
+                            'Unreferenced assignment "{}"'.format(variable))
+
+    def analyze(self, contract_ast):
+        contract_ast = self.own_code(contract_ast)
+
+        # before expanding macros, since only repeats in the source can be
+        # hoisted
+        self.run_check(self.check_subexpressions, contract_ast)
+
+        if self.expander.macros:
+            contract_ast = self.expander.expand(contract_ast)
+
+        self.run_check(self.check_storage, contract_ast)
+        self.run_check(self.check_iteration, contract_ast)
+        self.run_check(self.check_expressions, contract_ast)
+        self.layout = self.run_check(self.storage_layout, contract_ast)
+
+        if self.bytecode:
+            methods = self.split_methods()
+
+            self.run_check(self.estimate_method_gas, methods)
+            self.run_check(self.measure_code_size, methods)
+
+    def compile(self):
+        # ('Error (file "main", line 2, char 12): Invalid argument count ...
+        try:
+            # override stdout since serpent tries to print the exception itself
+            with self.phase('compile'), stdout_redirected(), \
+                    merged_stderr_stdout():
+                if self.artifact_cache:
+                    self.bytecode, _ = compile_cached(
+                        self.code, self.artifact_cache, self.metrics)
+                else:
+                    self.bytecode = serpent.compile(self.code)
+        except Exception as e:
+            match = RE_EXCEPTION.search(e.args[0])
+
+            if match:
+                self.log_message(int(match.group('line')),
+                                 int(match.group('character')),
+                                 COMPILE_ERROR,
+                                 match.group('message'),
+                                 reposition=False)
+            else:
+                self.failure = e.args[0]
+
+                click.echo('Exception: {}'.format(e.args[0]), err=True)
+
+                self.report()
+
+                sys.exit(1)
+
+    def parse(self):
+        if self.parser == 'builtin':
+            return syntax.parse(self.code)
+
+        # override stdout since serpent tries to print the exception itself
+        with stdout_redirected(), merged_stderr_stdout():
+            return normalize(serpent.parse(self.code))
+
+    def lint(self):
+        self.started = time.time()
+        self.exit_code = 0
+
+        self.checks = []
+        self.diagnostics = []
+        self.reported = []
+        self.logged_messages = set()
+        self.baselined = 0
+        # an exception serpent gave no position for, which stops linting
+        self.failure = None
+        self.scope = defaultdict(dict)
+        self.names = Names()
+
+        self.data = []
+        self.events = []
+        self.macros = []
+        self.methods = []
+        self.macro_metadata = []
+        self.method_metadata = OrderedDict()
+        self.method_lines = []
+        self.expander = MacroExpander()
+        # self.structs = {}
+
+        self.bytecode = None
+        self.gas = OrderedDict()
+        self.growth = OrderedDict()
+        self.code_size = {
+            'total': None,
+            'runtime': None,
+            'methods': OrderedDict(),
+            'macros': OrderedDict(),
+        }
+
+        deep = self.tier == DEEP_TIER
+
+        # without serpent there's no E100 or bytecode to measure
+        if serpent and self.compile_contract and deep:
+            self.compile()
+
+        # ('Error (file "main", line 2, char 12): Invalid argument count ...
+        try:
+            with self.phase('parse'):
+                contract_ast = self.parse()
+        except Exception as e:
+            match = RE_EXCEPTION.search(e.args[0])
+
+            if match:
+                self.log_message(int(match.group('line')),
+                                 int(match.group('character')),
+                                 PARSE_ERROR,
+                                 match.group('message'),
+                                 reposition=False)
+            else:
+                self.failure = e.args[0]
+
+                click.echo('Exception: {}'.format(e.args[0]), err=True)
+
+            self.report()
+
+            sys.exit(1)
+
+        # report whatever was found even if a check crashes
+        try:
+            with self.phase('traverse'):
+                self.traverse(contract_ast)
+
+            with self.phase('resolve'):
+                self.resolve_checks()
+                self.check_unused()
+
+            if deep:
+                with self.phase('analyze'):
+                    self.analyze(contract_ast)
+
+            if deep and self.summaries is not None:
+                with self.phase('summarize'):
+                    self.update_summary(contract_ast)
+        finally:
+            self.report()
+
+        if self.debug:
+            from pprint import pformat
+
+            click.echo('scope ' + pformat(self.scope.items()))
+
+            click.echo('data ' + pformat(self.data))
+            click.echo('events ' + pformat(self.events))
+            click.echo('macros ' + pformat(self.macros))
+            click.echo('methods ' + pformat(self.methods))
+            # click.echo('structs', pformat(self.structs))
+
+        return self.exit_code
+
+
+def source_file(code, filename):
+    """
+    A file-like object for code held in memory, which is what Linter reads.
+    """
+    if not isinstance(code, bytes):
+        code = code.encode('utf-8')
+
+    source = io.BytesIO(code)
+    source.name = filename
+
+    return source
+
+
+LintResult = namedtuple('LintResult', ['filename', 'exit_code', 'diagnostics'])
+
+
+def lint_source(code, filename='main', **options):
+    """
+    Lint source code held in memory without printing anything, returning a
+    LintResult with the diagnostics that would have been reported.
+    """
+    linter = Linter(source_file(code, filename), echo=False, **options)
+
+    try:
+        exit_code = linter.lint()
+    except SystemExit as e:
+        # unparseable code exits once it has reported the parse error
+        exit_code = e.code
+
+    return LintResult(filename, exit_code, linter.reported)
+
+
+def lint_tiers(code, filename='main', cancelled=None, timeout=None,
+               **options):
+    """
+    Lint source code held in memory a tier at a time, yielding a LintResult
+    for the fast tier as soon as it's done and then one for the deep tier,
+    which has every diagnostic and replaces it.
+
+    The deep tier runs in a child process that is abandoned (yielding
+    nothing more) as soon as `cancelled()` returns true, say because the
+    source changed, or that is reported as E102 after `timeout` seconds.
+    """
+    yield lint_source(code, filename, tier=FAST_TIER, **options)
+
+    if cancelled and cancelled():
+        return
+
+    status, value = run_isolated(lint_source, (code, filename),
+                                 dict(options, tier=DEEP_TIER),
+                                 timeout=timeout, cancelled=cancelled)
+
+    if status == 'cancelled':
+        return
+
+    if status == 'done':
+        yield value
+    elif status == 'timeout':
+        yield LintResult(filename, 1, [Diagnostic(
+            filename, 1, 0, LINT_TIMEOUT,
+            'Linting took longer than {} seconds'.format(timeout))])
+    else:
+        yield LintResult(filename, 1, [Diagnostic(
+            filename, 1, 0, LINT_FAILED,
+            'Linting failed: {}'.format(value))])
+
+
+def read_size_baseline(path):
+    if not path or not os.path.exists(path):
+        return {}
+
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
+
+
+def write_size_baseline(path, baseline):
+    with open(path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+
+
+def write_layouts(path, layouts):
+    with open(path, 'w') as layout_file:
+        json.dump(layouts, layout_file, indent=2, sort_keys=True)
+
+
+def lint_file(filename, code, verbose=False, gas_report=False,
+              size_report=False, macro_report=False, fingerprints=None,
+              code_sizes=None, layout_report=False, layouts=None,
+              **options):
+    """
+    Lint one file for the command line, printing its diagnostics and any
+    requested reports, and return its exit status. Its diagnostics'
+    fingerprints, code size and storage layout are recorded in
+    `fingerprints`, `code_sizes` and `layouts` when they're given, to be
+    written once the run is done.
+    """
+    if verbose:
+        click.echo('Linting {}'.format(filename))
+        click.echo()
+
+    linter = Linter(source_file(code, filename), verbose=verbose,
+                    measure_macros=size_report, **options)
+
+    try:
+        exit_code = linter.lint()
+    except SystemExit as e:
+        # unparseable code exits once it has reported the parse error
+        return e.code
+
+    if fingerprints is not None:
+        fingerprints[filename] = linter.fingerprints()
+
+        exit_code = 0
+
+    if gas_report:
+        for method, gas in linter.gas.items():
+            click.echo('{}:{} gas {} loop-free, {} worst-case ({} loops)'
+                       .format(linter.filename, method, gas['loop_free'],
+                               gas['worst_case'], gas['loops']))
+
+        for method, sources in linter.growth.items():
+            if sources:
+                click.echo('{}:{} gas grows with {}'.format(
+                    linter.filename, method, ', '.join(sorted(sources))))
+
+    if size_report and linter.code_size['total'] is not None:
+        click.echo('{} size {} bytes ({} runtime)'.format(
+            linter.filename, linter.code_size['total'],
+            linter.code_size['runtime']))
+
+        for method, size in linter.code_size['methods'].items():
+            click.echo('{}:{} size {} bytes'.format(linter.filename, method,
+                                                    size))
+
+        for macro, size in linter.code_size['macros'].items():
+            click.echo('{}:{} size {} bytes (macro expansions)'.format(
+                linter.filename, macro, size))
+
+    if macro_report:
+        expander = linter.expander
+
+        for name, count in sorted(expander.expansions.items()):
+            click.echo('{}:{} expanded {} times'.format(linter.filename, name,
+                                                       count))
+
+        for name in expander.skipped():
+            click.echo('{}:{} not expanded (typed macro)'.format(
+                linter.filename, name))
+
+        for metadata, name, size in expander.call_sites:
+            line, character = linter.reposition(metadata.ln, metadata.ch)
+
+            click.echo('{}:{}:{} {} expands to {} nodes'.format(
+                linter.filename, line, character, name, size))
+
+    if layout_report and linter.layout:
+        click.echo('{} storage {} slots'.format(linter.filename,
+                                                linter.layout['slots']))
+        click.echo('{:>6} {:>6} {:>4}  {:<32} {}'.format(
+            'slot', 'slots', 'bits', 'field', 'written by'))
+
+        for field in linter.layout['fields']:
+            click.echo('{:>6} {:>6} {:>4}  {:<32} {}'.format(
+                'hashed' if field['slot'] is None else field['slot'],
+                field['slots'], field['bits'] or '-', field['name'],
+                ', '.join(method or '(init)'
+                          for method in field['written_by'])).rstrip())
+
+        for packing in linter.layout['packing']:
+            click.echo('{} could pack {} into one slot ({} bits), saving '
+                       'up to ~{} gas per write'.format(
+                           linter.filename, ', '.join(packing['fields']),
+                           packing['bits'], packing['saves']))
+
+    if code_sizes is not None and linter.code_size['total'] is not None:
+        code_sizes[filename] = linter.code_size
+
+    if layouts is not None and linter.layout:
+        layouts[filename] = linter.layout
+
+    return exit_code
+
+
+def isolated(connection, target, args, kwargs, max_memory):
+    if max_memory:
+        limit = max_memory * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    try:
+        connection.send(('done', target(*args, **kwargs)))
+    except MemoryError:
+        connection.send(('memory', None))
+    except Exception as e:  # pylint: disable=broad-except
+        traceback.print_exc()
+
+        connection.send(('failed', repr(e)))
+    finally:
+        sys.stdout.flush()
+
+
+def run_isolated(target, args, kwargs, timeout=None, max_memory=None,
+                 cancelled=None):
+    """
+    Call `target` in a child process limited to `timeout` seconds and
+    `max_memory` megabytes of address space, and stopped early once
+    `cancelled()` returns true, returning (status, value) where status is
+    one of 'done', 'timeout', 'memory', 'failed' or 'cancelled'.
+    """
+    receiver, sender = multiprocessing.Pipe(duplex=False)
+    process = multiprocessing.Process(
+        target=isolated, args=(sender, target, args, kwargs, max_memory))
+    deadline = None if timeout is None else time.time() + timeout
+
+    process.start()
+    sender.close()
+
+    try:
+        while True:
+            wait = (None if deadline is None else
+                    max(0, deadline - time.time()))
+
+            if cancelled:
+                wait = min(CANCEL_POLL_SECONDS, CANCEL_POLL_SECONDS
+                           if wait is None else wait)
+
+            if receiver.poll(wait):
+                break
+
+            if deadline is not None and time.time() >= deadline:
+                return 'timeout', None
+
+            if cancelled and cancelled():
+                return 'cancelled', None
+
+        try:
+            return receiver.recv()
+        except EOFError:
+            # serpent aborts (rather than raising) when it can't allocate
+            return 'memory' if max_memory else 'failed', None
+    finally:
+        if process.is_alive():
+            process.terminate()
+
+        process.join()
+
+
+def read_timings(path):
+    """
+    Read a timings file of {filename: seconds} from earlier runs.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    with open(path) as timings_file:
+        return json.load(timings_file)['files']
+
+
+def write_timings(path, timings):
+    with open(path, 'w') as timings_file:
+        json.dump({'version': 1, 'files': timings}, timings_file, indent=2,
+                  sort_keys=True)
+
+
+# 2 added each declaration's fingerprint
+SUMMARIES_VERSION = 2
+
+
+def read_summaries(path):
+    """
+    The per-file summaries kept by --summaries, leaving out files that no
+    longer exist.
+    """
+    if not path or not os.path.exists(path):
+        return {}
+
+    with open(path) as summaries_file:
+        summaries = json.load(summaries_file)
+
+    # summaries in an older format are rebuilt as files are linted
+    if summaries.get('version') != SUMMARIES_VERSION:
+        return {}
+
+    summaries = summaries['files']
+
+    return dict((filename, summary)
+                for filename, summary in summaries.items()
+                if os.path.exists(filename))
+
+
+def write_summaries(path, summaries):
+    with open(path, 'w') as summaries_file:
+        json.dump({'version': SUMMARIES_VERSION, 'files': summaries},
+                  summaries_file, indent=2, sort_keys=True)
+
+
+def is_internal(method):
+    return method.startswith(INTERNAL_PREFIX)
+
+
+def dead_code(summaries):
+    """
+    Diagnostics for the methods, macros, data and events declared in the
+    project that nothing uses, from each file's `Linter.summarize`. Public
+    methods are all live, since anything can call them; an internal helper
+    (named with a leading underscore) is live if it's named by an extern (or
+    called on another contract) anywhere in the project, or called by a live
+    method.
+    """
+    externs = set()
+    includers = defaultdict(set)
+
+    for filename, summary in summaries.items():
+        externs.update(summary['externs'])
+
+        for included in summary['includes']:
+            includers[included].add(filename)
+
+    used = {}
+
+    for filename, summary in summaries.items():
+        calls = summary['calls']
+        # what the public methods call is live too
+        pending = list(externs | set(calls.get('', [])) |
+                       set(method for method in calls
+                           if method and not is_internal(method)))
+        reachable = set(pending)
+
+        while pending:
+            for callee in calls.get(pending.pop(), []):
+                if callee not in reachable:
+                    reachable.add(callee)
+                    pending.append(callee)
+
+        used[filename] = {
+            'calls': reachable,
+            'macros': set(summary['macros']),
+            'reads': set(summary['reads']),
+            'logs': set(summary['logs']),
+        }
+
+    diagnostics = []
+
+    for filename, summary in sorted(summaries.items()):
+        users = [used[user] for user in includers[filename] | {filename}
+                 if user in used]
+
+        for code, line, character, name, _ in summary['declared']:
+            _, entry, message = DEAD_CODE[code]
+
+            if not any(name in user[entry] for user in users):
+                diagnostics.append(Diagnostic(filename, line, character, code,
+                                              message.format(name)))
+
+    return diagnostics
+
+
+def report_dead_code(summaries, baselines=None, update_baseline=False,
+                     metrics=None):
+    """
+    Print the project's dead code diagnostics not covered by `baselines`, as
+    Linter.report does a file's, returning the exit status. When updating
+    the baseline their fingerprints are recorded in it instead.
+    """
+    fingerprints = dict(
+        ((filename,) + tuple(declared[:3]), declared[4])
+        for filename, summary in summaries.items()
+        for declared in summary['declared'])
+    counts = defaultdict(lambda: defaultdict(int))
+    remaining = dict((filename, dict(baseline))
+                     for filename, baseline in (baselines or {}).items())
+    exit_code = 0
 
-    def log_message(self, line, character, error, message, reposition=True):
+    for diagnostic in dead_code(summaries):
+        fingerprint = fingerprints[diagnostic.filename, diagnostic.code,
+                                   diagnostic.line, diagnostic.character]
+        counts[diagnostic.filename][fingerprint] += 1
+
+        if not update_baseline:
+            if remaining.get(diagnostic.filename, {}).get(fingerprint):
+                remaining[diagnostic.filename][fingerprint] -= 1
+
+                continue
+
+            exit_code = 1
+
+        click.echo(format_diagnostic(diagnostic))
+
+        if metrics:
+            metrics.increment('serplint_diagnostics', code=diagnostic.code)
+
+    if update_baseline and baselines is not None:
+        for filename, file_counts in counts.items():
+            baseline = baselines.setdefault(filename, {})
+
+            # files not linted this run kept their counts from the last one
+            for fingerprint, count in file_counts.items():
+                baseline[fingerprint] = max(baseline.get(fingerprint, 0),
+                                            count)
+
+    return exit_code
+
+
+def shard_files(filenames, timings, index, count):
+    """
+    Split filenames into `count` shards of about the same total lint time and
+    return shard `index` (1-based). Files are placed longest first on the
+    least loaded shard; files without a timing are assumed to take the
+    average, so every node computes the same split from the same inputs.
+    """
+    known = [timings[filename] for filename in filenames
+             if filename in timings]
+    default = sum(known) / len(known) if known else 1.0
+
+    loads = [0.0] * count
+    shards = [[] for _ in range(count)]
+
+    for filename in sorted(set(filenames),
+                           key=lambda f: (-timings.get(f, default), f)):
+        shard = loads.index(min(loads))
+
+        loads[shard] += timings.get(filename, default)
+        shards[shard].append(filename)
+
+    return shards[index - 1]
+
+
+def parse_shard(ctx, param, value):  # pylint: disable=unused-argument
+    if value is None:
+        return None
+
+    try:
+        index, count = [int(part) for part in value.split('/')]
+    except ValueError:
+        raise click.BadParameter('should be K/N, like 1/4')
+
+    if not 1 <= index <= count:
+        raise click.BadParameter('K should be between 1 and N')
+
+    return index, count
+
+
+def parse_codes(ctx, param, value):  # pylint: disable=unused-argument
+    if not value:
+        return frozenset()
+
+    if isinstance(value, string_types):
+        value = value.split(',')
+
+    return frozenset(code.strip().upper() for code in value if code.strip())
+
+
+# settings a [serplint:GLOB] section can change for the files it matches
+PATH_SETTINGS = ['compile', 'disable', 'gas-threshold', 'loop-iterations',
+                 'parser', 'size-budget', 'size-growth']
+
+
+class Config(object):
+    """
+    Settings from the [serplint] section of setup.cfg (or serplint.toml):
+    defaults for the command line options, named like the options without
+    their dashes, and overrides for the files matching a glob from
+    [serplint:GLOB] sections (or [serplint.paths."GLOB"] tables), applied in
+    order.
+    """
+
+    def __init__(self, defaults=None, paths=None, filename=None):
+        self.defaults = setting_names(defaults or {})
+        self.paths = []
+        self.filename = filename
+        self.matched = {}
+
+        paths = [(pattern, setting_names(settings))
+                 for pattern, settings in paths or []]
+
+        for pattern, settings in paths:
+            for name in settings:
+                if name not in PATH_SETTINGS:
+                    raise click.UsageError(
+                        '{} can\'t be set for a path in {}'.format(
+                            name, filename))
+
+            self.paths.append((re.compile(fnmatch.translate(pattern)),
+                               settings))
+
+        # one pass over a path rules out every glob for most files
+        self.any_path = re.compile('|'.join(
+            '(?:{})'.format(fnmatch.translate(pattern))
+            for pattern, _ in paths)) if paths else None
+
+    def defaults_for(self, command):
         """
-        Log a linter message to stderr, ignoring duplicates.
+        A click default_map for one command, by parameter name.
         """
-        if error[0] == 'E':
-            formatted_code = click.style(error, fg='red')
-        else:
-            formatted_code = click.style(error, fg='yellow')
+        names = option_names(command)
 
-        if reposition:
-            line, character = self.reposition(line, character)
+        return dict((names[name], value)
+                    for name, value in self.defaults.items()
+                    if name in names)
 
-        message = '{}:{}:{} {} {}'.format(self.filename,
-                                          line,
-                                          character,
-                                          formatted_code,
-                                          message)
+    def options_for(self, filename):
+        """
+        The lint options the path sections set for a file, converted like
+        the command line options they match.
+        """
+        path = os.path.normpath(filename)
 
-        if message in self.logged_messages:
-            return
+        if path in self.matched:
+            return self.matched[path]
 
-        self.exit_code = 1
-        self.logged_messages.append(message)
+        options = {}
 
-        click.echo(message)
+        if self.any_path and self.any_path.match(path):
+            for pattern, settings in self.paths:
+                if pattern.match(path):
+                    options.update(lint_settings(settings))
 
-    def __init__(self, input_file, verbose=False, debug=False):
-        self.code = input_file.read()
-        self.code_lines = self.code.splitlines()
+        self.matched[path] = options
 
-        self.filename = input_file.name
+        return options
 
-        self.verbose = verbose
-        self.debug = debug
+    def lint_options(self, filename):
+        """
+        options_for a file on top of the defaults for the same settings, for
+        linting without the command line (which gets defaults from click).
+        """
+        options = lint_settings(dict(
+            (name, value) for name, value in self.defaults.items()
+            if name in PATH_SETTINGS))
+        options.update(self.options_for(filename))
 
-        self.exit_code = None
+        return options
 
-        self.checks = None
-        self.logged_messages = None
-        self.scope = None
 
-        self.data = None
-        self.events = None
-        self.macros = None
-        self.methods = None
-        # self.structs = None
+def setting_names(settings):
+    # gas_threshold and gas-threshold both name --gas-threshold
+    return dict((name.replace('_', '-'), value)
+                for name, value in settings.items())
 
-    def lint(self):
-        self.exit_code = 0
 
-        self.checks = []
-        self.logged_messages = []
-        self.scope = defaultdict(dict)
+def option_names(command):
+    return dict((option[2:], param.name)
+                for param in command.params
+                for option in getattr(param, 'opts', [])
+                if option.startswith('--'))
 
-        self.data = []
-        self.events = []
-        self.macros = []
-        self.methods = []
-        # self.structs = {}
 
-        # ('Error (file "main", line 2, char 12): Invalid argument count ...
-        try:
-            # override stdout since serpent tries to print the exception itself
-            with stdout_redirected(), merged_stderr_stdout():
-                serpent.compile(self.code)
-        except Exception as e:
-            match = RE_EXCEPTION.search(e.args[0])
+def lint_settings(settings):
+    """
+    Settings as lint options, converted like the command line options they
+    match.
+    """
+    params = dict((param.name, param) for param in lint.params)
+    names = option_names(lint)
+    options = {}
 
-            if match:
-                self.log_message(match.group('line'),
-                                 match.group('character'),
-                                 COMPILE_ERROR,
-                                 match.group('message'),
-                                 reposition=False)
-            else:
-                click.echo('Exception: {}'.format(e.args[0]), err=True)
+    for name, value in settings.items():
+        param = params[names[name]]
 
-                sys.exit(1)
+        if param.callback:
+            options[param.name] = param.callback(None, param, value)
+        else:
+            options[param.name] = param.type(value, param)
 
-        # ('Error (file "main", line 2, char 12): Invalid argument count ...
-        try:
-            # override stdout since serpent tries to print the exception itself
-            with stdout_redirected(), merged_stderr_stdout():
-                contract_ast = serpent.parse(self.code)
-        except Exception as e:
-            match = RE_EXCEPTION.search(e.args[0])
+    return options
 
-            if match:
-                self.log_message(match.group('line'),
-                                 match.group('character'),
-                                 PARSE_ERROR,
-                                 match.group('message'),
-                                 reposition=False)
-            else:
-                click.echo('Exception: {}'.format(e.args[0]), err=True)
 
-            sys.exit(1)
+def read_config(path=None):
+    """
+    Read `path`, or else serplint.toml or setup.cfg in the working directory
+    if either has serplint settings.
+    """
+    if not path:
+        for candidate in ['serplint.toml', 'setup.cfg']:
+            if os.path.exists(candidate):
+                config = read_config(candidate)
 
-        self.traverse(contract_ast)
+                if config.defaults or config.paths:
+                    return config
 
-        self.resolve_checks()
+        return Config()
 
-        for method, variables in self.scope.items():
-            if not method:
-                continue
+    if path.endswith('.toml'):
+        if not toml:
+            raise click.UsageError('Reading {} needs Python 3.11 or the toml '
+                                   'package'.format(path))
 
-            for variable, metadata in variables.items():
-                if not metadata['accessed']:
-                    if metadata['type'] == 'argument':
-                        self.log_message(
-                            metadata['token'].metadata.ln,
-                            metadata['token'].metadata.ch,
-                            UNUSED_ARGUMENT,
-                            'Unused argument "{}"'.format(variable))
-                    elif (metadata['type'] == 'assignment' and
-                            variable not in GLOBALS):
-                        self.log_message(
-                            metadata['token'].metadata.ln,
-                            metadata['token'].metadata.ch,
-                            UNREFERENCED_ASSIGNMENT,
-                            'Unreferenced assignment "{}"'.format(variable))
+        with io.open(path, encoding='utf-8') as config_file:
+            section = dict(toml.loads(config_file.read()).get('serplint', {}))
 
-        if self.debug:
-            from pprint import pformat
+        paths = section.pop('paths', {})
 
-            click.echo('scope ' + pformat(self.scope.items()))
+        return Config(section, list(paths.items()), path)
 
-            click.echo('data ' + pformat(self.data))
-            click.echo('events ' + pformat(self.events))
-            click.echo('macros ' + pformat(self.macros))
-            click.echo('methods ' + pformat(self.methods))
-            # click.echo('structs', pformat(self.structs))
+    parser = RawConfigParser()
+    parser.read(path)
 
-        return self.exit_code
+    defaults = (dict(parser.items('serplint'))
+                if parser.has_section('serplint') else {})
+    paths = [(section.split(':', 1)[1], dict(parser.items(section)))
+             for section in parser.sections()
+             if section.startswith('serplint:')]
+
+    return Config(defaults, paths, path)
+
+
+class DefaultGroup(click.Group):
+    """
+    A group that runs `default_command` when the first argument isn't one of
+    its commands (or a request for the group's help), so `serplint file.se`
+    keeps working next to `serplint merge`.
+    """
+    default_command = 'lint'
+
+    def parse_args(self, ctx, args):
+        # skip the group's own options, which come before the command
+        index = 0
 
+        while index < len(args) and args[index].startswith('--config'):
+            index += 1 if '=' in args[index] else 2
 
-@click.command()
+        if index >= len(args) or (args[index] not in self.commands and
+                                  args[index] not in ctx.help_option_names):
+            args.insert(index, self.default_command)
+
+        return super(DefaultGroup, self).parse_args(ctx, args)
+
+
+@click.group(cls=DefaultGroup,
+             context_settings={'help_option_names': ['-h', '--help']})
+@click.option('--config', 'config_file', type=click.Path(exists=True,
+                                                          dir_okay=False),
+              help='Read settings from this file instead of serplint.toml '
+                   'or setup.cfg.')
+@click.pass_context
+def serplint(ctx, config_file):
+    """
+    Lint serpent contracts (`serplint [lint] FILES`), or combine or compare
+    lint results with the other commands.
+    """
+    # read once; commands get the defaults and lint the per-path settings
+    ctx.obj = read_config(config_file)
+
+    names = set(name for command in ctx.command.commands.values()
+                for name in option_names(command))
+
+    for name in ctx.obj.defaults:
+        if name not in names:
+            raise click.UsageError('Unknown setting {} in {}'.format(
+                name, ctx.obj.filename))
+
+    ctx.default_map = dict((name, ctx.obj.defaults_for(command))
+                           for name, command in ctx.command.commands.items())
+
+
+@serplint.command()
 @click.option('--verbose', '-v', is_flag=True)
 @click.option('--debug', '-d', is_flag=True)
 @click.option('--exit-status', '-e', is_flag=True)
+@click.option('--gas-report', is_flag=True,
+              help='Print the estimated gas cost of each method.')
+@click.option('--gas-threshold', type=int,
+              help='Warn when a method may use more than this much gas.')
+@click.option('--loop-iterations', type=int, default=DEFAULT_LOOP_ITERATIONS,
+              help='Iterations assumed per loop for worst-case gas.')
+@click.option('--size-report', is_flag=True,
+              help='Print the code size of the contract, its methods and '
+                   'its macros.')
+@click.option('--size-budget', type=int,
+              help='Warn when the contract code is larger than this many '
+                   'bytes.')
+@click.option('--size-baseline', type=click.Path(dir_okay=False),
+              help='JSON file of previous code sizes to compare against.')
+@click.option('--size-growth', type=float,
+              help='Warn when the code grew more than this percentage over '
+                   'the size baseline.')
+@click.option('--update-size-baseline', is_flag=True,
+              help='Record the current code size in the size baseline.')
+@click.option('--macro-report', is_flag=True,
+              help='Print how often each macro is expanded and how large '
+                   'each call site\'s expansion is.')
+@click.option('--layout-report', is_flag=True,
+              help='Print the storage slots each data field takes and which '
+                   'small fields could be packed into one slot.')
+@click.option('--layout-file', type=click.Path(dir_okay=False),
+              help='Record the storage layout in this JSON file.')
+@click.option('--baseline', type=click.Path(dir_okay=False),
+              help='JSON file of known diagnostics to hide; only new '
+                   'diagnostics are reported and affect the exit status.')
+@click.option('--write-baseline', 'update_baseline', is_flag=True,
+              help='Record the current diagnostics in the baseline.')
+@click.option('--timeout', type=float,
+              help='Give up on a file (E102) after this many seconds.')
+@click.option('--max-memory', type=int,
+              help='Give up on a file (E104) that needs more than this many '
+                   'megabytes.')
+@click.option('--shard', callback=parse_shard, metavar='K/N',
+              help='Lint only the Kth of N shards of the files, balanced by '
+                   'the lint times in --timings.')
+@click.option('--timings', type=click.Path(dir_okay=False),
+              help='JSON file of per-file lint times, read to balance '
+                   'shards and updated with this run\'s times.')
+@click.option('--parser', type=click.Choice(PARSERS), default=DEFAULT_PARSER,
+              help='Parse with serpent or with serplint\'s pure-Python '
+                   'parser (serpent is still used for E100 and bytecode '
+                   'checks when it\'s installed).')
+@click.option('--artifact-cache', type=click.Path(file_okay=False),
+              help='Directory of compiled bytecode and ABI signatures shared '
+                   'with test harnesses; unchanged contracts (and insets) '
+                   'aren\'t compiled again.')
+@click.option('--metrics-file', type=click.Path(dir_okay=False),
+              help='Write OpenMetrics counters and timings for the run to '
+                   'this file.')
+@click.option('--files-from', type=click.File('r'),
+              help='Also lint the files named in this file, one per line '
+                   '(- for standard input).')
+@click.option('--batch', is_flag=True,
+              help='Lint each file in a short-lived worker process so memory '
+                   'stays flat over any number of files, and print the peak '
+                   'memory used.')
+@click.option('--disable', callback=parse_codes, metavar='CODES',
+              help='Don\'t report these comma-separated codes (or all).')
+@click.option('--tier', type=click.Choice(TIERS), default=DEEP_TIER,
+              help='Run only the fast checks (parsing, undefined names, '
+                   'arguments and keywords), or the deep ones too.')
+@click.option('--compile/--no-compile', 'compile_contract', default=True,
+              help='Compile with serpent, for E100 and the gas and code size '
+                   'checks (default: when serpent is installed).')
+@click.option('--dead-code', 'check_dead_code', is_flag=True,
+              help='Report methods, macros, data and events that nothing in '
+                   'the linted files uses.')
+@click.option('--summaries', 'summaries_file',
+              type=click.Path(dir_okay=False),
+              help='Keep what each file declares and uses here, so dead code '
+                   'checks on a few files still see the whole project '
+                   '(implies --dead-code).')
 @click.version_option()
-@click.argument('input_file', type=click.File('rb'))
-def serplint(verbose, debug, input_file, exit_status):
-    if verbose:
-        click.echo('Linting {}'.format(input_file.name))
-        click.echo()
+@click.argument('input_files', type=click.File('rb', lazy=True), nargs=-1)
+@click.pass_obj
+def lint(config, input_files, exit_status, timeout, max_memory, shard,
+         timings, metrics_file, files_from, batch, check_dead_code,
+         summaries_file, baseline, update_baseline, size_baseline,
+         update_size_baseline, layout_file, **options):
+    """
+    Lint serpent files (the default command).
+    """
+    if not input_files and not files_from:
+        raise click.UsageError('No files to lint')
+
+    if max_memory and not resource:
+        raise click.UsageError('--max-memory is not supported on this '
+                               'platform')
+
+    if options['parser'] == 'serpent' and not serpent:
+        raise click.UsageError('--parser=serpent needs serpent installed')
+
+    if update_size_baseline and not size_baseline:
+        raise click.UsageError('--update-size-baseline needs --size-baseline')
+
+    if metrics_file:
+        options['metrics'] = Metrics()
+
+    if check_dead_code or summaries_file:
+        options['summaries'] = read_summaries(summaries_file)
+
+    # read (and written) once for the run rather than once per file
+    baselines = read_baseline(baseline)
+
+    if baseline and update_baseline:
+        options['fingerprints'] = baselines
+
+    sizes = read_size_baseline(size_baseline)
+
+    if size_baseline and update_size_baseline:
+        options['code_sizes'] = sizes
+
+    if layout_file:
+        options['layouts'] = read_size_baseline(layout_file)
+
+    file_timings = read_timings(timings)
+    input_files = lint_inputs(input_files, files_from)
+
+    if shard:
+        input_files = list(input_files)
+        selected = set(shard_files([f.name for f in input_files],
+                                   file_timings, *shard))
+        input_files = [f for f in input_files if f.name in selected]
+
+    config = config or Config()
+    exit_code = 0
+
+    for input_file in input_files:
+        try:
+            args = (input_file.name, input_file.read())
+        finally:
+            input_file.close_intelligently()
+
+        file_options = dict(options, **config.options_for(input_file.name))
+
+        if baseline and not update_baseline:
+            file_options['baseline'] = baselines.get(input_file.name)
+
+        if size_baseline:
+            file_options['size_baseline'] = sizes.get(input_file.name)
+
+        started = time.time()
+
+        try:
+            if not timeout and not max_memory and not batch:
+                exit_code = max(exit_code, lint_file(*args, **file_options))
 
-    linter = Linter(input_file, verbose=verbose, debug=debug)
-    exit_code = linter.lint()
+                continue
+
+            exit_code = max(exit_code, lint_isolated(args, file_options,
+                                                     timeout, max_memory))
+        finally:
+            if timings:
+                file_timings[input_file.name] = round(time.time() - started,
+                                                      3)
+
+    if timings:
+        write_timings(timings, file_timings)
+
+    if 'summaries' in options:
+        if summaries_file:
+            write_summaries(summaries_file, options['summaries'])
+
+        dead_code_status = report_dead_code(
+            options['summaries'], baselines if baseline else None,
+            update_baseline, options.get('metrics'))
+        exit_code = max(exit_code, dead_code_status)
+
+    if 'fingerprints' in options:
+        write_baseline(baseline, options['fingerprints'])
+
+    if 'code_sizes' in options:
+        write_size_baseline(size_baseline, options['code_sizes'])
+
+    if 'layouts' in options:
+        write_layouts(layout_file, options['layouts'])
+
+    if metrics_file:
+        options['metrics'].write(metrics_file)
+
+    if batch and resource:
+        click.echo('Peak memory {:.1f} MB, {:.1f} MB in workers'.format(
+            peak_memory(resource.RUSAGE_SELF),
+            peak_memory(resource.RUSAGE_CHILDREN)), err=True)
 
     if exit_status:
         sys.exit(exit_code)
 
 
+def lint_inputs(input_files, files_from):
+    """
+    The files given as arguments and then those named in `files_from`, each
+    opened only when it's read so a long list doesn't hold open files.
+    """
+    for input_file in input_files:
+        yield input_file
+
+    if not files_from:
+        return
+
+    for line in files_from:
+        filename = line.strip()
+
+        if not filename:
+            continue
+
+        try:
+            yield click.utils.LazyFile(filename, 'rb')
+        except (IOError, OSError) as e:
+            raise click.FileError(filename, hint=e.strerror)
+
+
+def peak_memory(who):
+    # ru_maxrss is in kilobytes, except on OS X where it's in bytes
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+
+    return resource.getrusage(who).ru_maxrss / float(scale)
+
+
+def lint_file_collected(filename, code, **options):
+    """
+    lint_file for a worker process, also returning the metrics and the
+    per-file results (COLLECTED) it gathered since the worker's copies of
+    them are otherwise lost.
+    """
+    return (lint_file(filename, code, **options), options.get('metrics'),
+            dict((name, options[name]) for name in COLLECTED
+                 if options.get(name) is not None))
+
+
+def lint_isolated(args, options, timeout, max_memory):
+    metrics = options.get('metrics')
+    collected = [name for name in COLLECTED if options.get(name) is not None]
+
+    # isolate each file so a pathological one can't stall the batch
+    if metrics or collected:
+        worker_options = dict(options)
+
+        if metrics:
+            worker_options['metrics'] = Metrics()
+
+        for name in collected:
+            worker_options[name] = {}
+
+        # a worker that has the file's summary needn't summarize it again
+        summaries = options.get('summaries') or {}
+        summarized = os.path.normpath(args[0])
+
+        if summarized in summaries:
+            worker_options['summaries'][summarized] = summaries[summarized]
+
+        status, value = run_isolated(lint_file_collected, args,
+                                     worker_options, timeout=timeout,
+                                     max_memory=max_memory)
+
+        if status == 'done':
+            value, worker_metrics, worker_collected = value
+
+            if metrics:
+                metrics.merge(worker_metrics)
+
+            for name in collected:
+                options[name].update(worker_collected[name])
+    else:
+        status, value = run_isolated(lint_file, args, options,
+                                     timeout=timeout, max_memory=max_memory)
+
+    if status == 'done':
+        return value
+
+    filename = args[0]
+
+    if status == 'timeout':
+        diagnostic = Diagnostic(filename, 1, 0, LINT_TIMEOUT,
+                                'Linting took longer than {} seconds'
+                                .format(timeout))
+    elif status == 'memory':
+        diagnostic = Diagnostic(filename, 1, 0, MEMORY_LIMIT_EXCEEDED,
+                                'Linting needed more than {} MB'
+                                .format(max_memory))
+    else:
+        diagnostic = Diagnostic(filename, 1, 0, LINT_FAILED,
+                                'Linting failed: {}'.format(value))
+
+    click.echo(format_diagnostic(diagnostic))
+
+    if metrics:
+        metrics.increment('serplint_files_linted')
+        metrics.increment('serplint_diagnostics', code=diagnostic.code)
+
+    return 1
+
+
+@serplint.command()
+@click.option('--timings', type=click.Path(exists=True, dir_okay=False),
+              multiple=True, help='A shard\'s timings file to combine.')
+@click.option('--write-timings', 'timings_output',
+              type=click.Path(dir_okay=False),
+              help='Write the combined timings to this file.')
+@click.argument('reports', type=click.File('r'), nargs=-1, required=True)
+def merge(reports, timings, timings_output):
+    """
+    Combine the output of sharded runs into one sorted report, exiting with 1
+    if any shard reported a diagnostic.
+    """
+    diagnostics = set()
+
+    for report in reports:
+        for line in report:
+            match = RE_DIAGNOSTIC.match(click.unstyle(line.rstrip('\n')))
+
+            # reports and other output aren't merged, only diagnostics
+            if match:
+                diagnostics.add(Diagnostic(
+                    match.group('filename'), int(match.group('line')),
+                    int(match.group('character')), match.group('code'),
+                    match.group('message')))
+
+    for diagnostic in sorted(diagnostics):
+        click.echo(format_diagnostic(diagnostic))
+
+    if timings_output:
+        combined = {}
+
+        for path in timings:
+            combined.update(read_timings(path))
+
+        write_timings(timings_output, combined)
+
+    sys.exit(1 if diagnostics else 0)
+
+
+@serplint.command()
+@click.option('--parser', type=click.Choice(PARSERS), default=DEFAULT_PARSER,
+              help='Parse with serpent or the pure-Python port.')
+@click.option('--cache', 'cache_dir', type=click.Path(file_okay=False),
+              help='Directory of lint results by file content (default: '
+                   'serplint in the git directory).')
+@click.argument('old')
+@click.argument('new')
+@click.pass_obj
+def diff(config, old, new, parser, cache_dir):
+    """
+    Report the diagnostics introduced (+) and fixed (-) between two git
+    revisions, exiting with 1 if any were introduced. Only files that differ
+    are linted, straight from git's objects; insets are read from the working
+    tree.
+    """
+    if parser == 'serpent' and not serpent:
+        raise click.UsageError('--parser=serpent needs serpent installed')
+
+    root = git('rev-parse', '--show-toplevel').decode('utf-8').strip()
+    git_dir = git('rev-parse', '--git-dir').decode('utf-8').strip()
+    cache_dir = cache_dir or os.path.join(os.path.abspath(git_dir),
+                                          'serplint')
+    changes = changed_files(old, new)
+    blobs = read_blobs(set(sha for change in changes for sha in change[:2]
+                           if sha != NULL_SHA))
+
+    config = config or Config()
+    introduced = 0
+
+    def options_for(path):
+        # the defaults, then --parser, then the path's own settings, as lint
+        # applies them
+        options = dict(config.lint_options(path), parser=parser)
+        options.update(config.options_for(path))
+
+        return options
+
+    for old_sha, new_sha, old_path, new_path in changes:
+        old_diagnostics, new_diagnostics = [
+            lint_revision(root, path, sha, blobs, cache_dir,
+                          options_for(path))
+            for path, sha in [(old_path, old_sha), (new_path, new_sha)]]
+
+        for sign, path, diagnostics in [
+                ('-', old_path, unmatched(old_diagnostics, new_diagnostics)),
+                ('+', new_path, unmatched(new_diagnostics, old_diagnostics))]:
+            for diagnostic in diagnostics:
+                click.echo('{} {}'.format(sign, format_diagnostic(
+                    Diagnostic(path, *diagnostic[:4]))))
+
+                if sign == '+':
+                    introduced += 1
+
+    sys.exit(1 if introduced else 0)
+
+
+NULL_SHA = '0' * 40
+
+
+def git(*args, **kwargs):
+    """
+    Run a git command, returning its (binary) output.
+    """
+    process = subprocess.Popen(('git',) + args, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    output, error = process.communicate(kwargs.get('input'))
+
+    if process.returncode:
+        raise click.ClickException('git {} failed: {}'.format(
+            args[0], error.decode('utf-8', 'replace').strip()))
+
+    return output
+
+
+def changed_files(old, new):
+    """
+    (old blob, new blob, old path, new path) for each .se file that differs
+    between two revisions, following renames; a blob is NULL_SHA on the side
+    where the file doesn't exist.
+    """
+    fields = git('diff-tree', '-r', '-z', '-M', old,
+                 new).decode('utf-8').split('\0')
+    changes = []
+
+    while len(fields) > 1:
+        _, _, old_sha, new_sha, status = fields.pop(0).split(' ')
+        old_path = new_path = fields.pop(0)
+
+        # renames and copies name both paths
+        if status[0] in 'RC':
+            new_path = fields.pop(0)
+
+        if old_path.endswith('.se') or new_path.endswith('.se'):
+            changes.append((old_sha, new_sha, old_path, new_path))
+
+    return changes
+
+
+def read_blobs(shas):
+    """
+    The contents of many blobs from one `git cat-file --batch`.
+    """
+    shas = sorted(shas)
+
+    if not shas:
+        return {}
+
+    output = git('cat-file', '--batch',
+                 input=''.join(sha + '\n' for sha in shas).encode('ascii'))
+
+    blobs = {}
+    position = 0
+
+    for sha in shas:
+        end = output.index(b'\n', position)
+        size = int(output[position:end].split(b' ')[2])
+
+        blobs[sha] = output[end + 1:end + 1 + size]
+        position = end + 1 + size + 1
+
+    return blobs
+
+
+def lint_revision(root, path, sha, blobs, cache_dir, options):
+    """
+    [line, character, code, message, fingerprint] for each diagnostic in one
+    revision of a file, cached by the blob's id (a hash of its content). A
+    file that can't be linted at all fails the diff rather than being cached
+    as clean.
+    """
+    if sha == NULL_SHA or not path.endswith('.se'):
+        return []
+
+    key = hashlib.sha1('\0'.join([
+        sha, path, json.dumps(options, sort_keys=True, default=sorted),
+        serpent.VERSION if serpent else '',
+        linter_digest()]).encode('utf-8')).hexdigest()
+    cached = os.path.join(cache_dir, key[:2], key + '.json')
+
+    if os.path.exists(cached):
+        with open(cached) as cached_file:
+            return json.load(cached_file)
+
+    cwd = os.getcwd()
+    directory = os.path.join(root, os.path.dirname(path))
+
+    # serpent finds inset files relative to the working directory
+    os.chdir(directory if os.path.isdir(directory) else root)
+
+    try:
+        linter = Linter(source_file(blobs[sha], path), echo=False,
+                        **options)
+
+        try:
+            linter.lint()
+        except SystemExit:
+            # unparseable code exits once it has reported the parse error
+            pass
+    finally:
+        os.chdir(cwd)
+
+    if linter.failure is not None:
+        # not cached, since it may not fail the next time
+        raise click.ClickException('Linting {} failed: {}'.format(
+            path, linter.failure))
+
+    diagnostics = [list(diagnostic[1:]) + [linter.fingerprint(diagnostic)]
+                   for diagnostic in linter.reported]
+
+    try:
+        os.makedirs(os.path.dirname(cached))
+    except OSError:
+        pass
+
+    with open(cached, 'w') as cached_file:
+        json.dump(diagnostics, cached_file)
+
+    return diagnostics
+
+
+# resolved on import: under Python 2 __file__ can be relative, and diff
+# changes directory
+SOURCE = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+
+
+def linter_digest():
+    """
+    A hash of serplint's own source, so cached results from another version
+    aren't reused.
+    """
+    if not hasattr(linter_digest, 'digest'):
+        with open(SOURCE, 'rb') as source:
+            linter_digest.digest = hashlib.sha1(source.read()).hexdigest()
+
+    return linter_digest.digest
+
+
+def unmatched(diagnostics, others):
+    """
+    The diagnostics with no counterpart in `others`, matched by fingerprint
+    as baselines are.
+    """
+    remaining = defaultdict(int)
+
+    for other in others:
+        remaining[other[4]] += 1
+
+    result = []
+
+    for diagnostic in diagnostics:
+        if remaining[diagnostic[4]]:
+            remaining[diagnostic[4]] -= 1
+        else:
+            result.append(diagnostic)
+
+    return result
+
+
 # pylint: disable=no-value-for-parameter
 if __name__ == '__main__':
     serplint()
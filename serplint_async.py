@@ -0,0 +1,96 @@
+"""
+An asyncio interface for linting many sources at once (Python 3.6+).
+
+    async for result in lint_many(sources, concurrency=4, timeout=30):
+        for diagnostic in result.diagnostics:
+            ...
+
+Each source is linted by `serplint.lint_source` in a child process of its
+own, since serpent blocks and redirects the process' stdout while it
+compiles, and a source that runs past its timeout has to be killed.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+import serplint
+
+
+async def _iterate(sources):
+    if hasattr(sources, '__aiter__'):
+        async for source in sources:
+            yield source
+    else:
+        for source in sources:
+            yield source
+
+
+async def _lint(executor, filename, code, timeout, options, closed):
+    loop = asyncio.get_event_loop()
+
+    status, value = await loop.run_in_executor(
+        executor, functools.partial(
+            serplint.run_isolated, serplint.lint_source, (code, filename),
+            options, timeout=timeout, cancelled=closed.is_set))
+
+    if status == 'done':
+        return value
+
+    if status == 'timeout':
+        message = 'Linting took longer than {} seconds'.format(timeout)
+        code = serplint.LINT_TIMEOUT
+    else:
+        message = 'Linting failed: {}'.format(value)
+        code = serplint.LINT_FAILED
+
+    return serplint.LintResult(
+        filename, 1, [serplint.Diagnostic(filename, 1, 0, code, message)])
+
+
+async def lint_many(sources, concurrency=None, timeout=None, **options):
+    """
+    Lint an iterable or async iterable of (filename, code) pairs, yielding a
+    LintResult for each as soon as it is done (not in input order).
+
+    At most `concurrency` sources are linted (or read from `sources`) at a
+    time, so a slow consumer or a huge batch doesn't pile up work. A source
+    that takes longer than `timeout` seconds has its process killed and
+    yields an E102 result instead, and closing the generator early kills
+    the ones still running. Other keyword arguments are passed on to
+    `serplint.Linter`.
+    """
+    concurrency = concurrency or os.cpu_count() or 1
+    # threads waiting on each source's process
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    closed = threading.Event()
+    pending = set()
+
+    try:
+        async for filename, code in _iterate(sources):
+            if len(pending) >= concurrency:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done:
+                    yield task.result()
+
+            pending.add(asyncio.ensure_future(
+                _lint(executor, filename, code, timeout, options, closed)))
+
+        while pending:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                yield task.result()
+    finally:
+        closed.set()
+
+        for task in pending:
+            task.cancel()
+
+        executor.shutdown(wait=False)
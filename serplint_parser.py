@@ -0,0 +1,545 @@
+"""
+A pure-Python port of serpent's tokenizer and parser (tokenize.cpp and
+parser.cpp from serpent 2.0), producing the same tree of Astnode and Token
+objects as `serpent.parse` without needing the C++ extension.
+
+It follows serpent's quirks closely, including its line and character
+metadata, since the linter's checks and positions depend on them.
+"""
+
+import os
+
+TOKEN = 0
+ASTNODE = 1
+
+# character types
+SPACE = 2
+BRACK = 3
+SQUOTE = 4
+DQUOTE = 5
+SYMB = 6
+ALPHANUM = 7
+
+# token types
+LPAREN = 8
+RPAREN = 9
+COMMA = 10
+UNARY_OP = 12
+BINARY_OP = 13
+COMPOUND = 14
+TOKEN_SPLITTER = 15
+
+# these appear as independent tokens even if inside a stream of symbols
+ATOMS = ['#', '//', '(', ')', '[', ']', '{', '}']
+ATOM_ENDINGS = set(atom[-1] for atom in ATOMS)
+
+PRECEDENCE = {
+    '.': -1, '::': -1,
+    '!': 1, 'not': 1,
+    '^': 2, '**': 2,
+    '*': 3, '/': 3, '%': 3,
+    '+': 4, '-': 4,
+    '<': 5, '>': 5, '<=': 5, '>=': 5,
+    '&': 6, '|': 6, 'xor': 6, '==': 6, '!=': 6,
+    '&&': 7, 'and': 7,
+    '||': 8, 'or': 8,
+    '=': 10, '+=': 10, '-=': 10, '*=': 10, '/=': 10, '%=': 10,
+    ':': 11,
+}
+
+# commands that take an argument on the same line
+BODIED = ['if', 'elif', 'while', 'with', 'def', 'extern', 'data', 'assert',
+          'return', 'fun', 'scope', 'macro', 'type', 'event']
+
+# commands meant to continue the previous one
+BODIED_CONTINUED = [('if', 'elif'), ('elif', 'else'), ('elif', 'elif'),
+                    ('if', 'else')]
+
+
+class ParseError(Exception):
+    pass
+
+
+class Metadata(object):
+    def __init__(self, li):
+        self.file = li[0]
+        self.ln = li[1]
+        self.ch = li[2]
+
+    def out(self):
+        return [self.file, self.ln, self.ch]
+
+
+class Token(object):
+    def __init__(self, val, metadata):
+        self.val = val
+        self.metadata = Metadata(metadata)
+        self.args = []
+        self.toktype = None
+
+    def __repr__(self):
+        return str(self.val)
+
+
+class Astnode(object):
+    def __init__(self, val, args, metadata):
+        self.val = val
+        self.args = list(args)
+        self.metadata = Metadata(metadata)
+
+    def __repr__(self):
+        return '({})'.format(' '.join([self.val] +
+                                      [repr(arg) for arg in self.args]))
+
+
+def err(message, metadata):
+    # serpent prints the position as unsigned, so -1 is 4294967295
+    raise ParseError('Error (file "{}", line {}, char {}): {}'.format(
+        metadata[0], (metadata[1] + 1) % 2 ** 32, metadata[2] % 2 ** 32,
+        message))
+
+
+CHARTYPES = dict(
+    [(c, ALPHANUM) for c in '0123456789abcdefghijklmnopqrstuvwxyz'
+                            'ABCDEFGHIJKLMNOPQRSTUVWXYZ~_$@'] +
+    [(c, SPACE) for c in '\t \n\r'] +
+    [(c, BRACK) for c in '()[]{}'] +
+    [('"', DQUOTE), ('\'', SQUOTE)])
+
+
+def chartype(c):
+    return CHARTYPES.get(c, SYMB)
+
+
+def tokenize(inp, filename='main', ln=0):
+    """
+    Split a line into tokens: "y = f(45,124)/3" becomes y, =, f, (, 45, ",",
+    124, ), / and 3.
+    """
+    tokens = []
+    curtype = SPACE
+    pos = 0
+    last_newline = 0
+    ch = 0
+    cur = ''
+
+    def token(val):
+        tokens.append(Token(val, [filename, ln, ch]))
+
+    inp += ' '
+    length = len(inp)
+
+    while pos < length:
+        headtype = CHARTYPES.get(inp[pos], SYMB)
+
+        if curtype in (SQUOTE, DQUOTE):
+            if headtype == curtype:
+                # close quote
+                cur += inp[pos]
+                token(cur)
+                cur = ''
+                ch = pos - last_newline
+                curtype = SPACE
+                pos += 1
+            elif length >= pos + 2 and inp[pos] == '\\':
+                cur += inp[pos:pos + 2]
+                pos += 2
+            else:
+                cur += inp[pos]
+                pos += 1
+        else:
+            for atom in ATOMS if cur[-1:] in ATOM_ENDINGS else ():
+                split = len(cur) - len(atom)
+
+                if split >= 0 and cur[split:] == atom:
+                    if split > 0:
+                        token(cur[:split])
+
+                    ch += split
+                    token(cur[split:])
+                    ch = pos - last_newline
+                    cur = ''
+                    curtype = SPACE
+
+            # special case the minus sign
+            if len(cur) > 1 and cur[-1] in '-!':
+                token(cur[:-1])
+                token(cur[-1])
+                cur = ''
+
+            # boundary between different character types
+            if headtype != curtype:
+                if curtype != SPACE and cur != '':
+                    token(cur)
+
+                ch = pos - last_newline
+                cur = ''
+
+            cur += inp[pos]
+            curtype = headtype
+            pos += 1
+
+        if pos < length and inp[pos] == '\n':
+            last_newline = pos
+            ch = 0
+            ln += 1
+
+    return tokens
+
+
+def toktype(node):
+    if isinstance(node, Astnode):
+        return COMPOUND
+
+    # tokens are classified over and over while they sit on the stack
+    if node.toktype is None:
+        node.toktype = classify(node)
+
+    return node.toktype
+
+
+def classify(node):
+    val = node.val
+
+    if val in ('(', '[', '{'):
+        return LPAREN
+    elif val in (')', ']', '}'):
+        return RPAREN
+    elif val == ',':
+        return COMMA
+    elif val in ('!', '~', 'not'):
+        return UNARY_OP
+    elif PRECEDENCE.get(val, 0) > 0:
+        return BINARY_OP
+    elif PRECEDENCE.get(val, 0) < 0:
+        return TOKEN_SPLITTER
+
+    if val[:1] not in ('"', '\''):
+        for c in val:
+            if chartype(c) == SYMB:
+                err('Invalid symbol: ' + val, node.metadata.out())
+
+    return ALPHANUM
+
+
+def precedence(node):
+    return PRECEDENCE.get(node.val, 0) if isinstance(node, Token) else 0
+
+
+def shunting_yard(tokens):
+    """
+    Convert a line's tokens to reverse polish notation.
+    """
+    output = []
+    stack = []
+    toktyp = 0
+
+    for tok in tokens:
+        prevtyp = toktyp
+        toktyp = toktype(tok)
+
+        if toktyp == ALPHANUM:
+            output.append(tok)
+        elif toktyp == LPAREN:
+            while stack and toktype(stack[-1]) == TOKEN_SPLITTER:
+                output.append(stack.pop())
+
+            if prevtyp not in (ALPHANUM, RPAREN):
+                output.append(Token('id', tok.metadata.out()))
+
+            stack.append(tok)
+            output.append(tok)
+        elif toktyp == RPAREN:
+            while stack and toktype(stack[-1]) != LPAREN:
+                output.append(stack.pop())
+
+            if stack:
+                stack.pop()
+
+            output.append(tok)
+        elif toktyp == UNARY_OP:
+            stack.append(tok)
+        elif toktyp == TOKEN_SPLITTER:
+            while stack and toktype(stack[-1]) == TOKEN_SPLITTER:
+                output.append(stack.pop())
+
+            stack.append(tok)
+        elif toktyp == BINARY_OP:
+            if tok.val == '-' and prevtyp not in (ALPHANUM, RPAREN):
+                # unary minus is 0 - x
+                stack.append(tok)
+                output.append(Token('0', tok.metadata.out()))
+            else:
+                prec = precedence(tok)
+
+                while (stack and
+                       toktype(stack[-1]) in (BINARY_OP, UNARY_OP,
+                                              TOKEN_SPLITTER) and
+                       precedence(stack[-1]) <= prec):
+                    output.append(stack.pop())
+
+                stack.append(tok)
+        elif toktyp == COMMA:
+            while stack and toktype(stack[-1]) != LPAREN:
+                output.append(stack.pop())
+
+    while stack:
+        output.append(stack.pop())
+
+    return output
+
+
+def treefy(stream):
+    """
+    Convert reverse polish notation into a tree.
+    """
+    output = []
+
+    for tok in stream:
+        typ = toktype(tok)
+
+        if typ in (UNARY_OP, BINARY_OP, TOKEN_SPLITTER):
+            rounds = 1 if typ == UNARY_OP else 2
+
+            if len(output) < rounds:
+                err('Line malformed, not enough args for ' + tok.val,
+                    tok.metadata.out())
+
+            args = output[-rounds:]
+            del output[-rounds:]
+
+            output.append(Astnode(tok.val, args, tok.metadata.out()))
+        elif typ == RPAREN:
+            args = []
+
+            while True:
+                if not output:
+                    err('Bracket without matching', tok.metadata.out())
+
+                if toktype(output[-1]) == LPAREN:
+                    break
+
+                args.append(output.pop())
+
+            output.pop()
+
+            if not output:
+                err('Bracket without matching', tok.metadata.out())
+
+            args.append(output.pop())
+
+            # a[b] is (access a b)
+            if tok.val == ']':
+                args.append(Token('access', tok.metadata.out()))
+
+            if isinstance(args[-1], Astnode):
+                args.append(Token('fun', tok.metadata.out()))
+
+            fun = args.pop().val
+
+            # [1, 2, 3] is (array_lit 1 2 3)
+            if fun == 'access' and args and args[-1].val == 'id':
+                fun = 'array_lit'
+                args.pop()
+
+            args.reverse()
+
+            # 2 + (3 * 5) is 2 ( id 3 5 * ) +, with id as a dummy function
+            if fun == 'id' and len(args) == 1:
+                output.append(args[0])
+            else:
+                output.append(Astnode(fun, args, tok.metadata.out()))
+        else:
+            output.append(tok)
+
+        last = output[-1]
+
+        if (last.val in ('inset', 'import', 'create') and
+                len(last.args) == 1 and isinstance(last.args[0], Token)):
+            output[-1] = include(last, tok.metadata)
+
+    if not output:
+        err('Output blank', ['main', -1, -1])
+    elif len(output) > 1:
+        return Astnode('multi', output, output[0].metadata.out())
+
+    return output[0]
+
+
+def include(node, metadata):
+    """
+    Parse the file named by inset('file.se'), or wrap the one named by
+    import or create in (outer ...), relative to the including file.
+    """
+    root = os.path.dirname(metadata.file)
+    filename = node.args[0].val[1:-1]
+    path = root + '/' + filename if root else filename
+
+    if not os.path.isfile(path):
+        err('File does not exist: ' + path, metadata.out())
+
+    if node.val == 'inset':
+        return parse_file(path)
+
+    node.args = [Astnode('outer', [parse_file(path)], metadata.out())]
+
+    return node
+
+
+def space_count(line):
+    return len(line) - len(line.lstrip(' \t'))
+
+
+def is_line_empty(line):
+    # the first token starts at the first non-space character, so only lines
+    # starting with / ('///' isn't a comment) or an unclosed quote (which
+    # never becomes a token) need tokenizing
+    stripped = line.strip(' \t\r\n')
+
+    if not stripped or stripped[0] == '#':
+        return True
+
+    if stripped[0] not in '/"\'':
+        return False
+
+    tokens = tokenize(line)
+
+    return not tokens or tokens[0].val in ('#', '//')
+
+
+def continues(previous, current):
+    return (previous, current) in BODIED_CONTINUED
+
+
+def parse_lines(lines, filename, first_line, indent):
+    statements = []
+    i = 0
+
+    while i < len(lines):
+        ln = first_line + i
+        line = lines[i]
+
+        if is_line_empty(line):
+            i += 1
+            continue
+
+        if space_count(line) != indent:
+            err('Indent mismatch', [filename, ln, 0])
+
+        tokens = tokenize(line[indent:], filename, ln)
+        code = []
+
+        for token in tokens:
+            if token.val in ('#', '//'):
+                break
+
+            code.append(token)
+
+        expecting_child_block = False
+
+        if code and code[-1].val == ':':
+            code.pop()
+            expecting_child_block = True
+
+        out = treefy(shunting_yard(code))
+
+        child_indent = None
+        child_block = []
+
+        while True:
+            i += 1
+
+            if i >= len(lines):
+                break
+
+            if is_line_empty(lines[i]):
+                child_block.append('')
+                continue
+
+            spaces = space_count(lines[i])
+
+            if spaces <= indent:
+                break
+
+            child_block.append(lines[i])
+
+            if child_indent is None or spaces < child_indent:
+                child_indent = spaces
+
+        child_block_empty = not any(child_block)
+
+        if expecting_child_block:
+            if child_block_empty:
+                err('Expected indented child block!', out.metadata.out())
+
+            if isinstance(out, Token):
+                out = Astnode(out.val, [], out.metadata.out())
+
+            out.args.append(parse_lines(child_block, filename, ln + 1,
+                                        child_indent))
+        elif not child_block_empty:
+            err('Did not expect indented child block!', out.metadata.out())
+        elif (out.val == 'multi' and out.args and
+              out.args[-1].val == ':'):
+            colon = out.args.pop()
+            out.args.extend(colon.args[:2])
+
+        # bring if and elif and the like back into the tree
+        if tokens[0].val in BODIED and out.val == 'multi':
+            if out.args[0].val == 'id':
+                out = Astnode(tokens[0].val, out.args[1].args,
+                              out.metadata.out())
+            elif isinstance(out.args[0], Token):
+                out = Astnode(tokens[0].val, out.args[1:],
+                              out.metadata.out())
+            else:
+                out = Astnode('fun', out.args, out.metadata.out())
+
+        if out.val == 'multi':
+            err('Multiple expressions or unclosed bracket',
+                out.metadata.out())
+
+        if not statements or isinstance(statements[-1], Token):
+            statements.append(out)
+            continue
+
+        # build constructions like
+        # (if (< x 5) a (elif (< x 10) b (else c)))
+        if continues(statements[-1].val, out.val):
+            chain = [statements[-1]]
+
+            while True:
+                if not continues(chain[-1].val, out.val):
+                    chain.pop()
+                    break
+
+                if (not chain[-1].args or
+                        not continues(chain[-1].val,
+                                      chain[-1].args[-1].val)):
+                    break
+
+                chain.append(chain[-1].args[-1])
+
+            chain[-1].args.append(out)
+        else:
+            statements.append(out)
+
+    if len(statements) == 1:
+        return statements[0]
+    elif statements:
+        return Astnode('seq', statements, statements[0].metadata.out())
+
+    return Astnode('seq', [], ['main', -1, -1])
+
+
+def parse(code, filename='main'):
+    """
+    Parse serpent code like `serpent.parse`, raising ParseError with
+    serpent's message format on invalid code.
+    """
+    return parse_lines(code.split('\n'), filename, 0, 0)
+
+
+def parse_file(path):
+    with open(path) as source:
+        return parse(source.read(), path)
@@ -0,0 +1,123 @@
+"""
+A pytest plugin (pytest 7+) that lints `*.se` files as test items:
+
+    pytest --serplint contracts/
+
+Each contract becomes one item that fails with its diagnostics. A file that
+linted clean is skipped until it, a file it includes, serplint or serpent
+changes, using pytest's cache, and items are independent so pytest-xdist can
+spread them over workers. Per-path settings in serplint's configuration file
+apply as they do on the command line.
+"""
+
+import hashlib
+import json
+import os
+
+import pytest
+
+import serplint
+
+CACHE_PREFIX = 'serplint/clean/'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('serplint')
+    group.addoption('--serplint', action='store_true',
+                    help='Lint *.se files with serplint.')
+    group.addoption('--serplint-parser', choices=serplint.PARSERS,
+                    default=serplint.DEFAULT_PARSER,
+                    help='Parser serplint uses (default: %(default)s).')
+
+
+def pytest_configure(config):
+    config.addinivalue_line('markers', 'serplint: serplint checks')
+
+    # read once per session rather than per item
+    if config.getoption('serplint'):
+        config.serplint_config = serplint.read_config()
+
+
+def pytest_collect_file(file_path, parent):
+    if file_path.suffix == '.se' and parent.config.getoption('serplint'):
+        return SerplintFile.from_parent(parent, path=file_path)
+
+    return None
+
+
+class SerplintError(Exception):
+    pass
+
+
+class SerplintFile(pytest.File):
+    def collect(self):
+        yield SerplintItem.from_parent(self, name='serplint')
+
+
+class SerplintItem(pytest.Item):
+    def __init__(self, **kwargs):
+        super(SerplintItem, self).__init__(**kwargs)
+
+        self.add_marker('serplint')
+
+        self.options = dict(
+            {'parser': self.config.getoption('serplint_parser')},
+            **self.config.serplint_config.lint_options(
+                os.path.relpath(str(self.path))))
+        self.code = None
+        self.fingerprint = None
+
+    def cache_key(self):
+        # one key per file, so xdist workers never overwrite each other
+        return CACHE_PREFIX + hashlib.sha1(
+            str(self.path).encode('utf-8')).hexdigest()
+
+    def setup(self):
+        with open(str(self.path), 'rb') as source:
+            self.code = source.read()
+
+        # the source, the files it includes and serpent's version (all in
+        # artifact_key), serplint's own version and the options
+        self.fingerprint = hashlib.sha1('\0'.join([
+            serplint.artifact_key(str(self.path)),
+            serplint.linter_digest(),
+            json.dumps(self.options, sort_keys=True, default=sorted),
+        ]).encode('utf-8')).hexdigest()
+
+        cache = getattr(self.config, 'cache', None)
+
+        if cache and cache.get(self.cache_key(), None) == self.fingerprint:
+            pytest.skip('unchanged since it last linted clean')
+
+    def runtest(self):
+        cwd = os.getcwd()
+
+        # serpent finds inset files relative to the working directory
+        os.chdir(str(self.path.parent))
+
+        try:
+            result = serplint.lint_source(self.code, self.path.name,
+                                          **self.options)
+        finally:
+            os.chdir(cwd)
+
+        if result.exit_code:
+            raise SerplintError(result.diagnostics)
+
+        cache = getattr(self.config, 'cache', None)
+
+        if cache:
+            cache.set(self.cache_key(), self.fingerprint)
+
+    def repr_failure(self, excinfo, style=None):
+        if excinfo.errisinstance(SerplintError):
+            return '\n'.join(
+                '{}:{}:{} {} {}'.format(self.path.name, diagnostic.line,
+                                        diagnostic.character,
+                                        diagnostic.code, diagnostic.message)
+                for diagnostic in excinfo.value.args[0])
+
+        return super(SerplintItem, self).repr_failure(excinfo, style)
+
+    def reportinfo(self):
+        return self.path, None, 'serplint: {}'.format(self.path.name)
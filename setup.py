@@ -23,7 +23,8 @@ setup(
     version='1.4.0',
     license='MIT',
     packages=find_packages(),
-    py_modules=['serplint'],
+    py_modules=['serplint', 'serplint_async', 'serplint_parser',
+                'serplint_pytest'],
     entry_points={
         'console_scripts': [
             'serplint = serplint:serplint',
@@ -0,0 +1,9 @@
+import sys
+
+# the contracts' own tests (cyberdyne/test) need pyethereum; serplint only
+# lints the contracts
+collect_ignore = ['cyberdyne']
+
+# serplint_async needs Python 3.6+
+if sys.version_info < (3, 6):
+    collect_ignore.append('test_async.py')
@@ -0,0 +1,57 @@
+import asyncio
+import multiprocessing
+import time
+
+import serplint
+import serplint_async
+
+CLEAN = u'def transfer(to):\n    return(to)\n'
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+def run(coroutine):
+    return asyncio.new_event_loop().run_until_complete(coroutine)
+
+
+async def lint_many(sources, **options):
+    return sorted([result async for result in serplint_async.lint_many(
+        sources, parser='builtin', compile_contract=False, **options)])
+
+
+def slow(code, filename, **options):
+    if filename == 'slow.se':
+        time.sleep(10)
+
+    return serplint.LintResult(filename, 0, [])
+
+
+def test_lint_many():
+    results = run(lint_many([('a.se', CLEAN), ('b.se', UNUSED)],
+                            concurrency=1))
+
+    assert [(result.filename, result.exit_code) for result in results] == [
+        ('a.se', 0), ('b.se', 1)]
+    assert [d.code for d in results[1].diagnostics] == ['W202']
+
+
+def test_async_sources():
+    async def sources():
+        for name in ['a.se', 'b.se', 'c.se']:
+            yield name, CLEAN
+
+    results = run(lint_many(sources(), concurrency=2))
+
+    assert [result.filename for result in results] == ['a.se', 'b.se', 'c.se']
+
+
+def test_timeout_kills_the_worker(monkeypatch):
+    monkeypatch.setattr(serplint, 'lint_source', slow)
+    started = time.time()
+
+    results = run(lint_many([('slow.se', CLEAN), ('fast.se', CLEAN)],
+                            concurrency=2, timeout=0.5))
+
+    assert time.time() - started < 5
+    assert [(result.filename, [d.code for d in result.diagnostics])
+            for result in results] == [('fast.se', []), ('slow.se', ['E102'])]
+    assert multiprocessing.active_children() == []
@@ -0,0 +1,89 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+CONTRACT = u'''\
+def transfer(to, value):
+    balance = 0
+    return(to)
+'''
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+
+    return CliRunner()
+
+
+def run(runner, *args):
+    return runner.invoke(serplint.serplint,
+                         ['--parser', 'builtin', '--no-compile', '-e'] +
+                         list(args))
+
+
+def diagnostics(result):
+    return sorted(line.split(' ', 2)[:2]
+                  for line in result.output.splitlines()
+                  if serplint.RE_DIAGNOSTIC.match(line))
+
+
+def test_baseline_round_trip(runner, tmp_path):
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+
+    result = run(runner, '--baseline', 'baseline.json', '--write-baseline',
+                 'contract.se')
+
+    assert result.exit_code == 0
+    assert json.loads((tmp_path / 'baseline.json').read_text())[
+        'files']['contract.se']
+
+    result = run(runner, '--baseline', 'baseline.json', 'contract.se')
+
+    assert result.output == ''
+    assert result.exit_code == 0
+
+    # the baselined diagnostics still match once they've moved
+    (tmp_path / 'contract.se').write_text(
+        u'def init():\n    x = 1\n\n' + CONTRACT)
+
+    result = run(runner, '--baseline', 'baseline.json', 'contract.se')
+
+    assert diagnostics(result) == [['contract.se:2:5', 'W203']]
+    assert result.exit_code == 1
+
+
+def test_baseline_counts(runner, tmp_path):
+    (tmp_path / 'contract.se').write_text(
+        u'def total(a):\n    return(a + rate)\n')
+    run(runner, '--baseline', 'baseline.json', '--write-baseline',
+        'contract.se')
+
+    # a baselined diagnostic covers as many as were recorded
+    (tmp_path / 'contract.se').write_text(
+        u'def total(a):\n    return(a + rate + rate)\n')
+
+    result = run(runner, '--baseline', 'baseline.json', 'contract.se')
+
+    assert [code for _, code in diagnostics(result)] == ['E200']
+
+
+def test_baseline_batch(runner, tmp_path):
+    for name in ['a.se', 'b.se']:
+        (tmp_path / name).write_text(CONTRACT)
+
+    run(runner, '--batch', '--baseline', 'baseline.json', '--write-baseline',
+        'a.se', 'b.se')
+
+    assert sorted(json.loads((tmp_path / 'baseline.json').read_text())[
+        'files']) == ['a.se', 'b.se']
+
+    result = run(runner, '--batch', '--baseline', 'baseline.json', 'a.se',
+                 'b.se')
+
+    assert diagnostics(result) == []
+    assert result.exit_code == 0
+
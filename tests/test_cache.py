@@ -0,0 +1,63 @@
+import os
+
+import pytest
+
+import serplint
+
+pytest.importorskip('serpent')
+
+LIBRARY = u'macro double($x):\n    $x * 2\n'
+CONTRACT = u"inset('lib.se')\n\ndef twice(a):\n    return(double(a))\n"
+
+
+@pytest.fixture
+def contracts(tmp_path):
+    directory = tmp_path / 'contracts'
+    directory.mkdir()
+
+    (directory / 'lib.se').write_text(LIBRARY)
+    (directory / 'main.se').write_text(CONTRACT)
+
+    return directory
+
+
+def cached_files(cache_dir):
+    return [name for _, _, names in os.walk(cache_dir) for name in names]
+
+
+def test_source_and_path_keys_match(contracts, monkeypatch):
+    monkeypatch.chdir(str(contracts))
+    from_source = serplint.artifact_key(CONTRACT)
+
+    monkeypatch.chdir(str(contracts.parent))
+    from_path = serplint.artifact_key(os.path.join('contracts', 'main.se'))
+
+    assert from_source == from_path
+
+
+def test_key_changes_with_included_file(contracts, monkeypatch):
+    monkeypatch.chdir(str(contracts))
+    before = serplint.artifact_key(CONTRACT)
+
+    (contracts / 'lib.se').write_text(LIBRARY.replace('2', '3'))
+
+    assert serplint.artifact_key(CONTRACT) != before
+
+
+def test_lint_and_harness_share_entry(contracts, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / 'cache')
+
+    monkeypatch.chdir(str(contracts))
+    serplint.lint_source(CONTRACT, 'main.se', artifact_cache=cache_dir)
+
+    assert len(cached_files(cache_dir)) == 1
+
+    monkeypatch.chdir(str(contracts.parent))
+    metrics = serplint.Metrics()
+    bytecode, _ = serplint.compile_cached(
+        os.path.join('contracts', 'main.se'), cache_dir, metrics)
+
+    assert bytecode
+    assert len(cached_files(cache_dir)) == 1
+    assert metrics.counters[
+        ('serplint_cache_requests', (('result', 'hit'),))] == 1
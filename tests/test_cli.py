@@ -0,0 +1,46 @@
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+CLEAN = u'def transfer(to):\n    return(to)\n'
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+
+    return CliRunner()
+
+
+def test_help_lists_commands(runner):
+    result = runner.invoke(serplint.serplint, ['--help'])
+
+    assert result.exit_code == 0
+
+    for command in ['diff', 'lint', 'merge']:
+        assert '  {} '.format(command) in result.output
+
+
+def test_lint_is_the_default(runner, tmp_path):
+    (tmp_path / 'contract.se').write_text(UNUSED)
+
+    result = runner.invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', 'contract.se'])
+
+    assert result.output.startswith('contract.se:1:18 W202 ')
+    assert result.exit_code == 1
+
+
+def test_update_size_baseline_needs_a_baseline(runner, tmp_path):
+    (tmp_path / 'contract.se').write_text(CLEAN)
+
+    result = runner.invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '--update-size-baseline',
+        'contract.se'])
+
+    assert 'Error: --update-size-baseline needs --size-baseline' in (
+        result.output)
+    assert result.exit_code == 2
+
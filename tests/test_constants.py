@@ -0,0 +1,66 @@
+import pytest
+
+import serplint
+
+CONSTANT = u'''\
+def next():
+    P = 3
+    return(P + 1)
+'''
+
+POWER = u'''\
+def next():
+    P = 2
+    return(P ^ 8)
+'''
+
+FOLDED = u'''\
+def next():
+    return(2 ^ 8 + 1)
+'''
+
+OUT_OF_BOUNDS = u'''\
+data items[10]
+
+def set(value):
+    self.items[12] = value
+'''
+
+POWER_OUT_OF_BOUNDS = u'''\
+data items[2^3]
+
+def set(value):
+    self.items[8] = value
+    self.items[7] = value
+'''
+
+WRAPPED_SIZE = u'''\
+data items[2^256]
+
+def set(value):
+    self.items[1] = value
+'''
+
+
+def found(code):
+    result = serplint.lint_source(code, 'contract.se', parser='builtin',
+                                  compile_contract=False)
+
+    return sorted((d.line, d.character, d.code, d.message)
+                  for d in result.diagnostics)
+
+
+@pytest.mark.parametrize('code, expected', [
+    (CONSTANT, [(3, 14, 'W308', 'Expression is always 4 but is computed at '
+                 'runtime; writing the constant saves ~9 gas')]),
+    (POWER, [(3, 14, 'W308', 'Expression is always 256 but is computed at '
+              'runtime; writing the constant saves ~66 gas')]),
+    (FOLDED, []),
+    (OUT_OF_BOUNDS, [(4, 16, 'E203', 'Index 12 is out of bounds for '
+                      '"self.items" of size 10')]),
+    (POWER_OUT_OF_BOUNDS, [(4, 16, 'E203', 'Index 8 is out of bounds for '
+                            '"self.items" of size 8')]),
+    (WRAPPED_SIZE, []),
+])
+def test_constants(code, expected):
+    assert found(code) == expected
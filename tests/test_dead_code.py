@@ -0,0 +1,220 @@
+import json
+
+from click.testing import CliRunner
+
+import serplint
+
+CONTRACT = u'''\
+data balances[]
+data unread
+event Transfer(to)
+event Unlogged(to)
+
+macro twice($x):
+    $x * 2
+
+def init():
+    self.balances[msg.sender] = twice(1)
+    log(type=Transfer, msg.sender)
+
+def pay(to):
+    self.unread = self.balances[to]
+    return(self._fee(to))
+
+def _fee(value):
+    return(value / 100)
+
+def _unused(value):
+    return(self._also_unused(value))
+
+def _also_unused(value):
+    return(value)
+'''
+
+
+def summarize(summaries, code, filename='contract.se'):
+    serplint.lint_source(code, filename, parser='builtin',
+                         compile_contract=False, summaries=summaries)
+
+
+def dead(summaries):
+    return [(d.filename, d.line, d.code, d.message)
+            for d in serplint.dead_code(summaries)]
+
+
+def test_dead_code():
+    summaries = {}
+
+    summarize(summaries, CONTRACT)
+
+    assert sorted(dead(summaries)) == [
+        ('contract.se', 2, 'W206', 'Data "self.unread" is never read'),
+        ('contract.se', 4, 'W207', 'Event "Unlogged" is never logged'),
+        ('contract.se', 20, 'W204', 'Method "_unused" is never called'),
+        ('contract.se', 23, 'W204', 'Method "_also_unused" is never called'),
+    ]
+
+
+def test_public_methods_are_live():
+    summaries = {}
+
+    # nothing calls them, but they're in the ABI
+    summarize(summaries, u'def double(x):\n    return(x * 2)\n\n'
+                         u'def register(key, value):\n    return(0)\n')
+
+    assert dead(summaries) == []
+
+
+def test_extern_across_files():
+    summaries = {}
+
+    summarize(summaries, u'def _pay(to):\n    return(to)\n\n'
+                         u'def _refund(to):\n    return(0)\n')
+    summarize(summaries, u'extern contract: [_pay:[int256]:int256]\n\n'
+                         u'def init():\n    return(0)\n', 'caller.se')
+
+    assert dead(summaries) == [
+        ('contract.se', 4, 'W204', 'Method "_refund" is never called')]
+
+
+def test_macro_library():
+    summaries = {}
+
+    summarize(summaries, u'macro twice($x):\n    $x * 2\n')
+
+    assert dead(summaries) == [
+        ('contract.se', 1, 'W205', 'Macro "twice" is never used')]
+
+
+def test_inset_declarations_used_by_includer(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'lib.se').write_text(u'macro twice($x):\n    $x * 2\n\n'
+                                     u'macro thrice($x):\n    $x * 3\n')
+    summaries = {}
+
+    summarize(summaries, u'macro twice($x):\n    $x * 2\n\n'
+                         u'macro thrice($x):\n    $x * 3\n', 'lib.se')
+    summarize(summaries, u"inset('lib.se')\n\n"
+                         u'def f(x):\n    return(twice(x))\n')
+
+    assert dead(summaries) == [
+        ('lib.se', 4, 'W205', 'Macro "thrice" is never used')]
+
+
+def test_suppressed():
+    summaries = {}
+
+    summarize(summaries, u'def _unused(x):  # serplint: disable=W204\n'
+                         u'    return(x)\n')
+
+    assert dead(summaries) == []
+
+
+def test_unchanged_files_keep_their_summary(monkeypatch):
+    summaries = {}
+    summarize(summaries, CONTRACT)
+    calls = []
+    original = serplint.Linter.summarize
+
+    def counted(linter, contract_ast):
+        calls.append(linter.filename)
+
+        return original(linter, contract_ast)
+
+    monkeypatch.setattr(serplint.Linter, 'summarize', counted)
+
+    summarize(summaries, CONTRACT)
+
+    assert calls == []
+    assert len(dead(summaries)) == 4
+
+    summarize(summaries, CONTRACT.replace(u'_unused(value)', u'_fee(value)'))
+
+    assert calls == ['contract.se']
+    assert len(dead(summaries)) == 2
+
+
+def test_summaries_kept_between_runs(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+    (tmp_path / 'caller.se').write_text(
+        u'extern contract: [_unused:[int256]:int256]\n')
+
+    serplint.write_summaries('summaries.json', {})
+    summaries = serplint.read_summaries('summaries.json')
+    summarize(summaries, CONTRACT)
+    summarize(summaries, (tmp_path / 'caller.se').read_text(), 'caller.se')
+    serplint.write_summaries('summaries.json', summaries)
+
+    # only contract.se is linted again, against caller.se's kept summary
+    summaries = serplint.read_summaries('summaries.json')
+    summarize(summaries, CONTRACT)
+
+    assert [d.message for d in serplint.dead_code(summaries)
+            if d.code == 'W204'] == []
+
+
+def run(*args):
+    return CliRunner().invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', '--dead-code'] +
+        list(args))
+
+
+def test_baseline(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+
+    result = run('--baseline', 'baseline.json', '--write-baseline',
+                 'contract.se')
+
+    assert result.exit_code == 0
+    assert sum(json.loads((tmp_path / 'baseline.json').read_text())[
+        'files']['contract.se'].values()) == 4
+
+    result = run('--baseline', 'baseline.json', 'contract.se')
+
+    assert result.output == ''
+    assert result.exit_code == 0
+
+    (tmp_path / 'contract.se').write_text(
+        CONTRACT + u'\ndef _new(value):\n    return(value)\n')
+
+    result = run('--baseline', 'baseline.json', 'contract.se')
+
+    assert result.output == \
+        'contract.se:26:15 W204 Method "_new" is never called\n'
+    assert result.exit_code == 1
+
+
+def test_baseline_kept_for_files_not_linted(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+    (tmp_path / 'other.se').write_text(u'def f(x):\n    return(x)\n')
+
+    run('--summaries', 'summaries.json', '--baseline', 'baseline.json',
+        '--write-baseline', 'contract.se', 'other.se')
+
+    # updating from other.se alone doesn't count contract.se's again
+    run('--summaries', 'summaries.json', '--baseline', 'baseline.json',
+        '--write-baseline', 'other.se')
+    run('--summaries', 'summaries.json', '--baseline', 'baseline.json',
+        '--write-baseline', 'other.se')
+
+    assert sum(json.loads((tmp_path / 'baseline.json').read_text())[
+        'files']['contract.se'].values()) == 4
+
+    result = run('--summaries', 'summaries.json', '--baseline',
+                 'baseline.json', 'other.se')
+
+    assert result.output == ''
+    assert result.exit_code == 0
+
+
+def test_disabled_codes(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+
+    result = run('--disable', 'W204,W206,W207', 'contract.se')
+
+    assert result.output == ''
+    assert result.exit_code == 0
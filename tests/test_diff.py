@@ -0,0 +1,123 @@
+import subprocess
+
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+CLEAN = u'def transfer(to):\n    return(to)\n'
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+
+    return CliRunner()
+
+
+def git(*args):
+    return subprocess.check_output(
+        ('git', '-c', 'user.name=serplint', '-c', 'user.email=serplint@test',
+         '-c', 'commit.gpgsign=false') + args).decode('utf-8').strip()
+
+
+def commit(tmp_path, files):
+    for name, code in files.items():
+        path = tmp_path / name
+
+        if code is None:
+            path.unlink()
+        else:
+            path.write_text(code)
+
+    git('add', '-A')
+    git('commit', '-q', '-m', 'update')
+
+    return git('rev-parse', 'HEAD')
+
+
+@pytest.fixture
+def repository(tmp_path, runner):
+    git('init', '-q')
+
+    # serpent compiles straight to the process's stdout, which CliRunner
+    # can't redirect; none of these diagnostics need the bytecode
+    (tmp_path / 'setup.cfg').write_text(u'[serplint]\ncompile = false\n')
+
+    return tmp_path
+
+
+def test_diff(runner, repository):
+    old = commit(repository, {'a.se': CLEAN, 'b.se': UNUSED,
+                              'notes.txt': u'x'})
+    new = commit(repository, {'a.se': UNUSED, 'b.se': CLEAN,
+                              'notes.txt': u'y'})
+
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', old, new])
+
+    assert sorted(result.output.splitlines()) == [
+        '+ a.se:1:18 W202 Unused argument "value"',
+        '- b.se:1:18 W202 Unused argument "value"',
+    ]
+    assert result.exit_code == 1
+
+    # only fixed diagnostics don't fail
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', new, commit(repository,
+                                                  {'a.se': CLEAN})])
+
+    assert result.output == '- a.se:1:18 W202 Unused argument "value"\n'
+    assert result.exit_code == 0
+
+
+def test_diff_added_removed_and_moved(runner, repository):
+    old = commit(repository, {'a.se': UNUSED, 'b.se': CLEAN})
+    new = commit(repository, {'a.se': None, 'b.se': None,
+                              'c.se': UNUSED, 'd.se': UNUSED})
+
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', old, new])
+
+    # a.se moved to c.se, so only d.se's diagnostic is new
+    assert result.output == '+ d.se:1:18 W202 Unused argument "value"\n'
+    assert result.exit_code == 1
+
+
+def test_diff_config(runner, repository):
+    old = commit(repository, {
+        'a.se': CLEAN,
+        'setup.cfg': u'[serplint]\ncompile = false\ndisable = W202\n'})
+    new = commit(repository, {'a.se': UNUSED})
+
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', old, new])
+
+    assert result.output == ''
+    assert result.exit_code == 0
+
+
+def test_failure_is_not_cached(runner, repository, monkeypatch):
+    old = commit(repository, {'a.se': CLEAN})
+    new = commit(repository, {'a.se': UNUSED})
+    parse = serplint.Linter.parse
+
+    def crash(linter):
+        raise Exception('out of memory')
+
+    monkeypatch.setattr(serplint.Linter, 'parse', crash)
+
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', old, new])
+
+    assert result.output.endswith(
+        'Error: Linting a.se failed: out of memory\n')
+    assert result.exit_code == 1
+
+    monkeypatch.setattr(serplint.Linter, 'parse', parse)
+
+    result = runner.invoke(serplint.serplint, [
+        'diff', '--parser', 'builtin', old, new])
+
+    assert result.output == '+ a.se:1:18 W202 Unused argument "value"\n'
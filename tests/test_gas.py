@@ -0,0 +1,45 @@
+import pytest
+
+import serplint
+
+pytest.importorskip('serpent')
+
+GAS = u'''\
+def total():
+    s = 0
+    i = 0
+    while i < 10:
+        s += i
+        i += 1
+    return(s)
+
+def one():
+    return(1)
+'''
+
+
+def test_gas_threshold():
+    result = serplint.lint_source(GAS, 'contract.se', gas_threshold=100)
+
+    assert [(d.line, d.character, d.code, d.message)
+            for d in result.diagnostics] == [
+        (1, 11, 'W300', 'Method "total" may use up to 852 gas (141 without '
+         'loops)')]
+    assert result.exit_code == 1
+
+
+def test_clean_contract():
+    result = serplint.lint_source(u'def add(a, b):\n    return(a + b)\n',
+                                  'contract.se', gas_threshold=100000)
+
+    assert result.diagnostics == []
+    assert result.exit_code == 0
+
+
+def test_gas_report(capfd):
+    serplint.lint_file('contract.se', GAS, gas_report=True)
+
+    assert capfd.readouterr().out.splitlines() == [
+        'contract.se:total gas 141 loop-free, 852 worst-case (1 loops)',
+        'contract.se:one gas 40 loop-free, 40 worst-case (0 loops)',
+    ]
@@ -0,0 +1,60 @@
+import os
+import sys
+
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+sys.path.insert(0, os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'benchmarks'))
+
+import generate  # pylint: disable=wrong-import-position
+
+SHAPES = [
+    {},
+    {'methods': 3, 'fields': 2, 'depth': 4, 'macros': 2, 'variables': 3},
+    {'methods': 2, 'fields': 0, 'depth': 0, 'macros': 1, 'variables': 0},
+]
+
+
+def errors(result):
+    return [d for d in result.diagnostics if d.code.startswith('E')]
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_shape(shape):
+    lines = generate.contract(**shape).splitlines()
+
+    assert len([line for line in lines if line.startswith('def ')]) == (
+        shape.get('methods', 1))
+    assert len([line for line in lines if line.startswith('data ')]) == (
+        shape.get('fields', 1))
+    assert len([line for line in lines if line.startswith('macro ')]) == (
+        shape.get('macros', 0))
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_contracts_lint_clean_of_errors(shape):
+    result = serplint.lint_source(generate.contract(**shape), 'contract.se',
+                                  parser='builtin', compile_contract=False)
+
+    assert errors(result) == []
+
+
+@pytest.mark.parametrize('shape', SHAPES)
+def test_contracts_compile(shape):
+    pytest.importorskip('serpent')
+
+    assert errors(serplint.lint_source(generate.contract(**shape),
+                                       'contract.se')) == []
+
+
+def test_command():
+    result = CliRunner().invoke(generate.generate, [
+        '--methods', '3', '--depth', '4', '--macros', '2'])
+
+    assert result.output == generate.contract(methods=3, depth=4,
+                                              macros=2) + '\n'
+    assert result.exit_code == 0
@@ -0,0 +1,71 @@
+import pytest
+
+import serplint
+
+ARGUMENT_LOOP = u'''\
+def count(n):
+    i = 0
+    while i < n:
+        i += 1
+    return(i)
+'''
+
+STORAGE_LOOP = u'''\
+data size
+
+def drain():
+    i = 0
+    size = self.size
+    while i < size:
+        i += 1
+    return(i)
+'''
+
+BOUNDED_LOOP = u'''\
+def count():
+    i = 0
+    while i < 10:
+        i += 1
+    return(i)
+'''
+
+RECURSION = u'''\
+def countdown(n):
+    return(self.countdown(n - 1))
+'''
+
+MUTUAL_RECURSION = u'''\
+def ping(n):
+    return(self.pong(n))
+
+def pong(n):
+    return(self.ping(n))
+'''
+
+
+@pytest.mark.parametrize('code, expected', [
+    (ARGUMENT_LOOP, [(3, 5, 'W306', 'Loop iterations grow with n')]),
+    (STORAGE_LOOP, [(6, 5, 'W306', 'Loop iterations grow with self.size')]),
+    (BOUNDED_LOOP, []),
+    (RECURSION, [(1, 16, 'W307', 'Method "countdown" recurses; depth grows '
+                  'with n')]),
+    (MUTUAL_RECURSION, [
+        (1, 11, 'W307', 'Method "ping" recurses; depth grows with n'),
+        (4, 11, 'W307', 'Method "pong" recurses; depth grows with n'),
+    ]),
+])
+def test_iteration(code, expected):
+    result = serplint.lint_source(code, 'contract.se', parser='builtin',
+                                  compile_contract=False)
+
+    assert sorted((d.line, d.character, d.code, d.message)
+                  for d in result.diagnostics) == expected
+
+
+def test_gas_report_growth(capfd):
+    pytest.importorskip('serpent')
+
+    serplint.lint_file('contract.se', STORAGE_LOOP, gas_report=True)
+
+    assert 'contract.se:drain gas grows with self.size' in (
+        capfd.readouterr().out.splitlines())
@@ -0,0 +1,60 @@
+import serplint
+
+
+def layout(code):
+    layouts = {}
+    serplint.lint_file('contract.se', code, layouts=layouts,
+                       parser='builtin', compile_contract=False)
+
+    return layouts['contract.se']
+
+
+def slots(code):
+    return [(field['name'], field['slot'], field['slots'])
+            for field in layout(code)['fields']]
+
+
+def test_struct_arrays():
+    # serpent folds `2^3`, so the array holds 8 structs of 2 slots
+    assert slots(u'data a[2^3](x, y)\ndata b\n') == [
+        ('self.a', 0, 16),
+        ('self.a.x', 0, 1),
+        ('self.a.y', 1, 1),
+        ('self.b', 16, 1),
+    ]
+
+
+def test_wrapped_size():
+    # serpent wraps sizes around 256 bits too
+    assert slots(u'data a[2^256]\ndata b\n') == [
+        ('self.a', 0, 0),
+        ('self.b', 0, 1),
+    ]
+
+
+def test_unbounded_arrays_are_hashed():
+    assert slots(u'data a[](x)\ndata b\n') == [
+        ('self.a', None, 0),
+        ('self.a.x', None, 0),
+        ('self.b', 0, 1),
+    ]
+
+
+def test_packing():
+    result = layout(u'''\
+data count
+data flag
+
+def set(n):
+    self.count = mod(n, 256)
+    self.flag = 1
+''')
+
+    assert result['slots'] == 2
+    assert [(field['name'], field['bits'], field['written_by'])
+            for field in result['fields']] == [
+        ('self.count', 8, ['set']),
+        ('self.flag', 1, ['set']),
+    ]
+    assert [packing['fields'] for packing in result['packing']] == [
+        ['self.count', 'self.flag']]
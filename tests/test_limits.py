@@ -0,0 +1,47 @@
+import time
+
+import pytest
+
+import serplint
+
+CONTRACT = u'def transfer(to):\n    return(to)\n'
+
+
+def slow(filename, code, **options):
+    time.sleep(10)
+
+
+def hungry(filename, code, **options):
+    return bytearray(256 * 1024 * 1024)
+
+
+def crash(filename, code, **options):
+    raise ValueError('crashed')
+
+
+@pytest.mark.parametrize('target, timeout, max_memory, expected', [
+    (slow, 0.5, None, 'E102 Linting took longer than 0.5 seconds'),
+    pytest.param(hungry, None, 64, 'E104 Linting needed more than 64 MB',
+                 marks=pytest.mark.skipif(not serplint.resource,
+                                          reason='needs resource.setrlimit')),
+    (crash, 10, None, "E103 Linting failed: ValueError('crashed'"),
+])
+def test_isolation(target, timeout, max_memory, expected, monkeypatch,
+                   capsys):
+    monkeypatch.setattr(serplint, 'lint_file', target)
+
+    exit_code = serplint.lint_isolated(('contract.se', CONTRACT), {},
+                                       timeout, max_memory)
+
+    assert exit_code == 1
+    assert capsys.readouterr().out.startswith(
+        'contract.se:1:0 {}'.format(expected))
+
+
+def test_isolated_result(capsys):
+    exit_code = serplint.lint_isolated(
+        ('contract.se', CONTRACT), {'parser': 'builtin',
+                                    'compile_contract': False}, 10, None)
+
+    assert exit_code == 0
+    assert capsys.readouterr().out == ''
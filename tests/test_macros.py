@@ -0,0 +1,82 @@
+import serplint
+
+ADD_TOTAL = u'''\
+data total
+
+macro addtotal($x):
+    $x + self.total + self.total
+
+def f(x):
+    return(addtotal(x))
+
+def g(x):
+    return(addtotal(x))
+'''
+
+TYPED = u'''\
+type modint: m_
+
+macro modint($x) + modint($y):
+    ($x + $y) % 7
+
+macro double($x):
+    $x * 2
+
+def f(a):
+    m_a = a
+    return(double(a) + double(m_a))
+'''
+
+
+def lint(code, **options):
+    return serplint.lint_source(code, 'contract.se', parser='builtin',
+                                compile_contract=False, **options)
+
+
+def report(capsys, code):
+    serplint.lint_file('contract.se', code, macro_report=True,
+                       parser='builtin', compile_contract=False)
+
+    return [line for line in capsys.readouterr().out.splitlines()
+            if not serplint.RE_DIAGNOSTIC.match(line)]
+
+
+def test_expansions_report_at_each_call_site():
+    # both calls share one memoized expansion but not its location
+    assert sorted((d.line, d.character, d.code)
+                  for d in lint(ADD_TOTAL).diagnostics) == [
+        (7, 22, 'W302'), (10, 22, 'W302')]
+
+
+def test_expansions_keep_their_arguments_locations():
+    expander = serplint.MacroExpander()
+    tree = serplint.syntax.parse(ADD_TOTAL)
+
+    for node in tree.args:
+        if node.val == 'macro':
+            expander.define(node)
+
+    expanded = expander.expand(tree)
+    first, second = [list(expander.preorder(method.args[1].args[0].args[0]))
+                     for method in expanded.args[2:]]
+
+    assert [(node.val, node.metadata.ln) for node in first] == [
+        (node.val, node.metadata.ln - 3) for node in second]
+    assert first[0] is not second[0]
+
+
+def test_macro_report(capsys):
+    assert report(capsys, ADD_TOTAL) == [
+        'contract.se:addtotal($x) expanded 2 times',
+        'contract.se:7:22 addtotal($x) expands to 9 nodes',
+        'contract.se:10:22 addtotal($x) expands to 9 nodes',
+    ]
+
+
+def test_macro_report_skips_typed_macros(capsys):
+    assert report(capsys, TYPED) == [
+        'contract.se:double($x) expanded 2 times',
+        'contract.se:modint($x) + modint($y) not expanded (typed macro)',
+        'contract.se:11:20 double($x) expands to 3 nodes',
+        'contract.se:11:34 double($x) expands to 3 nodes',
+    ]
@@ -0,0 +1,56 @@
+import pytest
+
+import serplint
+
+ARRAY_IN_LOOP = u'''\
+def fill():
+    i = 0
+    while i < 10:
+        y = array(10)
+        y[0] = i
+        i += 1
+    return(y[0])
+'''
+
+STRING_IN_LOOP = u'''\
+def name():
+    i = 0
+    while i < 10:
+        s = string(32)
+        s[0] = i
+        i += 1
+    return(s[0])
+'''
+
+UNBOUNDED = u'''\
+def alloc(n):
+    x = array(n)
+    return(x[0])
+'''
+
+OUTSIDE_LOOP = u'''\
+def alloc():
+    x = array(10)
+    x[0] = 1
+    return(x[0])
+'''
+
+
+@pytest.mark.parametrize('code, expected', [
+    (ARRAY_IN_LOOP, [(4, 21, 'W309', 'array() in a loop allocates 352 bytes '
+                      'on every iteration; over 10 iterations expanding '
+                      'memory costs ~353 gas')]),
+    (STRING_IN_LOOP, [(4, 22, 'W309', 'string() in a loop allocates 64 bytes '
+                       'on every iteration; over 10 iterations expanding '
+                       'memory costs ~60 gas')]),
+    (UNBOUNDED, [(2, 16, 'W310', 'Size of array() grows with n; past 1976 KB '
+                  'of memory its expansion alone costs more than 8000000 '
+                  'gas')]),
+    (OUTSIDE_LOOP, []),
+])
+def test_memory(code, expected):
+    result = serplint.lint_source(code, 'contract.se', parser='builtin',
+                                  compile_contract=False)
+
+    assert sorted((d.line, d.character, d.code, d.message)
+                  for d in result.diagnostics) == expected
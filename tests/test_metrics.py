@@ -0,0 +1,106 @@
+import pickle
+
+from click.testing import CliRunner
+
+import serplint
+
+try:
+    from urllib.request import urlopen
+except ImportError:  # Python 2
+    from urllib2 import urlopen
+
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+def test_render():
+    metrics = serplint.Metrics()
+    metrics.increment('serplint_files_linted')
+    metrics.increment('serplint_diagnostics', 2, code='W202')
+    metrics.observe('serplint_lint_seconds', 0.3)
+
+    assert metrics.render().splitlines() == [
+        '# TYPE serplint_diagnostics counter',
+        '# HELP serplint_diagnostics Diagnostics reported, by code',
+        'serplint_diagnostics_total{code="W202"} 2',
+        '# TYPE serplint_files_linted counter',
+        '# HELP serplint_files_linted Files linted',
+        'serplint_files_linted_total 1',
+        '# TYPE serplint_lint_seconds histogram',
+        '# HELP serplint_lint_seconds Time spent linting a file',
+    ] + [
+        'serplint_lint_seconds_bucket{{le="{}"}} {}'.format(
+            bucket, int(bucket >= 0.3))
+        for bucket in serplint.METRICS_BUCKETS
+    ] + [
+        'serplint_lint_seconds_bucket{le="+Inf"} 1',
+        'serplint_lint_seconds_sum 0.3',
+        'serplint_lint_seconds_count 1',
+        '# EOF',
+    ]
+
+
+def test_empty():
+    assert serplint.Metrics().render() == '# EOF\n'
+
+
+def test_lint_source_collects():
+    metrics = serplint.Metrics()
+
+    for _ in range(2):
+        serplint.lint_source(UNUSED, 'contract.se', parser='builtin',
+                             compile_contract=False, metrics=metrics)
+
+    assert metrics.counters[('serplint_diagnostics',
+                             (('code', 'W202'),))] == 2
+    assert sorted(dict(labels)['phase']
+                  for name, labels in metrics.histograms
+                  if name == 'serplint_phase_seconds') == [
+        'analyze', 'parse', 'resolve', 'traverse']
+
+
+def test_merge_from_workers():
+    worker = serplint.Metrics()
+    worker.increment('serplint_files_linted')
+    worker.observe('serplint_lint_seconds', 0.3)
+
+    metrics = serplint.Metrics()
+    metrics.increment('serplint_files_linted')
+    metrics.merge(pickle.loads(pickle.dumps(worker)))
+
+    assert metrics.counters[('serplint_files_linted', ())] == 2
+    assert metrics.histograms[('serplint_lint_seconds', ())][-1] == 1
+
+
+def test_serve():
+    metrics = serplint.Metrics()
+    metrics.increment('serplint_files_linted')
+    server = metrics.serve(0)
+
+    try:
+        response = urlopen('http://127.0.0.1:{}/metrics'.format(
+            server.server_address[1]))
+
+        assert response.headers['Content-Type'] == (
+            serplint.OPENMETRICS_CONTENT_TYPE)
+        assert response.read().decode('utf-8') == metrics.render()
+    finally:
+        server.shutdown()
+
+
+def test_metrics_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(UNUSED)
+
+    result = CliRunner().invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', '--metrics-file',
+        'metrics.txt', 'contract.se'])
+
+    assert result.exit_code == 1
+
+    lines = (tmp_path / 'metrics.txt').read_text().splitlines()
+
+    assert 'serplint_files_linted_total 1' in lines
+    assert 'serplint_diagnostics_total{code="W202"} 1' in lines
+    assert lines[-1] == '# EOF'
+    assert [path.name for path in tmp_path.iterdir()
+            if path.name.endswith('.tmp')] == []
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+import serplint
+import serplint_parser as syntax
+
+serpent = pytest.importorskip('serpent')
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+CORPUS = sorted(os.path.relpath(os.path.join(directory, name), TESTS)
+                for directory, _, names in os.walk(TESTS)
+                for name in names if name.endswith('.se'))
+
+
+def tree(node):
+    metadata = (node.val, node.metadata.file, node.metadata.ln,
+                node.metadata.ch)
+
+    if isinstance(node, syntax.Astnode):
+        return metadata + (tuple(tree(arg) for arg in node.args),)
+
+    return metadata
+
+
+@pytest.mark.parametrize('path', CORPUS)
+def test_parses_like_serpent(path, monkeypatch):
+    path = os.path.join(TESTS, path)
+
+    with open(path) as source:
+        code = source.read()
+
+    # insets are read relative to the working directory
+    monkeypatch.chdir(os.path.dirname(path))
+
+    with serplint.stdout_redirected(), serplint.merged_stderr_stdout():
+        expected = tree(serplint.normalize(serpent.parse(code)))
+
+    assert tree(syntax.parse(code)) == expected
+
+
+@pytest.mark.parametrize('code', [
+    u'x = (1\n',
+    u'def f():\n    return(1))\n',
+    u'if:\n',
+])
+def test_errors_like_serpent(code):
+    with pytest.raises(Exception) as expected:
+        with serplint.stdout_redirected(), serplint.merged_stderr_stdout():
+            serpent.parse(code)
+
+    with pytest.raises(syntax.ParseError) as error:
+        syntax.parse(code)
+
+    assert str(error.value) == str(expected.value)
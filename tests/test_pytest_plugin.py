@@ -0,0 +1,50 @@
+import pytest
+
+if int(pytest.__version__.split('.')[0]) < 7:
+    pytest.skip('serplint_pytest needs pytest 7+', allow_module_level=True)
+
+pytest_plugins = ['pytester']
+
+CLEAN = u'def transfer(to):\n    return(to)\n'
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+@pytest.fixture
+def contracts(pytester):
+    pytester.makefile('.cfg', setup=u'[serplint]\ncompile = false\n')
+    pytester.makefile('.se', clean=CLEAN, unused=UNUSED)
+
+    return pytester
+
+
+def run(pytester, *args):
+    return pytester.runpytest('-p', 'serplint_pytest', '--serplint-parser',
+                              'builtin', *args)
+
+
+def test_lints_contracts(contracts):
+    result = run(contracts, '--serplint')
+
+    result.assert_outcomes(passed=1, failed=1)
+    result.stdout.fnmatch_lines([
+        'unused.se:1:18 W202 Unused argument "value"'])
+
+
+def test_only_with_the_option(contracts):
+    run(contracts).assert_outcomes()
+
+
+def test_clean_files_are_skipped_until_they_change(contracts):
+    run(contracts, '--serplint').assert_outcomes(passed=1, failed=1)
+    run(contracts, '--serplint').assert_outcomes(skipped=1, failed=1)
+
+    contracts.makefile('.se', clean=CLEAN + u'\ndef f():\n    return(1)\n')
+
+    run(contracts, '--serplint').assert_outcomes(passed=1, failed=1)
+
+
+def test_configuration_applies(contracts):
+    contracts.makefile('.cfg', setup=u'[serplint]\ncompile = false\n'
+                       u'disable = W202\n')
+
+    run(contracts, '--serplint').assert_outcomes(passed=2)
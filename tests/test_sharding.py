@@ -0,0 +1,98 @@
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+UNUSED = u'def transfer(to, value):\n    return(to)\n'
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+
+    return CliRunner()
+
+
+def test_shards_balance_timings():
+    timings = {'a.se': 4, 'b.se': 3, 'c.se': 2, 'd.se': 1}
+    filenames = sorted(timings)
+
+    assert serplint.shard_files(filenames, timings, 1, 2) == ['a.se', 'd.se']
+    assert serplint.shard_files(filenames, timings, 2, 2) == ['b.se', 'c.se']
+
+
+def test_untimed_files_take_the_average():
+    timings = {'a.se': 3, 'b.se': 1}
+    filenames = ['a.se', 'b.se', 'c.se', 'd.se']
+    shards = [serplint.shard_files(filenames, timings, index, 2)
+              for index in [1, 2]]
+
+    assert shards == [['a.se', 'b.se'], ['c.se', 'd.se']]
+
+
+def test_every_file_in_one_shard():
+    filenames = ['{}.se'.format(number) for number in range(10)]
+    shards = [serplint.shard_files(filenames, {}, index, 3)
+              for index in [1, 2, 3]]
+
+    assert sorted(sum(shards, [])) == sorted(filenames)
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+
+
+def test_shard_option(runner, tmp_path):
+    for name in ['a.se', 'b.se']:
+        (tmp_path / name).write_text(UNUSED)
+
+    serplint.write_timings(str(tmp_path / 'timings.json'),
+                           {'a.se': 2.0, 'b.se': 1.0})
+
+    result = runner.invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', '--shard', '2/2',
+        '--timings', 'timings.json', 'a.se', 'b.se'])
+
+    assert result.output.startswith('b.se:1:18 W202 ')
+    assert 'a.se' not in result.output
+    assert sorted(serplint.read_timings(str(tmp_path / 'timings.json'))) == [
+        'a.se', 'b.se']
+
+
+@pytest.mark.parametrize('shard', ['2', '0/2', '3/2'])
+def test_bad_shard(runner, shard):
+    result = runner.invoke(serplint.serplint, ['--shard', shard, 'a.se'])
+
+    assert result.exit_code == 2
+
+
+def test_merge(runner, tmp_path):
+    (tmp_path / 'shard-1.txt').write_text(
+        u'b.se:2:5 W203 Unreferenced assignment "x"\n'
+        u'a.se:1:17 W202 Unused argument "value"\n')
+    (tmp_path / 'shard-2.txt').write_text(
+        u'Peak memory 10.0 MB, 5.0 MB in workers\n'
+        u'a.se:1:17 W202 Unused argument "value"\n'
+        u'a.se:10:1 E200 Undefined variable "y"\n')
+    serplint.write_timings(str(tmp_path / 'timings-1.json'), {'a.se': 1.5})
+    serplint.write_timings(str(tmp_path / 'timings-2.json'), {'b.se': 0.5})
+
+    result = runner.invoke(serplint.serplint, [
+        'merge', '--timings', 'timings-1.json', '--timings',
+        'timings-2.json', '--write-timings', 'timings.json', 'shard-1.txt',
+        'shard-2.txt'])
+
+    assert result.output.splitlines() == [
+        'a.se:1:17 W202 Unused argument "value"',
+        'a.se:10:1 E200 Undefined variable "y"',
+        'b.se:2:5 W203 Unreferenced assignment "x"',
+    ]
+    assert result.exit_code == 1
+    assert serplint.read_timings(str(tmp_path / 'timings.json')) == {
+        'a.se': 1.5, 'b.se': 0.5}
+
+
+def test_merge_clean(runner, tmp_path):
+    (tmp_path / 'shard-1.txt').write_text(u'')
+
+    result = runner.invoke(serplint.serplint, ['merge', 'shard-1.txt'])
+
+    assert result.output == ''
+    assert result.exit_code == 0
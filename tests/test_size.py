@@ -0,0 +1,53 @@
+import pytest
+
+import serplint
+
+pytest.importorskip('serpent')
+
+CONTRACT = u'''\
+def total():
+    s = 0
+    i = 0
+    while i < 10:
+        s += i
+        i += 1
+    return(s)
+
+def one():
+    return(1)
+'''
+
+
+def found(**options):
+    result = serplint.lint_source(CONTRACT, 'contract.se', **options)
+
+    return [(d.line, d.character, d.code, d.message)
+            for d in result.diagnostics]
+
+
+def test_size_budget():
+    assert found(size_budget=10) == [
+        (1, 0, 'W303', 'Contract code is 128 bytes, over the budget of 10 '
+         'bytes')]
+    assert found(size_budget=1000) == []
+
+
+def test_size_baseline():
+    code_sizes = {}
+    serplint.lint_file('contract.se', CONTRACT, code_sizes=code_sizes)
+
+    assert code_sizes['contract.se']['runtime'] == 128
+    assert found(size_baseline=code_sizes['contract.se'],
+                 size_growth=5) == []
+    assert found(size_baseline={'runtime': 10}, size_growth=5) == [
+        (1, 0, 'W304', 'Contract code grew 1180.0% from 10 to 128 bytes')]
+
+
+def test_size_report(capfd):
+    serplint.lint_file('contract.se', CONTRACT, size_report=True)
+
+    assert capfd.readouterr().out.splitlines() == [
+        'contract.se size 146 bytes (128 runtime)',
+        'contract.se:total size 69 bytes',
+        'contract.se:one size 22 bytes',
+    ]
@@ -0,0 +1,60 @@
+import pytest
+
+import serplint
+
+READ_IN_LOOP = u'''\
+data total
+
+def sum():
+    s = 0
+    i = 0
+    while i < 10:
+        s += self.total
+        i += 1
+    return(s)
+'''
+
+WRITE_IN_LOOP = u'''\
+data total
+
+def add():
+    i = 0
+    while i < 10:
+        self.total += i
+        i += 1
+'''
+
+REPEATED_READ = u'''\
+data total
+
+def double():
+    return(self.total + self.total)
+'''
+
+SINGLE_READ = u'''\
+data total
+
+def get():
+    return(self.total)
+'''
+
+
+@pytest.mark.parametrize('code, expected', [
+    (READ_IN_LOOP, [(7, 18, 'W301', 'Storage read of "self.total" inside a '
+                     'loop could be hoisted into a local')]),
+    (WRITE_IN_LOOP, [
+        (6, 13, 'W301', 'Storage read of "self.total" inside a loop could be '
+         'hoisted into a local'),
+        (6, 13, 'W301', 'Storage write to "self.total" inside a loop could be '
+         'kept in a local and stored after the loop'),
+    ]),
+    (REPEATED_READ, [(4, 29, 'W302', 'Storage slot "self.total" is read more '
+                      'than once; read it into a local')]),
+    (SINGLE_READ, []),
+])
+def test_storage(code, expected):
+    result = serplint.lint_source(code, 'contract.se', parser='builtin',
+                                  compile_contract=False)
+
+    assert sorted((d.line, d.character, d.code, d.message)
+                  for d in result.diagnostics) == expected
@@ -0,0 +1,63 @@
+import pytest
+
+import serplint
+
+REPEATED = u'''\
+def twice(x):
+    a = sha3(msg.sender + x)
+    b = sha3(msg.sender + x)
+    return(a + b)
+'''
+
+REPEATED_ARITHMETIC = u'''\
+data total
+
+def twice(x):
+    a = x * 3 + 1
+    self.total = a
+    b = x * 3 + 1
+    return(a + b)
+'''
+
+REASSIGNED = u'''\
+def twice(x):
+    y = x
+    a = sha3(msg.sender + y)
+    y = 1
+    b = sha3(msg.sender + y)
+    return(a + b)
+'''
+
+STORAGE_WRITTEN = u'''\
+data total
+
+def twice():
+    a = sha3(self.total * 3)
+    self.total = 1
+    b = sha3(self.total * 3)
+    return(a + b)
+'''
+
+CHEAP = u'''\
+def twice(x):
+    a = x + 1
+    b = x + 1
+    return(a + b)
+'''
+
+
+@pytest.mark.parametrize('code, expected', [
+    (REPEATED, [(3, 28, 'W311', 'Expression was already computed on line 2; '
+                 'keep it in a local (~47 gas)')]),
+    (REPEATED_ARITHMETIC, [(6, 15, 'W311', 'Expression was already computed '
+                            'on line 4; keep it in a local (~20 gas)')]),
+    (REASSIGNED, []),
+    (STORAGE_WRITTEN, []),
+    (CHEAP, []),
+])
+def test_subexpressions(code, expected):
+    result = serplint.lint_source(code, 'contract.se', parser='builtin',
+                                  compile_contract=False)
+
+    assert sorted((d.line, d.character, d.code, d.message)
+                  for d in result.diagnostics) == expected
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+from click.testing import CliRunner
+
+import serplint
+
+CONTRACT = u'''\
+def transfer(to, value):
+    balance = 0
+    return(to)
+'''
+
+SUPPRESSED = u'''\
+def transfer(to, value):  # serplint: disable=W202
+    balance = 0  # serplint: disable=W203
+    return(to)
+'''
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+
+    return CliRunner()
+
+
+def lint(code):
+    return serplint.lint_source(code, parser='builtin',
+                                compile_contract=False)
+
+
+def test_suppressions():
+    result = lint(CONTRACT)
+
+    assert sorted(d.code for d in result.diagnostics) == ['W202', 'W203']
+
+    result = lint(SUPPRESSED)
+
+    assert result.diagnostics == []
+    assert result.exit_code == 0
+
+
+def test_several_codes():
+    code = CONTRACT.replace(u'value):', u'value):  # serplint: disable=w202, '
+                            u'W203')
+
+    assert lint(code).diagnostics == []
+
+
+def test_method_suppression():
+    code = CONTRACT.replace(u'value):', u'value):  # serplint: disable=all')
+    result = lint(code + u'\ndef f(x):\n    return(0)\n')
+
+    assert [(d.line, d.code) for d in result.diagnostics] == [(5, 'W202')]
+
+
+def test_suppressions_stay_out_of_baseline(runner, tmp_path):
+    (tmp_path / 'contract.se').write_text(SUPPRESSED)
+    runner.invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', '--baseline',
+        'baseline.json', '--write-baseline', 'contract.se'])
+
+    assert json.loads((tmp_path / 'baseline.json').read_text())[
+        'files']['contract.se'] == {}
+
+    result = runner.invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '-e', '--baseline',
+        'baseline.json', '--disable', 'W202', 'contract.se'])
+
+    assert result.output == ''
+    assert result.exit_code == 0
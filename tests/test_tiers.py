@@ -0,0 +1,68 @@
+from click.testing import CliRunner
+
+import serplint
+
+CONTRACT = u'''\
+data total
+
+def sum(n, unused):
+    s = 0
+    i = 0
+    while i < n:
+        s += self.total
+        i += 1
+    return(s)
+'''
+
+OPTIONS = {'parser': 'builtin', 'compile_contract': False}
+
+
+def found(diagnostics):
+    return sorted((d.line, d.character, d.code) for d in diagnostics)
+
+
+def test_tiers():
+    fast, deep = serplint.lint_tiers(CONTRACT, 'contract.se', **OPTIONS)
+
+    assert found(fast.diagnostics) == [(3, 12, 'W202')]
+    assert found(deep.diagnostics) == [
+        (3, 12, 'W202'), (6, 5, 'W306'), (7, 18, 'W301')]
+
+
+def test_tiers_cancelled():
+    results = list(serplint.lint_tiers(CONTRACT, 'contract.se',
+                                       cancelled=lambda: True, **OPTIONS))
+
+    assert [found(result.diagnostics) for result in results] == [
+        [(3, 12, 'W202')]]
+
+
+def test_tiers_timeout():
+    results = list(serplint.lint_tiers(CONTRACT, 'contract.se', timeout=0,
+                                       **OPTIONS))
+
+    assert found(results[-1].diagnostics) == [(1, 0, 'E102')]
+
+
+def test_crashing_check_keeps_the_rest(monkeypatch):
+    def crash(linter, contract_ast):
+        raise ValueError('crashed')
+
+    monkeypatch.setattr(serplint.Linter, 'check_storage', crash)
+
+    result = serplint.lint_source(CONTRACT, 'contract.se', **OPTIONS)
+
+    assert found(result.diagnostics) == [
+        (1, 0, 'E103'), (3, 12, 'W202'), (6, 5, 'W306')]
+
+
+def test_fast_tier_option(tmp_path, monkeypatch):
+    monkeypatch.chdir(str(tmp_path))
+    (tmp_path / 'contract.se').write_text(CONTRACT)
+
+    result = CliRunner().invoke(serplint.serplint, [
+        '--parser', 'builtin', '--no-compile', '--tier', 'fast',
+        'contract.se'])
+
+    assert [line.split(' ')[1] for line in result.output.splitlines()] == [
+        'W202']